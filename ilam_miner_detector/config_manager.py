@@ -22,6 +22,9 @@ class ScanConfig:
     enable_ping: bool = True
     enable_banner_grab: bool = True
     banner_timeout: float = 5.0
+    stop_on_miner_banner: bool = False
+    scan_mode: str = "connect"
+    store_unresponsive_hosts: bool = False
 
 
 @dataclass
@@ -34,6 +37,7 @@ class GeolocationConfig:
     cache_enabled: bool = True
     cache_ttl_hours: int = 24
     request_timeout: int = 10
+    cache_by_subnet: bool = True
 
 
 @dataclass
@@ -109,7 +113,10 @@ class ConfigManager:
             "retry_delay": 1.0,
             "enable_ping": True,
             "enable_banner_grab": True,
-            "banner_timeout": 5.0
+            "banner_timeout": 5.0,
+            "stop_on_miner_banner": False,
+            "scan_mode": "connect",
+            "store_unresponsive_hosts": False
         },
         "geolocation": {
             "primary_provider": "ip-api.com",
@@ -118,7 +125,8 @@ class ConfigManager:
             "rate_limit_per_minute": 45,
             "cache_enabled": True,
             "cache_ttl_hours": 24,
-            "request_timeout": 10
+            "request_timeout": 10,
+            "cache_by_subnet": True
         },
         "ilam_region": {
             "min_latitude": 32.5,
@@ -4,10 +4,13 @@ SQLite operations with connection pooling and ORM-style models.
 """
 
 import sqlite3
+import csv
 import json
 import logging
+import functools
+import time
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 from contextlib import contextmanager
@@ -15,6 +18,12 @@ import threading
 
 from .config_manager import get_config_manager
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,7 +42,8 @@ class ScanRecord:
     notes: str = ""
     
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
+        # Fields are all flat values, so a shallow copy matches asdict()
+        result = dict(self.__dict__)
         if self.start_time:
             result['start_time'] = self.start_time.isoformat()
         if self.end_time:
@@ -56,13 +66,77 @@ class HostRecord:
     confidence_score: float = 0.0
     timestamp: Optional[datetime] = None
     
+    @property
+    def ports(self) -> Tuple[int, ...]:
+        """Open ports decoded from the open_ports JSON column."""
+        return decode_ports(self.open_ports)
+    
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
+        result = dict(self.__dict__)
         if self.timestamp:
             result['timestamp'] = self.timestamp.isoformat()
         return result
 
 
+_EMPTY_BANNER_INFO = '{}'
+# Port columns are stored without whitespace
+_COMPACT = (',', ':')
+
+
+@functools.lru_cache(maxsize=8192)
+def _encode_port_info(key: Tuple[Tuple[int, str], ...]) -> Tuple[str, str]:
+    return (json.dumps([port for port, _ in key], separators=_COMPACT),
+            json.dumps({port: banner for port, banner in key}, separators=_COMPACT))
+
+
+@functools.lru_cache(maxsize=8192)
+def _encode_ports(ports: Tuple[int, ...]) -> str:
+    return json.dumps(list(ports), separators=_COMPACT)
+
+
+@functools.lru_cache(maxsize=8192)
+def decode_ports(open_ports: str) -> Tuple[int, ...]:
+    """
+    Decode an open_ports JSON column.
+    
+    Decodings are memoized on the column text, which repeats across most
+    hosts, and returned as tuples so the shared results stay immutable.
+    
+    Args:
+        open_ports: JSON array text (empty for no ports)
+        
+    Returns:
+        Tuple of port numbers
+        
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON
+    """
+    if not open_ports:
+        return ()
+    if ORJSON_AVAILABLE:
+        return tuple(orjson.loads(open_ports))
+    return tuple(json.loads(open_ports))
+
+
+def encode_port_info(open_ports) -> Tuple[str, str]:
+    """
+    Encode the open_ports and banner_info JSON columns for a host.
+    
+    Encodings are memoized on the (port, banner) pairs, since most hosts
+    share the same few port/banner combinations. Hosts without any banner
+    text skip the banner encoding and store an empty object.
+    
+    Args:
+        open_ports: Sequence of objects with port and banner attributes
+        
+    Returns:
+        Tuple of (open_ports_json, banner_info_json)
+    """
+    if not any(p.banner for p in open_ports):
+        return _encode_ports(tuple(p.port for p in open_ports)), _EMPTY_BANNER_INFO
+    return _encode_port_info(tuple((p.port, p.banner) for p in open_ports))
+
+
 @dataclass
 class GeolocationCache:
     """Cached geolocation data for an IP."""
@@ -87,7 +161,7 @@ class GeolocationCache:
         return datetime.now() > expiry
     
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
+        result = dict(self.__dict__)
         if self.cached_at:
             result['cached_at'] = self.cached_at.isoformat()
         return result
@@ -118,8 +192,14 @@ class DatabaseManager:
         self.db_path = db_path or config.database.db_path
         self._local = threading.local()
         
+        # SQLite URIs (e.g. "file:test?mode=memory&cache=shared") are passed
+        # through; an in-memory database must use shared cache, since each
+        # thread opens its own connection
+        self._uri = self.db_path.startswith('file:')
+        
         # Ensure data directory exists
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        if not self._uri:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
         # Initialize database
         self._init_database()
@@ -132,22 +212,100 @@ class DatabaseManager:
             self._local.connection = sqlite3.connect(
                 self.db_path,
                 timeout=get_config_manager().get().database.connection_timeout,
-                check_same_thread=False
+                check_same_thread=False,
+                uri=self._uri
             )
             self._local.connection.row_factory = sqlite3.Row
+            # WAL lets readers run alongside the writer; with NORMAL sync
+            # a commit no longer waits on an fsync of the main database
+            self._local.connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA mmap_size=268435456;
+            """)
         return self._local.connection
     
     @contextmanager
     def _get_cursor(self):
-        """Context manager for database cursor."""
+        """
+        Context manager for database cursor.
+        
+        Outside transaction() the block is committed, or rolled back if it
+        raises. Inside one, a failing block only undoes its own writes,
+        through a savepoint; the transaction's owner commits or rolls back.
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
+        if not getattr(self._local, 'in_transaction', False):
+            try:
+                yield cursor
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            return
+        
+        cursor.execute("SAVEPOINT cursor_block")
         try:
             yield cursor
+        except Exception:
+            # Some errors already abort the whole transaction
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK TO cursor_block")
+                cursor.execute("RELEASE cursor_block")
+            raise
+        cursor.execute("RELEASE cursor_block")
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several operations into a single commit.
+        
+        Operations run on this thread inside the block are committed
+        together when it exits, or rolled back if it raises. An operation
+        that fails inside the block leaves the others in place, so a caller
+        that catches its error still commits the rest.
+        """
+        if getattr(self._local, 'in_transaction', False):
+            yield
+            return
+        
+        conn = self._get_connection()
+        if not conn.in_transaction:
+            # Explicit, so the first savepoint does not open (and its
+            # release commit) a transaction of its own
+            conn.execute("BEGIN")
+        self._local.in_transaction = True
+        try:
+            yield
             conn.commit()
-        except Exception as e:
+        except Exception:
             conn.rollback()
-            raise e
+            raise
+        finally:
+            self._local.in_transaction = False
+    
+    @contextmanager
+    def bulk_load(self):
+        """
+        Relax durability on this thread's connection for a burst of writes.
+        
+        Inside the block commits skip fsync entirely (synchronous=OFF) and
+        the page cache is enlarged; both are restored on exit. The journal
+        stays in WAL mode, since other threads may be reading, so a crash
+        can lose the latest commits but cannot corrupt the database. Only
+        use it for writes that can be redone, such as saving scan results.
+        """
+        conn = self._get_connection()
+        cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-64000")
+        try:
+            yield
+        finally:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size={int(cache_size)}")
     
     def _init_database(self) -> None:
         """Initialize database schema."""
@@ -204,12 +362,89 @@ class DatabaseManager:
                 )
             """)
             
+            # Scheduled scan execution history
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scan_executions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    schedule_id TEXT NOT NULL,
+                    schedule_name TEXT DEFAULT '',
+                    execution_time TIMESTAMP NOT NULL,
+                    status TEXT NOT NULL,
+                    hosts_scanned INTEGER DEFAULT 0,
+                    miners_detected INTEGER DEFAULT 0,
+                    duration_seconds REAL DEFAULT 0.0,
+                    error_message TEXT DEFAULT '',
+                    scan_id INTEGER
+                )
+            """)
+            
+            # VPN/proxy detection cache (results as JSON, expiry as Unix time)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vpn_cache (
+                    ip_address TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            
             # Create indexes
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_hosts_scan_id ON hosts(scan_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_hosts_ip ON hosts(ip_address)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_hosts_miner ON hosts(is_miner_detected)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_geo_ip ON geolocation_cache(ip_address)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_time ON scans(start_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_executions_time ON scan_executions(execution_time)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_executions_schedule "
+                "ON scan_executions(schedule_id, execution_time)"
+            )
+            
+            # Single-row statistics table kept current by triggers (and,
+            # for host inserts, by the insert methods), so get_stats()
+            # does not have to count every table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_scans INTEGER DEFAULT 0,
+                    total_hosts INTEGER DEFAULT 0,
+                    total_miners INTEGER DEFAULT 0,
+                    geolocation_cache_entries INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO stats 
+                    (id, total_scans, total_hosts, total_miners, geolocation_cache_entries)
+                SELECT 1,
+                       (SELECT COUNT(*) FROM scans),
+                       (SELECT COUNT(*) FROM hosts),
+                       (SELECT COUNT(*) FROM hosts WHERE is_miner_detected = 1),
+                       (SELECT COUNT(*) FROM geolocation_cache)
+            """)
+            # Host inserts are counted once per statement instead of by a
+            # per-row trigger, which added ~40% to bulk inserts
+            cursor.execute("DROP TRIGGER IF EXISTS stats_hosts_insert")
+            for trigger in self._STATS_TRIGGERS:
+                cursor.execute(trigger)
+    
+    _STATS_TRIGGERS = (
+        """CREATE TRIGGER IF NOT EXISTS stats_scans_insert AFTER INSERT ON scans
+           BEGIN UPDATE stats SET total_scans = total_scans + 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_scans_delete AFTER DELETE ON scans
+           BEGIN UPDATE stats SET total_scans = total_scans - 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_hosts_delete AFTER DELETE ON hosts
+           BEGIN UPDATE stats SET total_hosts = total_hosts - 1,
+               total_miners = total_miners - (OLD.is_miner_detected = 1); END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_hosts_update AFTER UPDATE OF is_miner_detected ON hosts
+           BEGIN UPDATE stats SET total_miners = total_miners
+               + (NEW.is_miner_detected = 1) - (OLD.is_miner_detected = 1); END""",
+        # INSERT OR REPLACE does not fire delete triggers, so only count
+        # cache inserts for IPs that are not already present
+        """CREATE TRIGGER IF NOT EXISTS stats_geo_insert BEFORE INSERT ON geolocation_cache
+           WHEN NOT EXISTS (SELECT 1 FROM geolocation_cache WHERE ip_address = NEW.ip_address)
+           BEGIN UPDATE stats SET geolocation_cache_entries = geolocation_cache_entries + 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_geo_delete AFTER DELETE ON geolocation_cache
+           BEGIN UPDATE stats SET geolocation_cache_entries = geolocation_cache_entries - 1; END""",
+    )
     
     # Scan operations
     def create_scan(self, scan_name: str, cidr_range: str, notes: str = "") -> int:
@@ -276,19 +511,112 @@ class DatabaseManager:
             return [self._row_to_scan_record(row) for row in cursor.fetchall()]
     
     # Host operations
+    _INSERT_HOST_SQL = """INSERT INTO hosts 
+                   (scan_id, ip_address, is_responsive, ping_time_ms, open_ports,
+                    banner_info, is_miner_detected, miner_type, confidence_score)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    
+    @staticmethod
+    def _host_params(host: HostRecord) -> Tuple:
+        return (host.scan_id, host.ip_address, host.is_responsive,
+                host.ping_time_ms, host.open_ports, host.banner_info,
+                host.is_miner_detected, host.miner_type, host.confidence_score)
+    
+    _COUNT_HOSTS_SQL = """UPDATE stats SET total_hosts = total_hosts + ?,
+                                         total_miners = total_miners + ?"""
+    
     def add_host(self, host: HostRecord) -> int:
         """Add a host record."""
         with self._get_cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO hosts 
-                   (scan_id, ip_address, is_responsive, ping_time_ms, open_ports,
-                    banner_info, is_miner_detected, miner_type, confidence_score)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (host.scan_id, host.ip_address, host.is_responsive,
-                 host.ping_time_ms, host.open_ports, host.banner_info,
-                 host.is_miner_detected, host.miner_type, host.confidence_score)
-            )
-            return cursor.lastrowid
+            cursor.execute(self._INSERT_HOST_SQL, self._host_params(host))
+            host_id = cursor.lastrowid
+            cursor.execute(self._COUNT_HOSTS_SQL, (1, int(host.is_miner_detected == 1)))
+            return host_id
+    
+    def add_hosts_bulk(self, hosts: List[HostRecord], skip_failed: bool = False) -> int:
+        """
+        Add multiple host records in a single transaction.
+        
+        Args:
+            hosts: Host records to add
+            skip_failed: If the batch fails, insert the hosts one at a time
+                instead, logging and skipping the ones that still fail
+            
+        Returns:
+            Number of hosts added
+        """
+        if not hosts:
+            return 0
+        try:
+            with self._get_cursor() as cursor:
+                cursor.executemany(
+                    self._INSERT_HOST_SQL,
+                    [self._host_params(host) for host in hosts]
+                )
+                miners = sum(1 for host in hosts if host.is_miner_detected == 1)
+                cursor.execute(self._COUNT_HOSTS_SQL, (len(hosts), miners))
+                return len(hosts)
+        except Exception as e:
+            if not skip_failed:
+                raise
+            logger.warning(f"Bulk insert of {len(hosts)} hosts failed ({e}), "
+                           f"inserting them one at a time")
+        
+        added = 0
+        for host in hosts:
+            try:
+                self.add_host(host)
+                added += 1
+            except Exception as e:
+                logger.error(f"Failed to save host {host.ip_address}: {e}")
+        return added
+    
+    def import_hosts_csv(self, scan_id: int, csv_path: str) -> int:
+        """
+        Load hosts from a CSV report export into a scan.
+        
+        Rows are streamed from the file straight into one executemany in a
+        single transaction, under bulk_load(), without building HostRecords.
+        The file must have the header written by ReportGenerator.export_csv.
+        
+        Args:
+            scan_id: Scan the hosts are added to
+            csv_path: Path to the CSV file
+            
+        Returns:
+            Number of hosts imported
+        """
+        miners = 0
+        
+        def params(reader):
+            nonlocal miners
+            for row in reader:
+                is_miner = row['is_miner_detected'] == 'True'
+                miners += is_miner
+                yield (
+                    scan_id,
+                    row['ip_address'],
+                    row['is_responsive'] == 'True',
+                    float(row['ping_time_ms']) if row['ping_time_ms'] else None,
+                    row['open_ports'] or '[]',
+                    is_miner,
+                    row['miner_type'],
+                    float(row['confidence_score'] or 0),
+                    row.get('timestamp') or None,
+                )
+        
+        with open(csv_path, newline='', encoding='utf-8') as f, self.bulk_load():
+            with self._get_cursor() as cursor:
+                cursor.executemany(
+                    """INSERT INTO hosts 
+                       (scan_id, ip_address, is_responsive, ping_time_ms, open_ports,
+                        is_miner_detected, miner_type, confidence_score, timestamp)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(datetime(?), CURRENT_TIMESTAMP))""",
+                    params(csv.DictReader(f))
+                )
+                imported = cursor.rowcount
+                cursor.execute(self._COUNT_HOSTS_SQL, (imported, miners))
+                return imported
     
     def get_hosts_by_scan(self, scan_id: int, miners_only: bool = False) -> List[HostRecord]:
         """Get hosts for a scan."""
@@ -320,6 +648,52 @@ class DatabaseManager:
                 )
             return [self._row_to_host_record(row) for row in cursor.fetchall()]
     
+    def get_miner_hosts_with_geo(
+        self, scan_id: int
+    ) -> List[Tuple[HostRecord, Optional[GeolocationCache]]]:
+        """
+        Get a scan's miner hosts joined with their cached geolocation.
+        
+        Args:
+            scan_id: Scan to read miners from
+            
+        Returns:
+            List of (host, geolocation) pairs; geolocation is None when the
+            IP has no unexpired cache entry
+        """
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """SELECT h.*, g.id AS geo_id, g.country, g.country_code, g.region,
+                          g.city, g.latitude, g.longitude, g.isp, g.org,
+                          g.cached_at, g.ttl_hours
+                   FROM hosts h
+                   LEFT JOIN geolocation_cache g
+                     ON g.ip_address = h.ip_address
+                    AND datetime(g.cached_at, '+' || g.ttl_hours || ' hours') >= datetime('now')
+                   WHERE h.scan_id = ? AND h.is_miner_detected = 1""",
+                (scan_id,)
+            )
+            pairs = []
+            for row in cursor.fetchall():
+                geo = None
+                if row['geo_id'] is not None:
+                    geo = GeolocationCache(
+                        id=row['geo_id'],
+                        ip_address=row['ip_address'],
+                        country=row['country'],
+                        country_code=row['country_code'],
+                        region=row['region'],
+                        city=row['city'],
+                        latitude=row['latitude'],
+                        longitude=row['longitude'],
+                        isp=row['isp'],
+                        org=row['org'],
+                        cached_at=datetime.fromisoformat(row['cached_at']) if row['cached_at'] else None,
+                        ttl_hours=row['ttl_hours']
+                    )
+                pairs.append((self._row_to_host_record(row), geo))
+            return pairs
+    
     # Geolocation cache operations
     def get_geolocation(self, ip_address: str) -> Optional[GeolocationCache]:
         """Get cached geolocation for IP."""
@@ -335,6 +709,18 @@ class DatabaseManager:
                     return geo
             return None
     
+    def get_all_geolocations(self) -> Dict[str, GeolocationCache]:
+        """Get every unexpired cached geolocation, keyed by IP address."""
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """SELECT * FROM geolocation_cache 
+                   WHERE datetime(cached_at, '+' || ttl_hours || ' hours') >= datetime('now')"""
+            )
+            return {
+                row['ip_address']: self._row_to_geolocation_cache(row)
+                for row in cursor.fetchall()
+            }
+    
     def save_geolocation(self, geo: GeolocationCache) -> None:
         """Save or update geolocation cache."""
         with self._get_cursor() as cursor:
@@ -356,6 +742,86 @@ class DatabaseManager:
             )
             return cursor.rowcount
     
+    # VPN detection cache operations
+    # Keep IN (...) lists under SQLite's default bound-parameter limit
+    _VPN_CACHE_CHUNK = 500
+    
+    def get_vpn_results(self, ip_addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get unexpired cached VPN detection results (field dicts), keyed by IP."""
+        results = {}
+        now = time.time()
+        with self._get_cursor() as cursor:
+            for i in range(0, len(ip_addresses), self._VPN_CACHE_CHUNK):
+                chunk = ip_addresses[i:i + self._VPN_CACHE_CHUNK]
+                cursor.execute(
+                    f"""SELECT ip_address, result FROM vpn_cache 
+                        WHERE expires_at > ? AND ip_address IN ({','.join('?' * len(chunk))})""",
+                    [now, *chunk]
+                )
+                for ip_address, result in cursor.fetchall():
+                    results[ip_address] = json.loads(result)
+        return results
+    
+    def save_vpn_results(self, results: List[Dict[str, Any]], ttl_seconds: float) -> None:
+        """Save or update VPN detection results (field dicts with ip_address)."""
+        expires_at = time.time() + ttl_seconds
+        with self._get_cursor() as cursor:
+            cursor.executemany(
+                "INSERT OR REPLACE INTO vpn_cache (ip_address, result, expires_at) VALUES (?, ?, ?)",
+                [(r['ip_address'], json.dumps(r), expires_at) for r in results]
+            )
+    
+    def delete_vpn_results(self, ip_addresses: Optional[List[str]] = None) -> None:
+        """Remove cached VPN detection results for the given IPs, or all of them."""
+        with self._get_cursor() as cursor:
+            if ip_addresses is None:
+                cursor.execute("DELETE FROM vpn_cache")
+            else:
+                cursor.executemany(
+                    "DELETE FROM vpn_cache WHERE ip_address = ?",
+                    [(ip,) for ip in ip_addresses]
+                )
+    
+    # Scheduled scan execution operations
+    def add_scan_execution(self, execution: Dict[str, Any]) -> int:
+        """Add a scheduled scan execution record, given as a field dict."""
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                """INSERT INTO scan_executions 
+                   (schedule_id, schedule_name, execution_time, status, hosts_scanned,
+                    miners_detected, duration_seconds, error_message, scan_id)
+                   VALUES (:schedule_id, :schedule_name, :execution_time, :status,
+                           :hosts_scanned, :miners_detected, :duration_seconds,
+                           :error_message, :scan_id)""",
+                execution
+            )
+            return cursor.lastrowid
+    
+    def get_scan_executions(self, schedule_id: Optional[str] = None,
+                            limit: int = 100) -> List[Dict[str, Any]]:
+        """Get scheduled scan executions as field dicts, most recent first."""
+        with self._get_cursor() as cursor:
+            if schedule_id:
+                cursor.execute(
+                    """SELECT * FROM scan_executions WHERE schedule_id = ?
+                       ORDER BY execution_time DESC LIMIT ?""",
+                    (schedule_id, limit)
+                )
+            else:
+                cursor.execute(
+                    "SELECT * FROM scan_executions ORDER BY execution_time DESC LIMIT ?",
+                    (limit,)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_scan_execution_counts(self) -> Dict[str, int]:
+        """Count scheduled scan executions by status."""
+        with self._get_cursor() as cursor:
+            cursor.execute(
+                "SELECT status, COUNT(*) FROM scan_executions GROUP BY status"
+            )
+            return {status: count for status, count in cursor.fetchall()}
+    
     # Utility methods
     def delete_scan(self, scan_id: int) -> None:
         """Delete a scan and all associated hosts."""
@@ -365,24 +831,11 @@ class DatabaseManager:
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
         with self._get_cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) FROM scans")
-            total_scans = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM hosts")
-            total_hosts = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM hosts WHERE is_miner_detected = 1")
-            total_miners = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM geolocation_cache")
-            cache_entries = cursor.fetchone()[0]
-            
-            return {
-                "total_scans": total_scans,
-                "total_hosts": total_hosts,
-                "total_miners": total_miners,
-                "geolocation_cache_entries": cache_entries
-            }
+            cursor.execute(
+                """SELECT total_scans, total_hosts, total_miners, geolocation_cache_entries
+                   FROM stats WHERE id = 1"""
+            )
+            return dict(cursor.fetchone())
     
     # Row converters
     def _row_to_scan_record(self, row: sqlite3.Row) -> ScanRecord:
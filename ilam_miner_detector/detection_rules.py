@@ -3,15 +3,31 @@ Detection Rules Engine - YAML-based configuration for miner detection.
 Flexible, extensible rule system for identifying cryptocurrency mining activity.
 """
 
+import re
 import yaml
 import logging
-from typing import List, Dict, Optional, Any
+import functools
+from typing import List, Dict, Optional, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _compile_banner_patterns(patterns: Tuple[str, ...]):
+    """
+    Compile a rule's banner patterns into one alternation over the lowercased
+    literals, used to reject non-matching banners in a single scan.
+    
+    Returns:
+        Tuple of (compiled matcher, ((pattern, lowercased_pattern), ...))
+    """
+    lowered = tuple((pattern, pattern.lower()) for pattern in patterns)
+    matcher = re.compile('|'.join(re.escape(low) for _, low in lowered))
+    return matcher, lowered
+
+
 @dataclass
 class DetectionRule:
     """Represents a detection rule."""
@@ -245,6 +261,9 @@ rules:
     def __init__(self, config_path: Optional[str] = None):
         self.config_path = config_path or "config/detection_rules.yaml"
         self.rules: List[DetectionRule] = []
+        # Memoized evaluation keyed by (open ports, banner items); hosts in a
+        # segment often share identical fingerprints
+        self._evaluate_cached = functools.lru_cache(maxsize=16384)(self._evaluate_fingerprint)
         self._load_rules()
     
     def _load_rules(self) -> None:
@@ -273,6 +292,7 @@ rules:
     def _parse_rules(self, config: Dict[str, Any]) -> None:
         """Parse rules from configuration dictionary."""
         self.rules = []
+        self._evaluate_cached.cache_clear()
         
         if "rules" not in config:
             logger.warning("No rules found in configuration")
@@ -298,14 +318,15 @@ rules:
         """
         Evaluate scan result against all enabled rules.
         
+        Results are cached by open ports and banners, so hosts with the same
+        fingerprint share RuleMatch objects; treat them as read-only.
+        
         Args:
             scan_result: Host scan result with ports and banners
             
         Returns:
             List of RuleMatch objects for matched rules
         """
-        matches = []
-        
         # Get scan result data
         open_ports = []
         banners = {}
@@ -319,26 +340,41 @@ rules:
             open_ports = scan_result.get('open_ports', [])
             banners = scan_result.get('banners', {})
         
+        fingerprint = (tuple(open_ports), tuple(banners.items()))
+        try:
+            return list(self._evaluate_cached(fingerprint))
+        except TypeError:
+            # Unhashable port/banner values; evaluate without caching
+            return list(self._evaluate_fingerprint(fingerprint))
+    
+    def _evaluate_fingerprint(self, fingerprint: Tuple[tuple, tuple]) -> Tuple[RuleMatch, ...]:
+        """Evaluate all enabled rules for an (open ports, banner items) fingerprint."""
+        open_ports, banner_items = fingerprint
+        open_ports = list(open_ports)
+        # Lowercase banners once for all rules
+        banners = {port: str(banner).lower() for port, banner in banner_items}
+        matches = []
+        
         # Sort rules by priority (highest first)
         sorted_rules = sorted([r for r in self.rules if r.enabled], 
                               key=lambda r: r.priority, reverse=True)
         
         for rule in sorted_rules:
-            match = self._evaluate_rule(rule, open_ports, banners, scan_result)
+            match = self._evaluate_rule(rule, open_ports, banners)
             if match.matched:
                 matches.append(match)
         
-        return matches
+        return tuple(matches)
     
     def _evaluate_rule(self, rule: DetectionRule, open_ports: List[int], 
-                      banners: Dict[int, str], scan_result: Any) -> RuleMatch:
+                      banners: Dict[int, str], scan_result: Any = None) -> RuleMatch:
         """
         Evaluate a single rule against scan result.
         
         Args:
             rule: Detection rule to evaluate
             open_ports: List of open ports
-            banners: Dictionary of port -> banner
+            banners: Dictionary of port -> lowercased banner
             scan_result: Full scan result
             
         Returns:
@@ -368,13 +404,14 @@ rules:
         
         # Check banner pattern conditions
         if 'banner_patterns' in conditions:
-            patterns = conditions['banner_patterns']
+            matcher, patterns = _compile_banner_patterns(tuple(conditions['banner_patterns']))
             banner_matches = []
             
-            for port, banner in banners.items():
-                banner_str = str(banner).lower()
-                for pattern in patterns:
-                    if pattern.lower() in banner_str:
+            for port, banner_str in banners.items():
+                if not matcher.search(banner_str):
+                    continue
+                for pattern, lowered in patterns:
+                    if lowered in banner_str:
                         banner_matches.append((port, pattern))
             
             if banner_matches:
@@ -457,6 +494,7 @@ rules:
         for rule in self.rules:
             if rule.name == rule_name:
                 rule.enabled = False
+                self._evaluate_cached.cache_clear()
                 return True
         return False
     
@@ -465,6 +503,7 @@ rules:
         for rule in self.rules:
             if rule.name == rule_name:
                 rule.enabled = True
+                self._evaluate_cached.cache_clear()
                 return True
         return False
     
@@ -163,11 +163,10 @@ class EnhancedReportGenerator:
             
             miner_data = [["IP Address", "Type", "Confidence", "Open Ports"]]
             for miner in miners:
-                import json
                 try:
-                    ports = json.loads(miner.open_ports) if miner.open_ports else []
+                    ports = miner.ports
                 except:
-                    ports = []
+                    ports = ()
                 
                 miner_data.append([
                     miner.ip_address,
@@ -354,10 +353,9 @@ class EnhancedReportGenerator:
             cell.fill = PatternFill(start_color="D32F2F", end_color="D32F2F", fill_type="solid")
         
         # Data rows
-        import json
         for row_idx, miner in enumerate(miners, start=2):
             try:
-                ports = json.loads(miner.open_ports) if miner.open_ports else []
+                ports = miner.ports
                 ports_str = ", ".join(str(p) for p in ports)
             except:
                 ports_str = ""
@@ -392,12 +390,11 @@ class EnhancedReportGenerator:
             cell.fill = PatternFill(start_color="333333", end_color="333333", fill_type="solid")
         
         # Data rows
-        import json
         for row_idx, host in enumerate(hosts, start=2):
             try:
-                ports = json.loads(host.open_ports) if host.open_ports else []
+                ports = host.ports
             except:
-                ports = []
+                ports = ()
             
             ws.cell(row=row_idx, column=1, value=host.ip_address)
             ws.cell(row=row_idx, column=2, value="Yes" if host.is_responsive else "No")
@@ -7,8 +7,9 @@ import time
 import json
 import logging
 import requests
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from collections import deque
+from typing import Optional, Dict, Any, Tuple, Iterator, List
+from dataclasses import dataclass, replace
 from datetime import datetime
 from threading import Lock
 
@@ -94,6 +95,13 @@ class GeolocationService:
     Fallback: ipinfo.io (requires token)
     """
     
+    # ip-api.com batch endpoint: up to 100 IPs per request, 15 requests/min
+    IPAPI_BATCH_URL = "http://ip-api.com/batch"
+    IPAPI_BATCH_SIZE = 100
+    IPAPI_BATCH_RATE_LIMIT = 15
+    
+    _LOCAL_ADDRESSES = frozenset(['127.0.0.1', 'localhost', '0.0.0.0'])
+    
     def __init__(self):
         self.config = get_config_manager().get()
         self.db = get_db_manager()
@@ -104,11 +112,42 @@ class GeolocationService:
             self.config.geolocation.rate_limit_per_minute,
             time_window=60
         )
+        self.batch_rate_limiter = RateLimiter(self.IPAPI_BATCH_RATE_LIMIT, time_window=60)
         
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'IlamMinerDetector/1.0 (Security Research Tool)'
         })
+        
+        # In-memory copy of the cache table, filled by preload_cache()
+        self._preloaded: Dict[str, GeolocationCache] = {}
+        # /24 prefix -> (expiry, result) for answering neighbouring IPs
+        self._subnet_cache: Dict[str, Tuple[float, GeolocationResult]] = {}
+    
+    def preload_cache(self) -> int:
+        """
+        Load all unexpired cache entries into memory.
+        
+        Subsequent cached lookups become a dictionary probe instead of a
+        database query per IP.
+        
+        Returns:
+            Number of entries loaded
+        """
+        if not self.config.geolocation.cache_enabled:
+            return 0
+        
+        try:
+            self._preloaded = self.db.get_all_geolocations()
+        except Exception as e:
+            logger.warning(f"Failed to preload geolocation cache: {e}")
+            return 0
+        
+        for cached in self._preloaded.values():
+            self._cache_subnet(self.cache_to_result(cached))
+        
+        logger.debug(f"Preloaded {len(self._preloaded)} geolocation cache entries")
+        return len(self._preloaded)
     
     def lookup(self, ip_address: str, use_cache: bool = True) -> GeolocationResult:
         """
@@ -124,30 +163,25 @@ class GeolocationService:
         result = GeolocationResult(ip_address=ip_address)
         
         # Validate IP
-        if ip_address in ['127.0.0.1', 'localhost', '0.0.0.0']:
+        if ip_address in self._LOCAL_ADDRESSES:
             result.error = "Cannot geolocate local IP"
             return result
         
         # Check cache first
-        if use_cache and self.config.geolocation.cache_enabled:
-            cached = self.db.get_geolocation(ip_address)
-            if cached:
-                result = self._cache_to_result(cached)
-                result.success = True
-                logger.debug(f"Cache hit for {ip_address}")
-                return result
+        if use_cache:
+            cached = self._lookup_cached(ip_address)
+            if cached is not None:
+                return cached
         
         # Rate limit check
-        if not self.rate_limiter.acquire():
-            wait_time = self.rate_limiter.get_wait_time()
-            logger.warning(f"Rate limit hit, waiting {wait_time:.1f}s")
-            time.sleep(wait_time)
+        self._wait_for_token(self.rate_limiter)
         
         # Try primary provider
         try:
             result = self._lookup_ipapi(ip_address)
             if result.success:
                 self._cache_result(result)
+                self._cache_subnet(result)
                 return result
         except Exception as e:
             logger.warning(f"ip-api.com failed for {ip_address}: {e}")
@@ -158,6 +192,7 @@ class GeolocationService:
                 result = self._lookup_ipinfo(ip_address)
                 if result.success:
                     self._cache_result(result)
+                    self._cache_subnet(result)
                     return result
             except Exception as e:
                 logger.warning(f"ipinfo.io failed for {ip_address}: {e}")
@@ -177,20 +212,125 @@ class GeolocationService:
             Dictionary mapping IP to GeolocationResult
         """
         results = {}
-        total = len(ip_addresses)
+        # Duplicates are looked up once, so progress counts unique IPs
+        unique = list(dict.fromkeys(ip_addresses))
+        total = len(unique)
         
-        for i, ip in enumerate(ip_addresses):
-            results[ip] = self.lookup(ip)
+        for i, (ip, result) in enumerate(self.iter_lookup(unique)):
+            results[ip] = result
             
             if progress_callback:
                 progress_callback(i + 1, total)
+        
+        return {ip: results[ip] for ip in ip_addresses}
+    
+    def iter_lookup(self, ip_addresses: list) -> Iterator[Tuple[str, GeolocationResult]]:
+        """
+        Lookup multiple IPs, yielding each result as soon as it is known.
+        
+        Cached answers come first; the remaining IPs are resolved through
+        the ip-api.com batch endpoint, one request per 100 addresses,
+        falling back to single lookups if a batch request fails.
+        
+        Args:
+            ip_addresses: List of IP addresses
             
-            # Small delay to respect rate limits
-            if (i + 1) % self.config.geolocation.rate_limit_per_minute == 0:
-                logger.info("Rate limit approached, pausing for 60 seconds...")
-                time.sleep(60)
+        Yields:
+            (ip, GeolocationResult) pairs, not necessarily in input order
+        """
+        pending = []
+        for ip in dict.fromkeys(ip_addresses):
+            if ip in self._LOCAL_ADDRESSES:
+                yield ip, self.lookup(ip)
+                continue
+            cached = self._lookup_cached(ip)
+            if cached is not None:
+                yield ip, cached
+            else:
+                pending.append(ip)
         
-        return results
+        queue = deque(pending)
+        # /24s whose looked-up address failed; their other IPs are not deferred
+        failed_subnets = set()
+        while queue:
+            chunk, deferred, subnets = [], [], set()
+            while queue and len(chunk) < self.IPAPI_BATCH_SIZE:
+                ip = queue.popleft()
+                # Earlier batches may have covered this address's /24
+                subnet_result = self._lookup_subnet(ip)
+                if subnet_result is not None:
+                    yield ip, subnet_result
+                    continue
+                # One address per /24 is enough when subnet caching is on
+                key = self._subnet_key(ip) if self.config.geolocation.cache_by_subnet else None
+                if key in subnets and key not in failed_subnets:
+                    deferred.append(ip)
+                    continue
+                if key:
+                    subnets.add(key)
+                chunk.append(ip)
+            
+            if not chunk:
+                continue
+            for ip, result in self._resolve_batch(chunk):
+                if not result.success:
+                    failed_subnets.add(self._subnet_key(ip))
+                yield ip, result
+            queue.extendleft(reversed(deferred))
+    
+    def _resolve_batch(self, ip_addresses: List[str]) -> Iterator[Tuple[str, GeolocationResult]]:
+        """Lookup a batch of uncached IPs, caching each successful result."""
+        self._wait_for_token(self.batch_rate_limiter)
+        try:
+            batch = self._lookup_ipapi_batch(ip_addresses)
+        except Exception as e:
+            logger.warning(f"ip-api.com batch lookup failed, using single lookups: {e}")
+            for ip in ip_addresses:
+                yield ip, self.lookup(ip, use_cache=False)
+            return
+        
+        for ip in ip_addresses:
+            result = batch[ip]
+            if not result.success and self.config.geolocation.ipinfo_token:
+                try:
+                    result = self._lookup_ipinfo(ip)
+                except Exception as e:
+                    logger.warning(f"ipinfo.io failed for {ip}: {e}")
+            if result.success:
+                self._cache_result(result)
+                self._cache_subnet(result)
+            yield ip, result
+    
+    def _lookup_cached(self, ip_address: str) -> Optional[GeolocationResult]:
+        """Answer from the IP or /24 cache, or None on a miss."""
+        if not self.config.geolocation.cache_enabled:
+            return None
+        
+        cached = self._preloaded.get(ip_address)
+        if cached is None or cached.is_expired:
+            cached = self.db.get_geolocation(ip_address)
+        if cached:
+            result = self.cache_to_result(cached)
+            result.success = True
+            logger.debug("Cache hit for %s", ip_address)
+            self._cache_subnet(result)
+            return result
+        
+        # Neighbouring addresses almost always share a location
+        subnet_result = self._lookup_subnet(ip_address)
+        if subnet_result is not None:
+            logger.debug("Subnet cache hit for %s", ip_address)
+        return subnet_result
+    
+    @staticmethod
+    def _wait_for_token(limiter: RateLimiter) -> None:
+        """Block until the rate limiter hands out a token."""
+        # Other threads may take the token that frees up while sleeping,
+        # so only an actual acquire ends the wait
+        while not limiter.acquire():
+            wait_time = limiter.get_wait_time()
+            logger.warning(f"Rate limit hit, waiting {wait_time:.1f}s")
+            time.sleep(wait_time)
     
     def _lookup_ipapi(self, ip_address: str) -> GeolocationResult:
         """Lookup using ip-api.com (free, no API key)."""
@@ -204,27 +344,55 @@ class GeolocationService:
                 timeout=self.config.geolocation.request_timeout
             )
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') == 'success':
-                result.country = data.get('country', '')
-                result.country_code = data.get('countryCode', '')
-                result.region = data.get('regionName', '')
-                result.city = data.get('city', '')
-                result.latitude = data.get('lat', 0.0)
-                result.longitude = data.get('lon', 0.0)
-                result.isp = data.get('isp', '')
-                result.org = data.get('org', '')
-                result.success = True
-                result.is_in_ilam = self._check_ilam_region(result.latitude, result.longitude)
-            else:
-                result.error = data.get('message', 'Unknown error')
+            self._parse_ipapi(response.json(), result)
                 
         except requests.RequestException as e:
             result.error = f"Request failed: {str(e)}"
         
         return result
     
+    def _lookup_ipapi_batch(self, ip_addresses: List[str]) -> Dict[str, GeolocationResult]:
+        """
+        Lookup up to IPAPI_BATCH_SIZE IPs with one ip-api.com batch request.
+        
+        Raises:
+            requests.RequestException: If the request itself fails
+            ValueError: If the response is not a list of per-IP answers
+        """
+        response = self.session.post(
+            self.IPAPI_BATCH_URL,
+            json=ip_addresses,
+            timeout=self.config.geolocation.request_timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not isinstance(data, list) or len(data) != len(ip_addresses):
+            raise ValueError("Unexpected batch response")
+        
+        results = {}
+        # Answers come back in request order
+        for ip, entry in zip(ip_addresses, data):
+            result = GeolocationResult(ip_address=ip)
+            self._parse_ipapi(entry, result)
+            results[ip] = result
+        return results
+    
+    def _parse_ipapi(self, data: Dict[str, Any], result: GeolocationResult) -> None:
+        """Fill a result from one ip-api.com answer."""
+        if data.get('status') == 'success':
+            result.country = data.get('country', '')
+            result.country_code = data.get('countryCode', '')
+            result.region = data.get('regionName', '')
+            result.city = data.get('city', '')
+            result.latitude = data.get('lat', 0.0)
+            result.longitude = data.get('lon', 0.0)
+            result.isp = data.get('isp', '')
+            result.org = data.get('org', '')
+            result.success = True
+            result.is_in_ilam = self._check_ilam_region(result.latitude, result.longitude)
+        else:
+            result.error = data.get('message', 'Unknown error')
+    
     def _lookup_ipinfo(self, ip_address: str) -> GeolocationResult:
         """Lookup using ipinfo.io (requires token)."""
         result = GeolocationResult(ip_address=ip_address)
@@ -294,10 +462,41 @@ class GeolocationService:
         
         try:
             self.db.save_geolocation(cache_entry)
+            if self._preloaded:
+                cache_entry.cached_at = datetime.now()
+                self._preloaded[result.ip_address] = cache_entry
         except Exception as e:
             logger.warning(f"Failed to cache geolocation: {e}")
     
-    def _cache_to_result(self, cache: GeolocationCache) -> GeolocationResult:
+    @staticmethod
+    def _subnet_key(ip_address: str) -> Optional[str]:
+        """The /24 prefix of a dotted-quad address, or None for other addresses."""
+        prefix, dot, _ = ip_address.rpartition('.')
+        return prefix if dot and ':' not in prefix else None
+    
+    def _lookup_subnet(self, ip_address: str) -> Optional[GeolocationResult]:
+        """Answer from a cached result for another address in the same /24."""
+        if not self.config.geolocation.cache_by_subnet:
+            return None
+        key = self._subnet_key(ip_address)
+        entry = self._subnet_cache.get(key) if key else None
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._subnet_cache.pop(key, None)
+            return None
+        return replace(entry[1], ip_address=ip_address)
+    
+    def _cache_subnet(self, result: GeolocationResult) -> None:
+        """Remember a successful result for the rest of its /24."""
+        if not self.config.geolocation.cache_by_subnet:
+            return
+        key = self._subnet_key(result.ip_address)
+        if key:
+            ttl = self.config.geolocation.cache_ttl_hours * 3600
+            self._subnet_cache[key] = (time.monotonic() + ttl, result)
+    
+    def cache_to_result(self, cache: GeolocationCache) -> GeolocationResult:
         """Convert cache entry to result."""
         return GeolocationResult(
             ip_address=cache.ip_address,
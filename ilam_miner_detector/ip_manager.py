@@ -3,14 +3,24 @@ IP address management for Ilam Miner Detector.
 Handles CIDR notation, range generation, and filtering.
 """
 
+import functools
 import ipaddress
 import socket
-from typing import List, Iterator, Optional, Tuple, Set
+import struct
+import time
+from typing import Dict, List, Iterator, Optional, Tuple, Set
 from dataclasses import dataclass
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bounded cache of address objects parsed from user-supplied strings, which
+# repeat (e.g. validating an input field on every edit). Range sweeps never
+# revisit an address, so they build IPv4Address objects directly.
+_ipv4 = functools.lru_cache(maxsize=65536)(ipaddress.IPv4Address)
+
+_UINT32 = struct.Struct('!I')
+
 
 @dataclass
 class IPRangeInfo:
@@ -36,9 +46,15 @@ class IPManager:
         ipaddress.IPv4Network("169.254.0.0/16"),  # Link-local
     ]
     
+    # Seconds a hostname resolution (including a failed one) is reused
+    RESOLVE_TTL = 900.0
+    
     def __init__(self):
         self._exclude_private = False
         self._excluded_networks: Set[ipaddress.IPv4Network] = set()
+        self._exclusion_dirty = False
+        # hostname -> (expiry, ip or None)
+        self._resolve_cache: Dict[str, Tuple[float, Optional[str]]] = {}
     
     def parse_cidr(self, cidr: str) -> IPRangeInfo:
         """
@@ -55,13 +71,14 @@ class IPManager:
         """
         try:
             network = ipaddress.IPv4Network(cidr, strict=False)
-            hosts = list(network.hosts())
+            # Count and index the hosts without enumerating them
+            hosts = self._host_range(network)
             
             return IPRangeInfo(
                 network=network,
                 total_hosts=len(hosts),
-                first_ip=hosts[0] if hosts else network.network_address,
-                last_ip=hosts[-1] if hosts else network.broadcast_address,
+                first_ip=ipaddress.IPv4Address(hosts[0]) if hosts else network.network_address,
+                last_ip=ipaddress.IPv4Address(hosts[-1]) if hosts else network.broadcast_address,
                 is_private=self.is_private_ip(network.network_address)
             )
         except ValueError as e:
@@ -86,13 +103,10 @@ class IPManager:
             try:
                 if '/' in item:
                     # CIDR notation
-                    network = ipaddress.IPv4Network(item, strict=False)
-                    for host in network.hosts():
-                        if not self._should_exclude(host):
-                            ips.add(host)
+                    ips.update(self.generate_from_cidr(item))
                 else:
                     # Single IP
-                    ip = ipaddress.IPv4Address(item)
+                    ip = _ipv4(item)
                     if not self._should_exclude(ip):
                         ips.add(ip)
             except ValueError as e:
@@ -143,11 +157,72 @@ class IPManager:
         """
         try:
             network = ipaddress.IPv4Network(cidr, strict=False)
-            for host in network.hosts():
-                if not self._should_exclude(host):
-                    yield host
         except ValueError as e:
             raise ValueError(f"Invalid CIDR: {cidr}") from e
+        
+        for value in self._host_range(network):
+            host = ipaddress.IPv4Address(value)
+            if not self._should_exclude(host):
+                yield host
+    
+    def generate_host_strings(self, cidr: str) -> Iterator[str]:
+        """
+        Generate all host IPs from a CIDR range as dotted-quad strings.
+        
+        Hosts are expanded as plain integers and formatted directly, without
+        building IPv4Address objects, unless exclusions are configured.
+        
+        Args:
+            cidr: CIDR notation (e.g., "192.168.1.0/24")
+            
+        Yields:
+            IP address strings
+        """
+        pack = _UINT32.pack
+        ntoa = socket.inet_ntoa
+        
+        if self._exclude_private or self._excluded_networks:
+            for host in self.generate_from_cidr(cidr):
+                yield ntoa(pack(int(host)))
+            return
+        
+        try:
+            network = ipaddress.IPv4Network(cidr, strict=False)
+        except ValueError as e:
+            raise ValueError(f"Invalid CIDR: {cidr}") from e
+        
+        for value in self._host_range(network):
+            yield ntoa(pack(value))
+    
+    def count_hosts(self, cidr: str) -> int:
+        """
+        Count the usable host IPs in a CIDR range without enumerating them.
+        
+        Configured exclusions are not subtracted, so this is an upper bound
+        on what generate_from_cidr() yields when exclusions are set.
+        
+        Args:
+            cidr: CIDR notation (e.g., "192.168.1.0/24")
+            
+        Returns:
+            Number of usable host addresses
+        """
+        try:
+            network = ipaddress.IPv4Network(cidr, strict=False)
+        except ValueError as e:
+            raise ValueError(f"Invalid CIDR: {cidr}") from e
+        return len(self._host_range(network))
+    
+    @staticmethod
+    def _host_range(network: ipaddress.IPv4Network) -> range:
+        """Integer range of usable host addresses, matching network.hosts()."""
+        first = int(network.network_address)
+        last = int(network.broadcast_address)
+        if network.prefixlen < 31:
+            # Skip network and broadcast addresses
+            first += 1
+            last -= 1
+        return range(first, last + 1)
     
     def is_private_ip(self, ip: ipaddress.IPv4Address) -> bool:
         """Check if an IP is in a private range."""
@@ -183,6 +258,7 @@ class IPManager:
         try:
             network = ipaddress.IPv4Network(cidr, strict=False)
             self._excluded_networks.add(network)
+            self._exclusion_dirty = True
         except ValueError as e:
             logger.warning(f"Invalid excluded network: {cidr} - {e}")
         return self
@@ -192,6 +268,13 @@ class IPManager:
         if self._exclude_private and self.is_private_ip(ip):
             return True
         
+        if self._exclusion_dirty:
+            # Merge overlapping/adjacent exclusions so each IP checks fewer networks
+            self._excluded_networks = set(
+                ipaddress.collapse_addresses(self._excluded_networks)
+            )
+            self._exclusion_dirty = False
+        
         for network in self._excluded_networks:
             if ip in network:
                 return True
@@ -201,7 +284,8 @@ class IPManager:
     def validate_ip(self, ip_str: str) -> bool:
         """Validate if a string is a valid IPv4 address."""
         try:
-            ipaddress.IPv4Address(ip_str)
+            # Parsed through the shared address cache; repeats skip parsing
+            _ipv4(ip_str)
             return True
         except ValueError:
             return False
@@ -218,16 +302,27 @@ class IPManager:
         """
         Resolve a hostname to an IP address.
         
+        Results are cached for RESOLVE_TTL seconds, so repeated lookups of
+        the same name do not each block on a DNS query.
+        
         Args:
             hostname: Hostname to resolve
             
         Returns:
             IP address string or None if resolution fails
         """
+        now = time.monotonic()
+        entry = self._resolve_cache.get(hostname)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        
         try:
-            return socket.gethostbyname(hostname)
+            ip = socket.gethostbyname(hostname)
         except socket.gaierror:
-            return None
+            ip = None
+        
+        self._resolve_cache[hostname] = (now + self.RESOLVE_TTL, ip)
+        return ip
     
     def get_network_info(self, cidr: str) -> dict:
         """
@@ -240,14 +335,14 @@ class IPManager:
             Dictionary with network information
         """
         network = ipaddress.IPv4Network(cidr, strict=False)
-        hosts = list(network.hosts())
+        hosts = self._host_range(network)
         
         return {
             "network": str(network),
             "netmask": str(network.netmask),
             "broadcast": str(network.broadcast_address),
-            "first_host": str(hosts[0]) if hosts else None,
-            "last_host": str(hosts[-1]) if hosts else None,
+            "first_host": str(ipaddress.IPv4Address(hosts[0])) if hosts else None,
+            "last_host": str(ipaddress.IPv4Address(hosts[-1])) if hosts else None,
             "total_hosts": len(hosts),
             "is_private": network.is_private,
         }
@@ -265,10 +360,10 @@ class IPManager:
         Returns:
             Tuple of (estimated_seconds, human_readable_string)
         """
-        info = self.parse_cidr(cidr)
+        total_hosts = self.count_hosts(cidr)
         
         # Calculate batches
-        batches = (info.total_hosts + concurrency - 1) // concurrency
+        batches = (total_hosts + concurrency - 1) // concurrency
         estimated_seconds = int(batches * timeout_per_host)
         
         # Format human readable
@@ -4,7 +4,7 @@ Complete geographic coverage for the Iranian Network Miner Detection System.
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Tuple
 
 @dataclass
 class City:
@@ -603,16 +603,34 @@ def get_province_by_coordinates(latitude: float, longitude: float,
     This is approximate; for production, use proper point-in-polygon algorithms.
     """
     best_match = None
-    min_distance = float('inf')
+    # Compare squared Euclidean distances (local approximation) so no sqrt is
+    # needed; starting at tolerance^2 also enforces the tolerance bound
+    min_distance_sq = tolerance * tolerance
     
     for province in IRANIAN_PROVINCES:
-        # Calculate distance using Haversine formula (simplified to Euclidean for local)
-        lat_diff = abs(latitude - province.latitude)
-        lon_diff = abs(longitude - province.longitude)
-        distance = (lat_diff ** 2 + lon_diff ** 2) ** 0.5
+        lat_diff = latitude - province.latitude
+        lon_diff = longitude - province.longitude
+        distance_sq = lat_diff * lat_diff + lon_diff * lon_diff
         
-        if distance < tolerance and distance < min_distance:
-            min_distance = distance
+        if distance_sq < min_distance_sq:
+            min_distance_sq = distance_sq
             best_match = province
     
     return best_match
+
+
+def get_provinces_by_coordinates(coordinates: Iterable[Tuple[float, float]],
+                                 tolerance: float = 0.5) -> List[Optional[Province]]:
+    """
+    Batch version of get_province_by_coordinates.
+    Geolocation results are city-level, so many hosts share coordinates;
+    each distinct (latitude, longitude) pair is resolved only once.
+    """
+    resolved: Dict[Tuple[float, float], Optional[Province]] = {}
+    results = []
+    for latitude, longitude in coordinates:
+        key = (latitude, longitude)
+        if key not in resolved:
+            resolved[key] = get_province_by_coordinates(latitude, longitude, tolerance)
+        results.append(resolved[key])
+    return results
@@ -3,10 +3,16 @@ Iranian ISP data - IP ranges and network information.
 Complete ISP coverage for the Iranian Network Miner Detection System.
 """
 
+import bisect
+import heapq
+import socket
+import struct
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
 from ipaddress import ip_network, ip_address, IPv4Network
 
+_UINT32 = struct.Struct('!I')
+
 @dataclass
 class ISPInfo:
     """Represents an Iranian ISP with network ranges."""
@@ -843,18 +849,93 @@ def get_isp_by_name(name: str) -> Optional[ISPInfo]:
     return None
 
 
-def identify_isp(ip_address: str) -> Optional[ISPInfo]:
-    """Identify which ISP owns an IP address."""
+def ip_to_int(ip: str) -> Optional[int]:
+    """Parse a dotted-quad IPv4 string to an integer, or None if invalid."""
     try:
-        ip = ip_address(ip_address)
-    except ValueError:
+        return _UINT32.unpack(socket.inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, TypeError):
         return None
-    
-    for isp in IRANIAN_ISPS:
+
+
+# Sorted, non-overlapping (starts, ends, owners) ranges; built on first lookup
+_isp_index: Optional[Tuple[List[int], List[int], List[ISPInfo]]] = None
+
+
+def _build_isp_index() -> Tuple[List[int], List[int], List[ISPInfo]]:
+    """
+    Flatten all ISP networks into disjoint integer ranges.
+    Where ranges overlap, the ISP listed first in IRANIAN_ISPS wins.
+    """
+    intervals = []
+    for order, isp in enumerate(IRANIAN_ISPS):
         for network in isp.networks:
-            if ip in network:
-                return isp
+            intervals.append((int(network.network_address),
+                              int(network.broadcast_address), order))
+    intervals.sort()
+    
+    points = sorted({start for start, _, _ in intervals} |
+                    {end + 1 for _, end, _ in intervals})
+    starts: List[int] = []
+    ends: List[int] = []
+    owners: List[ISPInfo] = []
+    active: List[Tuple[int, int]] = []  # heap of (order, end)
+    i = 0
     
+    for point, next_point in zip(points, points[1:]):
+        while i < len(intervals) and intervals[i][0] <= point:
+            heapq.heappush(active, (intervals[i][2], intervals[i][1]))
+            i += 1
+        while active and active[0][1] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+        
+        owner = IRANIAN_ISPS[active[0][0]]
+        if owners and owners[-1] is owner and ends[-1] == point - 1:
+            ends[-1] = next_point - 1
+        else:
+            starts.append(point)
+            ends.append(next_point - 1)
+            owners.append(owner)
+    
+    return starts, ends, owners
+
+
+def _get_isp_index() -> Tuple[List[int], List[int], List[ISPInfo]]:
+    global _isp_index
+    if _isp_index is None:
+        _isp_index = _build_isp_index()
+    return _isp_index
+
+
+def identify_isp(ip_address: str) -> Optional[ISPInfo]:
+    """Identify which ISP owns an IP address."""
+    return identify_isps([ip_address])[0]
+
+
+def identify_isps(ip_addresses: List[str]) -> List[Optional[ISPInfo]]:
+    """Identify the owning ISP for each of a batch of IP addresses."""
+    starts, ends, owners = _get_isp_index()
+    search = bisect.bisect_right
+    
+    results: List[Optional[ISPInfo]] = []
+    for ip in ip_addresses:
+        value = ip_to_int(ip)
+        owner = None
+        if value is not None:
+            idx = search(starts, value) - 1
+            if idx >= 0 and value <= ends[idx]:
+                owner = owners[idx]
+        results.append(owner)
+    return results
+
+
+def identify_isp_by_int(value: int) -> Optional[ISPInfo]:
+    """Identify which ISP owns an IPv4 address given as an integer."""
+    starts, ends, owners = _get_isp_index()
+    idx = bisect.bisect_right(starts, value) - 1
+    if idx >= 0 and value <= ends[idx]:
+        return owners[idx]
     return None
 
 
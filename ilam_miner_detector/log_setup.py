@@ -0,0 +1,68 @@
+"""
+Logging setup shared by the Ilam Miner Detector entry points.
+Output handlers run on a background listener thread behind a queue.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+from pathlib import Path
+from typing import Optional
+
+# Log file rotation: size of each file and number of old files kept
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def start_queue_logging(*handlers: logging.Handler,
+                        level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Route root logger output to handlers through a queue.
+
+    Records are only enqueued by the logging call; formatting and output
+    happen on a background listener thread, which is drained and stopped
+    at exit. Each handler's own level is respected.
+
+    Args:
+        handlers: Output handlers, already configured with formatters
+        level: Root logger level
+
+    Returns:
+        The started queue listener
+    """
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
+
+
+def setup_logging(log_file: Optional[str] = None, log_level: str = "INFO"):
+    """
+    Setup console and optional rotating file logging for the CLIs.
+
+    Args:
+        log_file: Log file path, or None for console only
+        log_level: Level name, e.g. "INFO"
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    start_queue_logging(*handlers, level=getattr(logging, log_level.upper()))
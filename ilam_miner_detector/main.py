@@ -22,32 +22,17 @@ from datetime import datetime
 # Add package to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+# Heavier modules are imported by the command handlers that need them
 from config_manager import get_config_manager
-from database import get_db_manager
-from network_scanner import get_network_scanner
-from ip_manager import get_ip_manager
-from geolocation import get_geolocation_service
-from reporter import get_report_generator
-from map_generator import get_map_generator
-
-
-def setup_logging(log_file: str = None, log_level: str = "INFO"):
-    """Setup logging configuration."""
-    handlers = [logging.StreamHandler()]
-    
-    if log_file:
-        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
-        handlers.append(logging.FileHandler(log_file))
-    
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
-    )
+from database import get_db_manager, HostRecord, encode_port_info
+from log_setup import setup_logging
 
 
 def cli_scan(args):
     """Run scan in CLI mode."""
+    from network_scanner import get_network_scanner
+    from ip_manager import get_ip_manager
+    
     config = get_config_manager().get()
     db = get_db_manager()
     scanner = get_network_scanner()
@@ -79,26 +64,27 @@ def cli_scan(args):
     
     logger.info(f"Scanning ports: {ports}")
     
+    def log_progress(current: int, total: int, status: str):
+        # Log about every 0.1% of hosts (plus the last) to bound log volume
+        if current % max(1, total // 1000) and current != total:
+            return
+        logger.info("Progress: %d/%d - %s", current, total, status)
+    
     async def run_scan():
         results = await scanner.scan_range(
-            ip_manager.generate_from_cidr(args.cidr),
+            ip_manager.generate_host_strings(args.cidr),
             ports,
-            progress_callback=lambda c, t, s: logger.info(f"Progress: {c}/{t} - {s}")
+            progress_callback=log_progress,
+            total=ip_manager.count_hosts(args.cidr)
         )
         return results
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        results = loop.run_until_complete(run_scan())
-    finally:
-        loop.close()
+    results = asyncio.run(run_scan())
     
     # Process results
-    import json
     responsive = 0
     miners = 0
+    host_records = []
     
     for result in results:
         if result.is_responsive:
@@ -107,28 +93,30 @@ def cli_scan(args):
             miners += 1
             logger.warning(f"MINER DETECTED: {result.ip_address} ({result.miner_type}) - {result.confidence_score:.1f}% confidence")
         
-        # Save to DB
-        host_record = type('HostRecord', (), {
-            'scan_id': scan_id,
-            'ip_address': result.ip_address,
-            'is_responsive': result.is_responsive,
-            'ping_time_ms': result.ping_time_ms,
-            'open_ports': json.dumps([p.port for p in result.open_ports]),
-            'banner_info': json.dumps({p.port: p.banner for p in result.open_ports}),
-            'is_miner_detected': result.is_miner_detected,
-            'miner_type': result.miner_type,
-            'confidence_score': result.confidence_score
-        })
-        db.add_host(host_record)
-    
-    # Update final stats
-    db.update_scan_stats(scan_id, responsive_hosts=responsive, miners_detected=miners)
-    db.update_scan_status(scan_id, "completed")
+        open_ports_json, banner_info_json = encode_port_info(result.open_ports)
+        host_records.append(HostRecord(
+            scan_id=scan_id,
+            ip_address=result.ip_address,
+            is_responsive=result.is_responsive,
+            ping_time_ms=result.ping_time_ms,
+            open_ports=open_ports_json,
+            banner_info=banner_info_json,
+            is_miner_detected=result.is_miner_detected,
+            miner_type=result.miner_type,
+            confidence_score=result.confidence_score
+        ))
+    
+    # Save all hosts and the final stats in one transaction
+    with db.transaction():
+        db.add_hosts_bulk(host_records)
+        db.update_scan_stats(scan_id, responsive_hosts=responsive, miners_detected=miners)
+        db.update_scan_status(scan_id, "completed")
     
     logger.info(f"Scan complete: {responsive} responsive, {miners} miners detected")
     
     # Generate reports
     if args.export:
+        from reporter import get_report_generator
         reporter = get_report_generator()
         reports = reporter.generate_all_reports(scan_id)
         for fmt, path in reports.items():
@@ -137,7 +125,11 @@ def cli_scan(args):
     # Generate map
     if args.map and miners > 0:
         try:
+            from geolocation import get_geolocation_service
+            from map_generator import get_map_generator
+            
             geo_service = get_geolocation_service()
+            geo_service.preload_cache()
             map_gen = get_map_generator()
             
             miner_hosts = db.get_miner_hosts(scan_id)
@@ -156,7 +148,7 @@ def cli_scan(args):
                         'region': geo.region,
                         'country': geo.country,
                         'isp': geo.isp,
-                        'open_ports': json.loads(miner.open_ports) if miner.open_ports else []
+                        'open_ports': miner.ports
                     })
             
             if map_data:
@@ -172,13 +164,21 @@ def cli_scan(args):
 
 def cli_geolocate(args):
     """Geolocate IP addresses."""
+    from geolocation import get_geolocation_service
+    
     geo_service = get_geolocation_service()
     logger = logging.getLogger(__name__)
     
     ips = args.ips.split(',') if args.ips else []
     if args.file:
-        with open(args.file) as f:
-            ips.extend(line.strip() for line in f if line.strip())
+        # Read the whole file in one go and split it, rather than
+        # decoding and iterating it line by line
+        with open(args.file, 'rb') as f:
+            lines = f.read().splitlines()
+        ips.extend(
+            line.decode('ascii', errors='replace')
+            for line in map(bytes.strip, lines) if line
+        )
     
     logger.info(f"Geolocating {len(ips)} IP addresses...")
     
@@ -261,6 +261,11 @@ Legal Notice:
     # Setup logging
     setup_logging(args.log_file, args.log_level)
     
+    # Faster event loop: uvloop unless ILAM_UVLOOP=0, or
+    # the selector loop on Windows
+    from network_scanner import _set_event_loop_policy
+    _set_event_loop_policy()
+    
     # Load config
     get_config_manager(args.config).load()
     
@@ -24,50 +24,66 @@ import os
 import argparse
 import logging
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 # Add package to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-# Import all modules
+# Heavier modules (scanner, reporting, charts, maps) are imported by the
+# command handlers that need them, so light commands start quickly
 from config_manager import get_config_manager
-from database import get_db_manager
-from network_scanner import get_network_scanner
-from ip_manager import get_ip_manager
-from geolocation import get_geolocation_service
-from reporter import get_report_generator
-from enhanced_reporter import get_enhanced_report_generator
-from map_generator import get_map_generator
-from vpn_detector import get_vpn_detector
-from detection_rules import get_detection_rules_engine
-from scheduler import get_scheduler
-from analytics import get_analytics_service
-from iran_geography import (
-    get_all_province_names, 
-    get_cities_in_province,
-    get_province_by_coordinates
-)
-from iran_isps import (
-    get_all_isps,
-    identify_isp,
-    get_isp_ranges
-)
+from database import get_db_manager, HostRecord, encode_port_info
+from log_setup import setup_logging
 
 
-def setup_logging(log_file: str = None, log_level: str = "INFO"):
-    """Setup logging configuration."""
-    handlers = [logging.StreamHandler()]
-    
-    if log_file:
-        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
-        handlers.append(logging.FileHandler(log_file))
-    
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
+def build_map_records(miner_hosts, geo_results, vpn_results, vpn_detector):
+    """
+    Yield map records for successfully geolocated miners.
+    
+    Province and ISP lookups are resolved in batch up front; each record is
+    then built in a single pass over the located miners.
+    
+    Args:
+        miner_hosts: HostRecord list of detected miners
+        geo_results: Mapping of IP to GeolocationResult
+        vpn_results: Mapping of IP to VPN detection result
+        vpn_detector: Detector used for IPs missing from vpn_results
+        
+    Yields:
+        Dictionaries accepted by MapGenerator.create_summary_map
+    """
+    from iran_geography import get_provinces_by_coordinates
+    from iran_isps import identify_isps
+    
+    located = [(miner, geo_results[miner.ip_address]) for miner in miner_hosts
+               if geo_results[miner.ip_address].success]
+    
+    provinces = get_provinces_by_coordinates(
+        (geo.latitude, geo.longitude) for _, geo in located
     )
+    isps = identify_isps([miner.ip_address for miner, _ in located])
+    
+    for (miner, geo), province, isp in zip(located, provinces, isps):
+        vpn_result = vpn_results.get(miner.ip_address) or vpn_detector.check_ip(miner.ip_address)
+        
+        yield {
+            'ip_address': miner.ip_address,
+            'latitude': geo.latitude,
+            'longitude': geo.longitude,
+            'confidence_score': miner.confidence_score,
+            'miner_type': miner.miner_type,
+            'city': geo.city,
+            'region': geo.region,
+            'province': province.name if province else "Unknown",
+            'country': geo.country,
+            'isp': isp.name if isp else geo.isp,
+            'open_ports': miner.ports,
+            'is_vpn': vpn_result.is_vpn,
+            'is_proxy': vpn_result.is_proxy
+        }
 
 
 def print_banner():
@@ -97,6 +113,11 @@ def print_banner():
 
 def cli_scan(args):
     """Run scan in CLI mode."""
+    from network_scanner import get_network_scanner
+    from ip_manager import get_ip_manager
+    from vpn_detector import get_vpn_detector
+    from detection_rules import get_detection_rules_engine
+    
     config = get_config_manager().get()
     db = get_db_manager()
     scanner = get_network_scanner()
@@ -128,31 +149,31 @@ def cli_scan(args):
     
     logger.info(f"Scanning ports: {ports}")
     
-    async def run_scan():
-        results = await scanner.scan_range(
-            ip_manager.generate_from_cidr(args.cidr),
-            ports,
-            progress_callback=lambda c, t, s: logger.info(f"Progress: {c}/{t} - {s}")
-        )
-        return results
+    # Get VPN detector
+    vpn_detector = get_vpn_detector()
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    def log_progress(current: int, total: int, status: str):
+        # Log about every 0.1% of hosts (plus the last) to bound log volume
+        if current % max(1, total // 1000) and current != total:
+            return
+        logger.info("Progress: %d/%d - %s", current, total, status)
     
-    try:
-        results = loop.run_until_complete(run_scan())
-    finally:
-        loop.close()
+    results = asyncio.run(scanner.scan_range(
+        ip_manager.generate_host_strings(args.cidr),
+        ports,
+        progress_callback=log_progress,
+        total=ip_manager.count_hosts(args.cidr)
+    ))
+    
+    # Check all hosts for VPN/Proxy in batched, rate-limited requests
+    vpn_results = vpn_detector.check_batch([r.ip_address for r in results])
     
     # Process results
-    import json
     responsive = 0
     miners = 0
+    host_records = []
     vpn_detected = 0
     
-    # Get VPN detector
-    vpn_detector = get_vpn_detector()
-    
     # Get detection rules engine
     rules_engine = get_detection_rules_engine()
     
@@ -172,50 +193,58 @@ def cli_scan(args):
             logger.warning(f"MINER DETECTED: {result.ip_address} ({result.miner_type}) - {result.confidence_score:.1f}% confidence")
         
         # Check for VPN/Proxy
-        vpn_result = vpn_detector.check_ip(result.ip_address)
+        vpn_result = vpn_results[result.ip_address]
         if vpn_result.is_vpn or vpn_result.is_proxy:
             vpn_detected += 1
             logger.info(f"VPN/Proxy detected: {result.ip_address}")
         
-        # Save to DB
-        host_record = type('HostRecord', (), {
-            'scan_id': scan_id,
-            'ip_address': result.ip_address,
-            'is_responsive': result.is_responsive,
-            'ping_time_ms': result.ping_time_ms,
-            'open_ports': json.dumps([p.port for p in result.open_ports]),
-            'banner_info': json.dumps({p.port: p.banner for p in result.open_ports}),
-            'is_miner_detected': result.is_miner_detected,
-            'miner_type': result.miner_type,
-            'confidence_score': result.confidence_score
-        })
-        db.add_host(host_record)
-    
-    # Update final stats
-    db.update_scan_stats(scan_id, responsive_hosts=responsive, miners_detected=miners)
-    db.update_scan_status(scan_id, "completed")
+        open_ports_json, banner_info_json = encode_port_info(result.open_ports)
+        host_records.append(HostRecord(
+            scan_id=scan_id,
+            ip_address=result.ip_address,
+            is_responsive=result.is_responsive,
+            ping_time_ms=result.ping_time_ms,
+            open_ports=open_ports_json,
+            banner_info=banner_info_json,
+            is_miner_detected=result.is_miner_detected,
+            miner_type=result.miner_type,
+            confidence_score=result.confidence_score
+        ))
+    
+    # Save all hosts and the final stats in one transaction
+    with db.transaction():
+        db.add_hosts_bulk(host_records)
+        db.update_scan_stats(scan_id, responsive_hosts=responsive, miners_detected=miners)
+        db.update_scan_status(scan_id, "completed")
     
     logger.info(f"Scan complete: {responsive} responsive, {miners} miners detected, {vpn_detected} VPN/proxy")
     
     # Generate reports
     if args.export:
+        from reporter import get_report_generator
+        from enhanced_reporter import get_enhanced_report_generator
+        
         reporter = get_report_generator()
         enhanced_reporter = get_enhanced_report_generator()
         reports = {}
+        # The basic formats share one query of the scan and its hosts
+        data = reporter.load_scan(scan_id)
+        exporters = {
+            'json': functools.partial(reporter.export_json, data=data),
+            'csv': functools.partial(reporter.export_csv, data=data),
+            'html': functools.partial(reporter.export_html, data=data),
+            'pdf': enhanced_reporter.export_pdf,
+            'excel': enhanced_reporter.export_excel,
+        }
+        formats = [fmt for fmt in config.reporting.export_formats if fmt in exporters]
+        
+        # Each format writes its own file, so generate them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, len(formats))) as executor:
+            futures = {fmt: executor.submit(exporters[fmt], scan_id) for fmt in formats}
         
-        # Generate basic reports
-        for fmt in config.reporting.export_formats:
+        for fmt, future in futures.items():
             try:
-                if fmt == 'json':
-                    reports['json'] = reporter.export_json(scan_id)
-                elif fmt == 'csv':
-                    reports['csv'] = reporter.export_csv(scan_id)
-                elif fmt == 'html':
-                    reports['html'] = reporter.export_html(scan_id)
-                elif fmt == 'pdf':
-                    reports['pdf'] = enhanced_reporter.export_pdf(scan_id)
-                elif fmt == 'excel':
-                    reports['excel'] = enhanced_reporter.export_excel(scan_id)
+                reports[fmt] = future.result()
             except Exception as e:
                 logger.error(f"Failed to generate {fmt} report: {e}")
         
@@ -224,6 +253,8 @@ def cli_scan(args):
     
     # Generate analytics
     if args.analytics:
+        from analytics import get_analytics_service
+        
         analytics_service = get_analytics_service()
         analytics_service.clear_cache()
         
@@ -241,41 +272,29 @@ def cli_scan(args):
     # Generate map
     if args.map and miners > 0:
         try:
+            from geolocation import get_geolocation_service
+            from map_generator import get_map_generator
+            
             geo_service = get_geolocation_service()
             map_gen = get_map_generator()
             
-            miner_hosts = db.get_miner_hosts(scan_id)
-            map_data = []
+            # Miners come back joined with any cached geolocation
+            miners_with_geo = db.get_miner_hosts_with_geo(scan_id)
+            miner_hosts = [miner for miner, _ in miners_with_geo]
+            geo_results = {
+                miner.ip_address: geo_service.cache_to_result(cached)
+                for miner, cached in miners_with_geo if cached
+            }
+            
+            # Geolocate the remaining miners through the batch endpoint,
+            # which paces its requests under the provider's rate limit
+            geo_results.update(geo_service.lookup_batch(
+                [miner.ip_address for miner, cached in miners_with_geo if not cached]
+            ))
             
-            for miner in miner_hosts:
-                geo = geo_service.lookup(miner.ip_address)
-                if geo.success:
-                    # Determine province
-                    province = get_province_by_coordinates(geo.latitude, geo.longitude)
-                    province_name = province.name if province else "Unknown"
-                    
-                    # Identify ISP
-                    isp = identify_isp(miner.ip_address)
-                    isp_name = isp.name if isp else geo.isp
-                    
-                    # Check VPN/Proxy
-                    vpn_result = vpn_detector.check_ip(miner.ip_address)
-                    
-                    map_data.append({
-                        'ip_address': miner.ip_address,
-                        'latitude': geo.latitude,
-                        'longitude': geo.longitude,
-                        'confidence_score': miner.confidence_score,
-                        'miner_type': miner.miner_type,
-                        'city': geo.city,
-                        'region': geo.region,
-                        'province': province_name,
-                        'country': geo.country,
-                        'isp': isp_name,
-                        'open_ports': json.loads(miner.open_ports) if miner.open_ports else [],
-                        'is_vpn': vpn_result.is_vpn,
-                        'is_proxy': vpn_result.is_proxy
-                    })
+            map_data = list(build_map_records(
+                miner_hosts, geo_results, vpn_results, vpn_detector
+            ))
             
             if map_data:
                 timestamp = datetime.now().strftime(config.reporting.timestamp_format)
@@ -290,6 +309,8 @@ def cli_scan(args):
 
 def cli_list_provinces(args):
     """List all Iranian provinces."""
+    from iran_geography import get_all_province_names, get_province_by_name
+    
     provinces = get_all_province_names()
     
     print("\nIranian Provinces (31):")
@@ -300,7 +321,6 @@ def cli_list_provinces(args):
     if args.detailed:
         print("\nDetailed Information:")
         print("=" * 50)
-        from iran_geography import get_province_by_name
         for province_name in provinces:
             province = get_province_by_name(province_name)
             if province:
@@ -317,6 +337,8 @@ def cli_list_provinces(args):
 
 def cli_list_isps(args):
     """List all Iranian ISPs."""
+    from iran_isps import get_all_isps
+    
     isps = get_all_isps()
     
     print("\nIranian ISPs:")
@@ -349,6 +371,7 @@ def cli_list_isps(args):
 
 def cli_stats(args):
     """Show database statistics."""
+    logger = logging.getLogger(__name__)
     db = get_db_manager()
     stats = db.get_stats()
     
@@ -361,6 +384,8 @@ def cli_stats(args):
     
     # Show analytics if available
     try:
+        from analytics import get_analytics_service
+        
         analytics_service = get_analytics_service()
         analytics = analytics_service.get_analytics_data()
         
@@ -407,7 +432,7 @@ Legal Notice:
     parser.add_argument('--log-level', default='INFO', 
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
     parser.add_argument('--log-file', help='Log file path')
-    parser.add_argument('--no-banner', action='store_true', help='Don't display banner')
+    parser.add_argument('--no-banner', action='store_true', help="Don't display banner")
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
@@ -446,6 +471,11 @@ Legal Notice:
     # Setup logging
     setup_logging(args.log_file, args.log_level)
     
+    # Faster event loop: uvloop unless ILAM_UVLOOP=0, or
+    # the selector loop on Windows
+    from network_scanner import _set_event_loop_policy
+    _set_event_loop_policy()
+    
     # Load config
     try:
         get_config_manager(args.config).load()
@@ -4,18 +4,84 @@ Creates interactive Folium maps with detection markers and heatmaps.
 """
 
 import folium
-from folium.plugins import HeatMap, MarkerCluster
+from branca.element import MacroElement
+from folium.plugins import HeatMap, FastMarkerCluster
+from jinja2 import Template
+from collections import Counter, OrderedDict
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 from pathlib import Path
+import functools
+import gzip
+import hashlib
 import json
 import logging
+import operator
+import threading
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from .geolocation import GeolocationResult
 from .database import HostRecord
 
 logger = logging.getLogger(__name__)
 
+# Characters escaped when embedding JSON in an HTML <script> block
+_SCRIPT_SAFE = str.maketrans({
+    '<': '\\u003c',
+    '>': '\\u003e',
+    '&': '\\u0026',
+    "'": '\\u0027',
+})
+
+
+def _dumps_js(data: Any) -> str:
+    """Serialize data as compact JSON that is safe inside a <script> block."""
+    if ORJSON_AVAILABLE:
+        text = orjson.dumps(data).decode('utf-8')
+    else:
+        text = json.dumps(data, separators=(',', ':'))
+    return text.translate(_SCRIPT_SAFE)
+
+# Compiled once; folium already depends on jinja2
+_POPUP_TEMPLATE = Template("""
+        <div style="min-width: 200px;">
+            <h4 style="margin: 0 0 10px 0; color: #d32f2f;">
+                <i class="fa fa-exclamation-circle"></i> Potential Miner Detected
+            </h4>
+            <table style="width: 100%; font-size: 12px;">
+                <tr><td><b>IP:</b></td><td>{{ ip }}</td></tr>
+                <tr><td><b>Confidence:</b></td><td><span style="color: {{ color }}">{{ '%.1f' % confidence }}%</span></td></tr>
+                <tr><td><b>Type:</b></td><td>{{ miner_type }}</td></tr>
+                <tr><td><b>Location:</b></td><td>{{ city }}, {{ region }}, {{ country }}</td></tr>
+                <tr><td><b>ISP:</b></td><td>{{ isp }}</td></tr>
+                <tr><td><b>Open Ports:</b></td><td>{{ ports or 'None' }}</td></tr>
+            </table>
+        </div>
+        """, autoescape=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_popup(ip: str, confidence: float, color: str, miner_type: str,
+                  city: str, region: str, country: str, isp: str, ports: str) -> str:
+    # Identical popups (same host re-detected, same location/ISP) share one
+    # rendered string instead of being rendered again
+    return _POPUP_TEMPLATE.render(
+        ip=ip,
+        confidence=confidence,
+        color=color,
+        miner_type=miner_type,
+        city=city,
+        region=region,
+        country=country,
+        isp=isp,
+        ports=ports
+    )
+
 
 @dataclass
 class MapMarker:
@@ -28,6 +94,60 @@ class MapMarker:
     icon: str = "warning"
 
 
+class MarkerLayer(MacroElement):
+    """
+    Unclustered marker layer built in the browser from plain data rows.
+    
+    All markers share one script block: the rows are embedded once and
+    mapped through a JavaScript callback into a single feature group.
+    """
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var callback = {{ this.callback }};
+                var data = {{ this.data_json }};
+                return L.featureGroup(data.map(callback))
+                    .addTo({{ this._parent.get_name() }});
+            })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data: List[List[Any]], callback: str):
+        super().__init__()
+        self._name = 'MarkerLayer'
+        self.data_json = _dumps_js(data)
+        self.callback = callback
+
+
+class BulkMarkerCluster(FastMarkerCluster):
+    """
+    FastMarkerCluster that hands all markers to the cluster in one call.
+    
+    The stock plugin adds rows one at a time, re-running the cluster
+    bookkeeping per marker; addLayers() ingests the whole array at once
+    and honours the chunkedLoading option.
+    """
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                {{ this.callback }}
+                var data = {{ this.data_json }};
+                var cluster = L.markerClusterGroup({{ this.options|tojson }});
+                cluster.addLayers(data.map(callback));
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data: List[List[Any]], callback: str, **kwargs):
+        super().__init__(data=[], callback=callback, **kwargs)
+        self._name = 'BulkMarkerCluster'
+        self.data_json = _dumps_js(data)
+
+
 class MapGenerator:
     """
     Generates interactive Folium maps for scan results.
@@ -45,17 +165,134 @@ class MapGenerator:
         "none": "blue"      # <20%
     }
     
+    # Approximate Ilam province boundary (simplified)
+    ILAM_BOUNDARY = (
+        (32.5, 46.0),
+        (32.5, 47.5),
+        (33.5, 47.5),
+        (33.5, 46.0),
+        (32.5, 46.0)
+    )
+    
+    # (min_lat, min_lon, max_lat, max_lon) of the boundary above
+    ILAM_BOUNDS = (
+        min(lat for lat, _ in ILAM_BOUNDARY),
+        min(lon for _, lon in ILAM_BOUNDARY),
+        max(lat for lat, _ in ILAM_BOUNDARY),
+        max(lon for _, lon in ILAM_BOUNDARY)
+    )
+    
+    # Summary map title box; filled with str.format(title=..., count=...)
+    TITLE_HTML = '''
+            <div style="position: fixed; 
+                        top: 10px; left: 50px; width: 400px;
+                        background-color: white; 
+                        border: 2px solid #333;
+                        border-radius: 5px;
+                        padding: 10px;
+                        z-index: 9999;
+                        font-family: Arial;">
+                <h3 style="margin: 0; color: #333;">{title}</h3>
+                <p style="margin: 5px 0 0 0; font-size: 12px;">
+                    Total Detections: {count}
+                </p>
+            </div>
+        '''
+    
+    # Static confidence legend shared by every summary map
+    LEGEND_HTML = '''
+        <div style="position: fixed; 
+                    bottom: 50px; right: 50px; 
+                    background-color: white; 
+                    border: 2px solid #333;
+                    border-radius: 5px;
+                    padding: 10px;
+                    z-index: 9999;
+                    font-family: Arial;
+                    font-size: 12px;">
+            <h4 style="margin: 0 0 10px 0;">Confidence Levels</h4>
+            <div><span style="background-color: red; padding: 2px 8px;">&nbsp;</span> High (80-100%)</div>
+            <div><span style="background-color: orange; padding: 2px 8px;">&nbsp;</span> Medium (50-79%)</div>
+            <div><span style="background-color: yellow; padding: 2px 8px;">&nbsp;</span> Low (20-49%)</div>
+            <div><span style="background-color: blue; padding: 2px 8px;">&nbsp;</span> None (&lt;20%)</div>
+        </div>
+        '''
+    
+    # Defaults for missing scan result fields, applied once per result
+    RESULT_DEFAULTS = {
+        'ip_address': 'Unknown',
+        'latitude': 0,
+        'longitude': 0,
+        'confidence_score': 0,
+        'miner_type': 'Unknown',
+        'city': 'Unknown',
+        'region': 'Unknown',
+        'country': 'Unknown',
+        'isp': 'Unknown',
+        'open_ports': (),
+    }
+    
+    _MARKER_FIELDS = operator.itemgetter(
+        'ip_address', 'latitude', 'longitude', 'confidence_score'
+    )
+    _POPUP_FIELDS = operator.itemgetter(
+        'ip_address', 'confidence_score', 'miner_type', 'city',
+        'region', 'country', 'isp', 'open_ports'
+    )
+    
+    # Heatmap points are aggregated into cells of this size (~100 m)
+    HEATMAP_GRID_DEGREES = 0.001
+    
+    # Upper bound on heatmap points embedded in the page; the grid is
+    # coarsened until the occupied cells fit
+    MAX_HEATMAP_POINTS = 20000
+    
+    # Leaflet.markercluster options: cluster in time-sliced chunks so large
+    # result sets do not freeze the page, and stop clustering once zoomed in
+    # far enough for individual markers to be readable
+    CLUSTER_OPTIONS = {
+        "chunkedLoading": True,
+        "disableClusteringAtZoom": 15,
+        "spiderfyOnMaxZoom": False,
+    }
+    
+    # Leaflet-side marker factory for FastMarkerCluster rows of
+    # [lat, lon, popup_html, color, icon, title]
+    MARKER_CALLBACK = """
+        function (row) {
+            var marker = L.marker(new L.LatLng(row[0], row[1]), {
+                icon: L.AwesomeMarkers.icon({
+                    markerColor: row[3], icon: row[4], prefix: 'fa'
+                })
+            });
+            marker.bindPopup(row[2], {maxWidth: 300});
+            marker.bindTooltip(row[5]);
+            return marker;
+        }
+    """
+    
+    # Rendered summary maps reused for identical results, shared by all
+    # generators in the process; least recently used are evicted once the
+    # pages total more than SUMMARY_CACHE_MAX_BYTES
+    SUMMARY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    _summary_cache: 'OrderedDict[str, Tuple[folium.Map, bytes]]' = OrderedDict()
+    _summary_cache_bytes = 0
+    _summary_cache_lock = threading.Lock()
+    
     def __init__(self):
         self.map_instance: Optional[folium.Map] = None
         
     def create_map(self, center: Optional[List[float]] = None,
-                   zoom: int = DEFAULT_ZOOM) -> folium.Map:
+                   zoom: int = DEFAULT_ZOOM,
+                   multi_tile: bool = False) -> folium.Map:
         """
         Create a new Folium map centered on Ilam province.
         
         Args:
             center: [lat, lon] center coordinates (default: Ilam center)
             zoom: Initial zoom level
+            multi_tile: Also offer street and dark tile layers; each extra
+                layer adds its own script and tile requests at page load
             
         Returns:
             Folium Map object
@@ -69,17 +306,20 @@ class MapGenerator:
         )
         
         # Add tile layers
-        folium.TileLayer(
-            'OpenStreetMap',
-            name='Street Map',
-            control=True
-        ).add_to(self.map_instance)
-        
-        folium.TileLayer(
-            'CartoDB dark_matter',
-            name='Dark Mode',
-            control=True
-        ).add_to(self.map_instance)
+        if multi_tile:
+            folium.TileLayer(
+                'OpenStreetMap',
+                name='Street Map',
+                control=True,
+                no_wrap=True
+            ).add_to(self.map_instance)
+            
+            folium.TileLayer(
+                'CartoDB dark_matter',
+                name='Dark Mode',
+                control=True,
+                no_wrap=True
+            ).add_to(self.map_instance)
         
         # Add layer control
         folium.LayerControl().add_to(self.map_instance)
@@ -100,17 +340,8 @@ class MapGenerator:
         if m is None:
             m = self.create_map()
         
-        # Approximate Ilam province boundary (simplified)
-        ilam_boundary = [
-            [32.5, 46.0],
-            [32.5, 47.5],
-            [33.5, 47.5],
-            [33.5, 46.0],
-            [32.5, 46.0]
-        ]
-        
         folium.Polygon(
-            locations=ilam_boundary,
+            locations=[list(point) for point in self.ILAM_BOUNDARY],
             popup='Ilam Province',
             color='blue',
             weight=2,
@@ -139,19 +370,23 @@ class MapGenerator:
         if m is None:
             m = self.create_map()
         
+        # Markers are built in the browser from plain rows, instead of
+        # rendering a template per folium.Marker
+        rows = [
+            [marker.latitude, marker.longitude, marker.popup_content,
+             marker.color, marker.icon, marker.title]
+            for marker in markers
+        ]
+        
         if cluster:
-            marker_cluster = MarkerCluster(name='Detections').add_to(m)
-            target = marker_cluster
+            BulkMarkerCluster(
+                data=rows,
+                callback=self.MARKER_CALLBACK,
+                options=self.CLUSTER_OPTIONS,
+                name='Detections'
+            ).add_to(m)
         else:
-            target = m
-        
-        for marker in markers:
-            folium.Marker(
-                location=[marker.latitude, marker.longitude],
-                popup=folium.Popup(marker.popup_content, max_width=300),
-                tooltip=marker.title,
-                icon=folium.Icon(color=marker.color, icon=marker.icon, prefix='fa')
-            ).add_to(target)
+            MarkerLayer(rows, self.MARKER_CALLBACK).add_to(m)
         
         return m
     
@@ -173,7 +408,7 @@ class MapGenerator:
         
         if points:
             HeatMap(
-                data=points,
+                data=self._bucket_heatmap_points(points),
                 name='Detection Heatmap',
                 min_opacity=0.3,
                 radius=15,
@@ -183,9 +418,39 @@ class MapGenerator:
         
         return m
     
+    def _bucket_heatmap_points(self, points: List[Tuple[float, float]]) -> List[List[float]]:
+        """
+        Aggregate points into grid cells weighted by point count.
+        
+        Leaflet.heat sums intensities per cell anyway, so sending one
+        weighted point per cell renders the same while keeping the
+        embedded data proportional to occupied cells, not detections.
+        If more than MAX_HEATMAP_POINTS cells are occupied, the grid is
+        doubled in size until they fit, bounding the embedded JSON.
+        
+        Args:
+            points: List of (lat, lon) tuples
+            
+        Returns:
+            List of [lat, lon, weight] triples
+        """
+        grid = self.HEATMAP_GRID_DEGREES
+        counts = Counter((round(lat / grid), round(lon / grid)) for lat, lon in points)
+        
+        while len(counts) > self.MAX_HEATMAP_POINTS:
+            grid *= 2
+            coarser = Counter()
+            for (row, col), count in counts.items():
+                coarser[(row // 2, col // 2)] += count
+            counts = coarser
+        
+        return [[round(row * grid, 6), round(col * grid, 6), count]
+                for (row, col), count in counts.items()]
+    
     def add_scan_results(self, results: List[Dict[str, Any]],
                         include_heatmap: bool = True,
-                        map_obj: Optional[folium.Map] = None) -> folium.Map:
+                        map_obj: Optional[folium.Map] = None,
+                        ilam_only: bool = False) -> folium.Map:
         """
         Add scan results to map with geolocation data.
         
@@ -193,6 +458,8 @@ class MapGenerator:
             results: List of dicts with ip, lat, lon, confidence, etc.
             include_heatmap: Whether to add heatmap layer
             map_obj: Folium map (uses instance map if None)
+            ilam_only: Drop results outside the Ilam boundary before
+                building any popups
             
         Returns:
             Folium Map with results
@@ -201,32 +468,19 @@ class MapGenerator:
         if m is None:
             m = self.create_map()
         
-        markers = []
-        heatmap_points = []
+        # Fill in defaults once, then drop results without coordinates
+        defaults = self.RESULT_DEFAULTS
+        located = [row for row in ({**defaults, **r} for r in results)
+                   if row['latitude'] != 0 or row['longitude'] != 0]
         
-        for result in results:
-            lat = result.get('latitude', 0)
-            lon = result.get('longitude', 0)
-            
-            if lat == 0 and lon == 0:
-                continue
-            
-            confidence = result.get('confidence_score', 0)
-            color = self._get_color_by_confidence(confidence)
-            
-            # Create popup content
-            popup = self._create_popup_content(result)
-            
-            marker = MapMarker(
-                latitude=lat,
-                longitude=lon,
-                title=f"{result.get('ip_address', 'Unknown')} ({confidence:.0f}%)",
-                popup_content=popup,
-                color=color,
-                icon='exclamation-triangle' if confidence >= 50 else 'info-circle'
-            )
-            markers.append(marker)
-            heatmap_points.append([lat, lon])
+        if ilam_only:
+            min_lat, min_lon, max_lat, max_lon = self.ILAM_BOUNDS
+            located = [r for r in located
+                       if min_lat <= r['latitude'] <= max_lat
+                       and min_lon <= r['longitude'] <= max_lon]
+        
+        markers = [self._result_to_marker(result) for result in located]
+        heatmap_points = [[marker.latitude, marker.longitude] for marker in markers]
         
         # Add markers
         self.add_markers(markers, cluster=True, map_obj=m)
@@ -237,6 +491,19 @@ class MapGenerator:
         
         return m
     
+    def _result_to_marker(self, result: Dict[str, Any]) -> MapMarker:
+        """Build the map marker for a located, default-filled scan result."""
+        ip, latitude, longitude, confidence = self._MARKER_FIELDS(result)
+        
+        return MapMarker(
+            latitude=latitude,
+            longitude=longitude,
+            title=f"{ip} ({confidence:.0f}%)",
+            popup_content=self._create_popup_content(result),
+            color=self._get_color_by_confidence(confidence),
+            icon='exclamation-triangle' if confidence >= 50 else 'info-circle'
+        )
+    
     def save_map(self, output_path: str, map_obj: Optional[folium.Map] = None) -> str:
         """
         Save map to HTML file.
@@ -257,6 +524,41 @@ class MapGenerator:
         logger.info(f"Map saved to {output_path}")
         return output_path
     
+    def save_map_gz(self, output_path: str, map_obj: Optional[folium.Map] = None,
+                    compresslevel: int = 6) -> str:
+        """
+        Save map to a gzip-compressed HTML file.
+        
+        The rendered page is written through the compressor in chunks, so no
+        second full-size encoded copy is held in memory. Web servers can
+        serve the result directly with Content-Encoding: gzip.
+        
+        Args:
+            output_path: Path to save HTML file (.gz is appended if missing)
+            map_obj: Folium map (uses instance map if None)
+            compresslevel: gzip compression level (1-9)
+            
+        Returns:
+            Path to saved file
+        """
+        m = map_obj or self.map_instance
+        if m is None:
+            m = self.create_map()
+        
+        if not output_path.endswith('.gz'):
+            output_path += '.gz'
+        
+        html = m.get_root().render()
+        chunk_size = 1 << 20
+        
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(output_path, 'wt', encoding='utf-8', compresslevel=compresslevel) as f:
+            for start in range(0, len(html), chunk_size):
+                f.write(html[start:start + chunk_size])
+        
+        logger.info(f"Compressed map saved to {output_path}")
+        return output_path
+    
     def _get_color_by_confidence(self, confidence: float) -> str:
         """Get marker color based on confidence score."""
         if confidence >= 80:
@@ -268,36 +570,19 @@ class MapGenerator:
         return self.CONFIDENCE_COLORS["none"]
     
     def _create_popup_content(self, result: Dict[str, Any]) -> str:
-        """Create HTML popup content for a result."""
-        ip = result.get('ip_address', 'Unknown')
-        confidence = result.get('confidence_score', 0)
-        miner_type = result.get('miner_type', 'Unknown')
-        city = result.get('city', 'Unknown')
-        region = result.get('region', 'Unknown')
-        country = result.get('country', 'Unknown')
-        isp = result.get('isp', 'Unknown')
-        open_ports = result.get('open_ports', [])
+        """Create HTML popup content for a default-filled result."""
+        (ip, confidence, miner_type, city, region,
+         country, isp, open_ports) = self._POPUP_FIELDS(result)
         
         ports_str = ', '.join(str(p) for p in open_ports[:5])
         if len(open_ports) > 5:
             ports_str += f" (+{len(open_ports) - 5} more)"
         
-        html = f"""
-        <div style="min-width: 200px;">
-            <h4 style="margin: 0 0 10px 0; color: #d32f2f;">
-                <i class="fa fa-exclamation-circle"></i> Potential Miner Detected
-            </h4>
-            <table style="width: 100%; font-size: 12px;">
-                <tr><td><b>IP:</b></td><td>{ip}</td></tr>
-                <tr><td><b>Confidence:</b></td><td><span style="color: {'red' if confidence >= 80 else 'orange' if confidence >= 50 else 'yellow'}">{confidence:.1f}%</span></td></tr>
-                <tr><td><b>Type:</b></td><td>{miner_type}</td></tr>
-                <tr><td><b>Location:</b></td><td>{city}, {region}, {country}</td></tr>
-                <tr><td><b>ISP:</b></td><td>{isp}</td></tr>
-                <tr><td><b>Open Ports:</b></td><td>{ports_str or 'None'}</td></tr>
-            </table>
-        </div>
-        """
-        return html
+        # Rounded to the displayed precision so equal popups share a cache entry
+        return _render_popup(
+            ip, round(confidence, 1), self._get_color_by_confidence(confidence),
+            miner_type, city, region, country, isp, ports_str
+        )
     
     def create_summary_map(self, scan_results: List[Dict],
                           output_path: str,
@@ -305,6 +590,10 @@ class MapGenerator:
         """
         Create a complete summary map with all features.
         
+        The rendered page is cached by a hash of the results and title, so
+        regenerating the map for unchanged results only rewrites the file.
+        On a hit, map_instance is set to the map built the first time.
+        
         Args:
             scan_results: List of scan result dictionaries
             output_path: Path to save HTML
@@ -313,25 +602,73 @@ class MapGenerator:
         Returns:
             Path to saved map
         """
+        key = self._summary_key(scan_results, title)
+        with MapGenerator._summary_cache_lock:
+            entry = MapGenerator._summary_cache.get(key)
+            if entry is not None:
+                MapGenerator._summary_cache.move_to_end(key)
+        
+        if entry is None:
+            m = self._build_summary_map(scan_results, title)
+            html = m.get_root().render().encode('utf-8')
+            self._cache_summary(key, m, html)
+        else:
+            logger.debug("Reusing rendered summary map")
+            m, html = entry
+            self.map_instance = m
+        
+        # Written as folium's Map.save() would
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(html)
+        logger.info(f"Map saved to {output_path}")
+        return output_path
+    
+    @staticmethod
+    def _summary_key(scan_results: List[Dict], title: str) -> str:
+        """Content hash identifying a summary map's inputs."""
+        payload = [title, scan_results]
+        data = None
+        if ORJSON_AVAILABLE:
+            try:
+                data = orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS)
+            except TypeError:
+                pass
+        if data is None:
+            data = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    @classmethod
+    def _cache_summary(cls, key: str, m: folium.Map, html: bytes) -> None:
+        """Cache a rendered summary map, evicting beyond the byte budget."""
+        if len(html) > cls.SUMMARY_CACHE_MAX_BYTES:
+            return
+        cache = MapGenerator._summary_cache
+        with MapGenerator._summary_cache_lock:
+            previous = cache.pop(key, None)
+            size = MapGenerator._summary_cache_bytes + len(html)
+            if previous is not None:
+                size -= len(previous[1])
+            cache[key] = (m, html)
+            while size > cls.SUMMARY_CACHE_MAX_BYTES:
+                _, (_, evicted) = cache.popitem(last=False)
+                size -= len(evicted)
+            MapGenerator._summary_cache_bytes = size
+    
+    @staticmethod
+    def clear_summary_cache() -> None:
+        """Drop all cached summary maps."""
+        with MapGenerator._summary_cache_lock:
+            MapGenerator._summary_cache.clear()
+            MapGenerator._summary_cache_bytes = 0
+    
+    def _build_summary_map(self, scan_results: List[Dict], title: str) -> folium.Map:
+        """Build the summary map with title, boundary, results and legend."""
         # Create base map
         m = self.create_map()
         
         # Add title
-        title_html = f'''
-            <div style="position: fixed; 
-                        top: 10px; left: 50px; width: 400px;
-                        background-color: white; 
-                        border: 2px solid #333;
-                        border-radius: 5px;
-                        padding: 10px;
-                        z-index: 9999;
-                        font-family: Arial;">
-                <h3 style="margin: 0; color: #333;">{title}</h3>
-                <p style="margin: 5px 0 0 0; font-size: 12px;">
-                    Total Detections: {len(scan_results)}
-                </p>
-            </div>
-        '''
+        title_html = self.TITLE_HTML.format(title=title, count=len(scan_results))
         m.get_root().html.add_child(folium.Element(title_html))
         
         # Add Ilam boundary
@@ -341,27 +678,9 @@ class MapGenerator:
         self.add_scan_results(scan_results, include_heatmap=True, map_obj=m)
         
         # Add legend
-        legend_html = '''
-        <div style="position: fixed; 
-                    bottom: 50px; right: 50px; 
-                    background-color: white; 
-                    border: 2px solid #333;
-                    border-radius: 5px;
-                    padding: 10px;
-                    z-index: 9999;
-                    font-family: Arial;
-                    font-size: 12px;">
-            <h4 style="margin: 0 0 10px 0;">Confidence Levels</h4>
-            <div><span style="background-color: red; padding: 2px 8px;">&nbsp;</span> High (80-100%)</div>
-            <div><span style="background-color: orange; padding: 2px 8px;">&nbsp;</span> Medium (50-79%)</div>
-            <div><span style="background-color: yellow; padding: 2px 8px;">&nbsp;</span> Low (20-49%)</div>
-            <div><span style="background-color: blue; padding: 2px 8px;">&nbsp;</span> None (&lt;20%)</div>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
+        m.get_root().html.add_child(folium.Element(self.LEGEND_HTML))
         
-        return self.save_map(output_path, m)
-
+        return m
 
 def get_map_generator() -> MapGenerator:
     """Get map generator instance."""
@@ -4,11 +4,15 @@ Implements TCP port scanning, ping checks, and service detection.
 """
 
 import asyncio
+import itertools
+import os
+import re
 import socket
 import struct
+import sys
 import time
 import logging
-from typing import List, Dict, Optional, Set, Callable, Any
+from typing import List, Dict, Optional, Set, Callable, Any, AsyncIterator
 from dataclasses import dataclass, field
 from concurrent.futures import ThreadPoolExecutor
 import ipaddress
@@ -44,6 +48,365 @@ class HostScanResult:
     timestamp: float = field(default_factory=time.time)
 
 
+_ICMP_ECHO_REQUEST = 8
+_ICMP_ECHO_REPLY = 0
+_ICMP_HEADER = struct.Struct('!BBHHH')
+_ICMP_PAYLOAD = b'IlamMinerDetector-ping'
+
+
+def _inet_checksum(data: bytes) -> int:
+    """Compute the 16-bit ones' complement Internet checksum (RFC 1071)."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class IcmpPinger:
+    """
+    Sends ICMP echo requests from one shared socket on the event loop.
+    
+    Replies are read by a single loop reader and matched to waiting pings
+    by (address, sequence), so any number of hosts can be pinged
+    concurrently without spawning processes. Uses a raw socket when
+    privileged and an unprivileged ICMP datagram socket otherwise (Linux,
+    subject to net.ipv4.ping_group_range).
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._ident = os.getpid() & 0xFFFF
+        self._sequence = itertools.count()
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        
+        try:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self._raw = True
+        except OSError:
+            # Raises again if unprivileged ICMP sockets are not permitted
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self._raw = False
+        
+        self._sock.setblocking(False)
+        loop.add_reader(self._sock.fileno(), self._on_readable)
+    
+    async def ping(self, ip: str, timeout: float) -> Optional[float]:
+        """
+        Ping a host once.
+        
+        Args:
+            ip: IPv4 address to ping
+            timeout: Seconds to wait for the reply
+            
+        Returns:
+            Round-trip time in ms, or None if no reply arrived in time
+        """
+        sequence = next(self._sequence) & 0xFFFF
+        header = _ICMP_HEADER.pack(_ICMP_ECHO_REQUEST, 0, 0, self._ident, sequence)
+        checksum = _inet_checksum(header + _ICMP_PAYLOAD)
+        packet = _ICMP_HEADER.pack(
+            _ICMP_ECHO_REQUEST, 0, checksum, self._ident, sequence
+        ) + _ICMP_PAYLOAD
+        
+        key = (ip, sequence)
+        future = self.loop.create_future()
+        self._pending[key] = future
+        
+        try:
+            start = self.loop.time()
+            self._sock.sendto(packet, (ip, 0))
+            await asyncio.wait_for(future, timeout=timeout)
+            return (self.loop.time() - start) * 1000
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._pending.pop(key, None)
+    
+    def _on_readable(self) -> None:
+        """Drain queued replies and resolve the matching pings."""
+        while True:
+            try:
+                data, address = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug("ICMP receive error: %s", e)
+                return
+            
+            # Raw sockets deliver the IP header as well
+            if self._raw:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < _ICMP_HEADER.size:
+                continue
+            
+            icmp_type, _, _, ident, sequence = _ICMP_HEADER.unpack_from(data)
+            # Datagram sockets rewrite the identifier, so it is only
+            # meaningful (and needed to skip other processes) on raw sockets
+            if icmp_type != _ICMP_ECHO_REPLY or (self._raw and ident != self._ident):
+                continue
+            
+            future = self._pending.get((address[0], sequence))
+            if future is not None and not future.done():
+                future.set_result(None)
+    
+    def close(self) -> None:
+        """Stop reading replies and close the socket."""
+        if not self.loop.is_closed():
+            self.loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+
+_TCP_HEADER = struct.Struct('!HHIIBBHHH')
+_TCP_PSEUDO_HEADER = struct.Struct('!4s4sBBH')
+_TCP_SYN = 0x02
+_TCP_RST = 0x04
+_TCP_ACK = 0x10
+_TCP_SYN_WINDOW = 64240
+
+
+class SynScanner:
+    """
+    Half-open TCP port prober sending SYN packets from one raw socket.
+    
+    A SYN-ACK marks the port open and an RST marks it closed; either
+    answer also proves the host is up, so no separate ping is needed.
+    Replies are read by a single loop reader and matched to waiting
+    probes by (address, port) and acknowledgement number. Probes are sent
+    from a local port reserved by a bound, unconnected TCP socket, so the
+    kernel resets each SYN-ACK and no connection is ever established.
+    Requires CAP_NET_RAW; IPv4 only.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pending: Dict[tuple, tuple] = {}
+        self._last_source = ('', b'')
+        
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        self._reserved = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._reserved.bind(('', 0))
+        self._port = self._reserved.getsockname()[1]
+        
+        self._sock.setblocking(False)
+        loop.add_reader(self._sock.fileno(), self._on_readable)
+    
+    def _source_address(self, ip: str) -> bytes:
+        """Local address the kernel routes to ip from (no packet is sent)."""
+        # A host's ports are probed together, so remembering the last
+        # lookup covers nearly every call
+        last_ip, source = self._last_source
+        if last_ip != ip:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                probe.connect((ip, 9))
+                source = socket.inet_aton(probe.getsockname()[0])
+            self._last_source = (ip, source)
+        return source
+    
+    def _syn_packet(self, source: bytes, destination: bytes, port: int, sequence: int) -> bytes:
+        """Build a TCP SYN segment with its checksum filled in."""
+        header = _TCP_HEADER.pack(
+            self._port, port, sequence, 0, 5 << 4, _TCP_SYN, _TCP_SYN_WINDOW, 0, 0
+        )
+        pseudo = _TCP_PSEUDO_HEADER.pack(
+            source, destination, 0, socket.IPPROTO_TCP, len(header)
+        )
+        checksum = _inet_checksum(pseudo + header)
+        return header[:16] + struct.pack('!H', checksum) + header[18:]
+    
+    async def probe(self, ip: str, port: int, timeout: float) -> tuple:
+        """
+        Send one SYN to a port.
+        
+        Args:
+            ip: IPv4 address to probe
+            port: TCP port to probe
+            timeout: Seconds to wait for the answer
+            
+        Returns:
+            Tuple of (state, rtt_ms): state is True for open, False for
+            closed and None when nothing answered in time (filtered)
+        """
+        sequence = int.from_bytes(os.urandom(4), 'big')
+        key = (ip, port)
+        future = self.loop.create_future()
+        self._pending[key] = (sequence, future)
+        
+        try:
+            destination = socket.inet_aton(ip)
+            packet = self._syn_packet(self._source_address(ip), destination, port, sequence)
+            start = self.loop.time()
+            self._sock.sendto(packet, (ip, 0))
+            state = await asyncio.wait_for(future, timeout=timeout)
+            return state, (self.loop.time() - start) * 1000
+        except (asyncio.TimeoutError, OSError):
+            return None, None
+        finally:
+            if self._pending.get(key, (None, None))[1] is future:
+                del self._pending[key]
+    
+    def _on_readable(self) -> None:
+        """Drain received segments and resolve the matching probes."""
+        while True:
+            try:
+                data = self._sock.recv(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug("TCP raw receive error: %s", e)
+                return
+            
+            # Raw sockets deliver the IP header as well
+            offset = (data[0] & 0x0F) * 4
+            if len(data) < offset + _TCP_HEADER.size:
+                continue
+            
+            port, local_port, _, ack, _, flags = _TCP_HEADER.unpack_from(data, offset)[:6]
+            if local_port != self._port:
+                continue
+            
+            entry = self._pending.get((socket.inet_ntoa(data[12:16]), port))
+            if entry is None:
+                continue
+            sequence, future = entry
+            if future.done() or ack != (sequence + 1) & 0xFFFFFFFF:
+                continue
+            
+            if flags & (_TCP_SYN | _TCP_ACK) == _TCP_SYN | _TCP_ACK:
+                future.set_result(True)
+            elif flags & _TCP_RST:
+                future.set_result(False)
+    
+    def close(self) -> None:
+        """Stop reading replies and close the sockets."""
+        if not self.loop.is_closed():
+            self.loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._reserved.close()
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+
+class PortCheckPool:
+    """
+    Fixed pool of long-lived workers that run port checks from one queue.
+    
+    Port checks for every host are queued here instead of each host
+    fanning out its own coroutines, so the number of in-flight
+    connections is bounded by the worker count for the whole scan.
+    Dropping a check (budget exhausted or stop predicate met) cancels it,
+    whether it is still queued or already running.
+    """
+    
+    def __init__(self, check: Callable[[str, int], Any], workers: int):
+        self._check = check
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(workers)]
+    
+    async def _worker(self) -> None:
+        while True:
+            ip, port, future = await self._queue.get()
+            if future.done():
+                continue
+            check = asyncio.ensure_future(self._check(ip, port))
+            future.add_done_callback(
+                lambda f, check=check: check.cancel() if f.cancelled() else None
+            )
+            # Waited on rather than awaited, so cancelling the worker can be
+            # told apart from cancelling the check
+            try:
+                await asyncio.wait((check,))
+            except asyncio.CancelledError:
+                check.cancel()
+                future.cancel()
+                raise
+            if check.cancelled():
+                future.cancel()
+                continue
+            error = check.exception()
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(check.result())
+    
+    async def check_ports(self, ip: str, ports: List[int],
+                          timeout: Optional[float] = None,
+                          stop: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """
+        Check ports on a host through the pool.
+        
+        Args:
+            ip: Host to check
+            ports: Ports to check, queued in this order
+            timeout: Overall time budget for all of the host's checks; checks
+                not finished by then are dropped and reported as TimeoutError
+            stop: Optional predicate on check results; once it holds for a
+                result, the host's remaining checks are dropped the same way
+        
+        Returns:
+            Check results (or raised exceptions) in port order
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for port in ports:
+            future = loop.create_future()
+            self._queue.put_nowait((ip, port, future))
+            futures.append(future)
+        if not futures:
+            return []
+        
+        return_when = asyncio.ALL_COMPLETED if stop is None else asyncio.FIRST_COMPLETED
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=return_when
+                )
+                if not done or (stop is not None and any(
+                        future.exception() is None and stop(future.result())
+                        for future in done)):
+                    break
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        
+        # Queued checks for cancelled futures are skipped by the workers
+        for future in pending:
+            future.cancel()
+        
+        results = []
+        for future in futures:
+            if future.cancelled():
+                results.append(asyncio.TimeoutError())
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+    
+    async def close(self) -> None:
+        """Stop all workers and cancel any checks still queued."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+
+
 class NetworkScanner:
     """
     Network scanner with TCP port scanning and service detection.
@@ -60,6 +423,22 @@ class NetworkScanner:
         "telnet": [b"telnet", b"login:"],
     }
     
+    # All signatures in one case-folded alternation, so a banner is scanned
+    # once; each signature maps to (priority, service) by dictionary order.
+    # The pattern is str with ASCII-only case folding, so decoded banners are
+    # matched as-is with the same results as matching their UTF-8 bytes.
+    _SIGNATURE_SERVICES = {
+        sig.decode().lower(): (priority, service)
+        for priority, (service, signatures) in enumerate(SERVICE_SIGNATURES.items())
+        for sig in signatures
+    }
+    _SIGNATURE_PATTERN = re.compile(
+        "|".join(map(re.escape, _SIGNATURE_SERVICES)), re.IGNORECASE | re.ASCII
+    )
+    
+    # Banner keywords that strengthen a mining-port detection
+    _MINING_BANNER_PATTERN = re.compile("stratum|mining|bitcoin|ethereum", re.IGNORECASE)
+    
     # Port to service mapping
     PORT_SERVICES = {
         3333: "stratum",
@@ -80,12 +459,60 @@ class NetworkScanner:
         443: "https",
     }
     
-    def __init__(self):
+    # Probes sent before reading a banner. Ports not listed here (e.g. SSH,
+    # which speaks first, or HTTPS, which needs a TLS handshake) get none.
+    _PROBES = {
+        80: b"HEAD / HTTP/1.0\r\n\r\n",
+        3333: b'{"id": 1, "method": "mining.subscribe", "params": []}\n',
+        8332: b'{"jsonrpc":"1.0","id":"1","method":"getinfo","params":[]}\n',
+        8545: b'{"jsonrpc":"2.0","method":"eth_protocolVersion","params":[],"id":1}\n',
+    }
+    
+    SCAN_MODES = ("connect", "syn")
+    
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Initialize the scanner.
+        
+        Args:
+            mode: "connect" for full TCP connects, or "syn" to find open
+                ports with half-open SYN probes (needs raw socket access and
+                falls back to connect otherwise); defaults to scan.scan_mode
+        """
         self.config = get_config_manager().get()
+        self.mode = mode or self.config.scan.scan_mode
+        if self.mode not in self.SCAN_MODES:
+            raise ValueError(f"Unknown scan mode: {self.mode}")
         self._cancelled = False
         self._progress_callback: Optional[Callable[[int, int, str], None]] = None
         self._result_callback: Optional[Callable[[HostScanResult], None]] = None
+        self._pinger: Optional[IcmpPinger] = None
+        self._syn_scanner: Optional[SynScanner] = None
+        self._port_pool: Optional[PortCheckPool] = None
+        self._load_miner_port_sets()
+        self._icmp_unavailable = False
+        self._syn_unavailable = False
         
+    @property
+    def host_budget(self) -> float:
+        """Upper bound in seconds on the port scan of a single host."""
+        return max(self.config.scan.tcp_timeout * 4, 15.0)
+    
+    def _load_miner_port_sets(self) -> None:
+        """Snapshot the configured mining ports as frozensets."""
+        miner_ports = self.config.miner_ports
+        self._miner_ports = frozenset(miner_ports.all_ports)
+        self._stratum_ports = frozenset(miner_ports.stratum_ports)
+        self._bitcoin_ports = frozenset(miner_ports.bitcoin_ports)
+        self._ethereum_ports = frozenset(miner_ports.ethereum_ports)
+        
+        # Mining ports are the likeliest to be open, so they are checked
+        # first, in configuration order
+        self._port_priority: Dict[int, int] = {}
+        for port in itertools.chain(miner_ports.stratum_ports, miner_ports.bitcoin_ports,
+                                    miner_ports.ethereum_ports, miner_ports.generic_ports):
+            self._port_priority.setdefault(port, len(self._port_priority))
+    
     def set_progress_callback(self, callback: Callable[[int, int, str], None]) -> None:
         """Set callback for progress updates (current, total, status)."""
         self._progress_callback = callback
@@ -113,133 +540,323 @@ class NetworkScanner:
         result = HostScanResult(ip_address=ip)
         
         try:
-            # Ping check first (if enabled)
-            if self.config.scan.enable_ping:
-                ping_time = await self._ping_host(ip)
-                if ping_time is not None:
+            syn_scanner = self._get_syn_scanner() if self.mode == "syn" else None
+            if syn_scanner is not None:
+                # Any answer to a SYN proves the host is up; ping only
+                # hosts that answered none of them
+                result.open_ports, rtt = await self._syn_scan_ports(syn_scanner, ip, ports)
+                if rtt is not None:
                     result.is_responsive = True
-                    result.ping_time_ms = ping_time
-            
-            # TCP port scan
-            open_ports = await self._scan_ports(ip, ports)
-            result.open_ports = open_ports
+                    result.ping_time_ms = rtt
+                elif self.config.scan.enable_ping:
+                    ping_time = await self._ping_host(ip)
+                    if ping_time is not None:
+                        result.is_responsive = True
+                        result.ping_time_ms = ping_time
+            else:
+                # Ping check first (if enabled)
+                if self.config.scan.enable_ping:
+                    ping_time = await self._ping_host(ip)
+                    if ping_time is not None:
+                        result.is_responsive = True
+                        result.ping_time_ms = ping_time
+                
+                # TCP port scan
+                result.open_ports = await self._scan_ports(ip, ports)
             
             # Analyze for mining services
             self._analyze_miner_detection(result)
             
+        except (asyncio.TimeoutError, OSError) as e:
+            # Expected for unreachable hosts; not worth an error per address
+            result.scan_error = str(e)
+            logger.debug("Network error scanning %s: %s", ip, e)
         except Exception as e:
             result.scan_error = str(e)
-            logger.error(f"Error scanning {ip}: {e}")
+            logger.error("Error scanning %s: %s", ip, e)
         
         return result
     
     async def scan_range(self, ip_generator, ports: List[int],
-                        progress_callback: Optional[Callable] = None) -> List[HostScanResult]:
+                        progress_callback: Optional[Callable] = None,
+                        total: Optional[int] = None) -> List[HostScanResult]:
         """
         Scan a range of IPs with controlled concurrency.
         
+        Collects everything iter_range() yields; use that directly to handle
+        results as they arrive instead of holding the whole range.
+        
         Args:
-            ip_generator: Generator yielding IP addresses
+            ip_generator: Iterable yielding IP addresses
             ports: List of ports to scan
             progress_callback: Optional callback for progress
+            total: Number of IPs the generator yields, for progress reporting;
+                taken from len() when omitted and the iterable is sized
             
         Returns:
             List of HostScanResult
         """
+        return [result async for result in self.iter_range(
+            ip_generator, ports, progress_callback=progress_callback, total=total
+        )]
+    
+    async def iter_range(self, ip_generator, ports: List[int],
+                         progress_callback: Optional[Callable] = None,
+                         total: Optional[int] = None) -> AsyncIterator[HostScanResult]:
+        """
+        Scan a range of IPs, yielding each host's result as it completes.
+        
+        IPs are pulled from the generator lazily through a bounded queue by a
+        fixed set of workers, so only ``concurrency`` hosts are in flight and
+        the range is never materialized. Finished results also pass through
+        a bounded queue, so a slow consumer holds back the workers rather
+        than letting results pile up.
+        
+        Args:
+            ip_generator: Iterable yielding IP addresses
+            ports: List of ports to scan
+            progress_callback: Optional callback for progress
+            total: Number of IPs the generator yields, for progress reporting;
+                taken from len() when omitted and the iterable is sized
+            
+        Yields:
+            HostScanResult for each scanned host, in completion order
+        """
         self._cancelled = False
         self._progress_callback = progress_callback or self._progress_callback
+        # Pick up any port configuration changes made since the last scan
+        self._load_miner_port_sets()
         
-        results = []
-        ip_list = list(ip_generator)
-        total = len(ip_list)
+        if total is None:
+            total = len(ip_generator) if hasattr(ip_generator, "__len__") else 0
+        
+        concurrency = self.config.scan.concurrency
         completed = 0
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        # None marks the end of the scan
+        results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
         
-        # Create semaphore for concurrency control
-        semaphore = asyncio.Semaphore(self.config.scan.concurrency)
+        # One worker per connection the concurrent hosts could have open
+        self._port_pool = PortCheckPool(
+            self._check_port,
+            concurrency * max(1, len(ports))
+        )
         
-        async def scan_with_semaphore(ip: str) -> HostScanResult:
-            async with semaphore:
+        async def produce() -> None:
+            nonlocal total
+            produced = 0
+            for ip in ip_generator:
                 if self._cancelled:
-                    return HostScanResult(ip_address=ip, scan_error="Cancelled")
-                return await self.scan_host(ip, ports)
-        
-        # Create tasks
-        tasks = [scan_with_semaphore(str(ip)) for ip in ip_list]
+                    break
+                await queue.put(str(ip))
+                produced += 1
+            else:
+                # The exact count is known once the generator is exhausted
+                total = produced
+            for _ in range(concurrency):
+                await queue.put(None)
         
-        # Process results as they complete
-        for coro in asyncio.as_completed(tasks):
-            if self._cancelled:
-                break
+        async def consume() -> None:
+            nonlocal completed
+            while True:
+                ip = await queue.get()
+                if ip is None:
+                    return
+                if self._cancelled:
+                    continue
                 
-            result = await coro
-            results.append(result)
-            completed += 1
-            
-            if self._result_callback:
-                self._result_callback(result)
-            
-            if self._progress_callback:
-                self._progress_callback(completed, total, f"Scanned {result.ip_address}")
+                result = await self.scan_host(ip, ports)
+                if self._cancelled:
+                    continue
+                completed += 1
+                
+                if self._result_callback:
+                    self._result_callback(result)
+                
+                if self._progress_callback:
+                    self._progress_callback(completed, max(total, completed),
+                                            f"Scanned {result.ip_address}")
+                await results.put(result)
         
-        return results
+        workers = [asyncio.ensure_future(produce())]
+        workers.extend(asyncio.ensure_future(consume()) for _ in range(concurrency))
+        
+        async def run() -> None:
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await results.put(None)
+        
+        runner = asyncio.ensure_future(run())
+        tasks = workers + [runner]
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            # Surface any error that ended the scan
+            await runner
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._port_pool.close()
+            self._port_pool = None
+            self._close_pinger()
+            self._close_syn_scanner()
     
     async def _ping_host(self, ip: str) -> Optional[float]:
         """
-        Perform ICMP ping to host.
+        Check whether a host is reachable.
         Returns round-trip time in ms or None if unreachable.
+        
+        Sends an ICMP echo from a shared socket; when ICMP sockets are not
+        available, times a TCP connect to port 80 instead, where a refused
+        connection also proves the host is up.
         """
+        timeout = self.config.scan.ping_timeout
+        
+        pinger = self._get_pinger()
+        if pinger is not None:
+            return await pinger.ping(ip, timeout)
+        
+        loop = asyncio.get_running_loop()
+        start = loop.time()
         try:
-            # Use asyncio subprocess for ping
-            ping_cmd = ["ping", "-c", "1", "-W", str(int(self.config.scan.ping_timeout)), ip]
-            
-            proc = await asyncio.create_subprocess_exec(
-                *ping_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, 80),
+                timeout=timeout
             )
-            
-            try:
-                stdout, _ = await asyncio.wait_for(
-                    proc.communicate(),
-                    timeout=self.config.scan.ping_timeout + 1
-                )
-            except asyncio.TimeoutError:
-                proc.kill()
-                return None
-            
-            if proc.returncode == 0:
-                # Parse time from ping output
-                output = stdout.decode('utf-8', errors='ignore')
-                for line in output.split('\n'):
-                    if 'time=' in line:
-                        try:
-                            time_part = line.split('time=')[1].split()[0]
-                            return float(time_part.replace('ms', ''))
-                        except (IndexError, ValueError):
-                            pass
-                return 0.0  # Success but couldn't parse time
-            
+            writer.close()
+        except ConnectionRefusedError:
+            pass
+        except (asyncio.TimeoutError, OSError):
             return None
-            
-        except Exception as e:
-            logger.debug(f"Ping failed for {ip}: {e}")
+        
+        return (loop.time() - start) * 1000
+    
+    def _get_pinger(self) -> Optional[IcmpPinger]:
+        """Get the ICMP pinger for the running loop, creating it on first use."""
+        if self._icmp_unavailable:
             return None
+        
+        loop = asyncio.get_running_loop()
+        if self._pinger is not None and self._pinger.loop is loop:
+            return self._pinger
+        
+        self._close_pinger()
+        try:
+            self._pinger = IcmpPinger(loop)
+        except OSError as e:
+            logger.info("ICMP sockets unavailable (%s); using TCP reachability checks", e)
+            self._icmp_unavailable = True
+        return self._pinger
+    
+    def _close_pinger(self) -> None:
+        """Release the ICMP socket, if one is open."""
+        if self._pinger is not None:
+            self._pinger.close()
+            self._pinger = None
+    
+    def _get_syn_scanner(self) -> Optional[SynScanner]:
+        """Get the SYN scanner for the running loop, creating it on first use."""
+        if self._syn_unavailable:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        if self._syn_scanner is not None and self._syn_scanner.loop is loop:
+            return self._syn_scanner
+        
+        self._close_syn_scanner()
+        try:
+            self._syn_scanner = SynScanner(loop)
+        except OSError as e:
+            logger.info("Raw TCP sockets unavailable (%s); using connect scans", e)
+            self._syn_unavailable = True
+        return self._syn_scanner
+    
+    def _close_syn_scanner(self) -> None:
+        """Release the SYN scanner's sockets, if open."""
+        if self._syn_scanner is not None:
+            self._syn_scanner.close()
+            self._syn_scanner = None
+    
+    async def _syn_scan_ports(self, syn_scanner: SynScanner, ip: str,
+                              ports: List[int]) -> tuple:
+        """
+        Find a host's open ports with SYN probes.
+        
+        Only ports that answered SYN-ACK are connected to, and only when
+        banners are wanted.
+        
+        Returns:
+            Tuple of (open port results, fastest answer in ms or None if the
+            host answered no probe)
+        """
+        timeout = self.config.scan.tcp_timeout
+        answers = await asyncio.gather(
+            *(syn_scanner.probe(ip, port, timeout) for port in ports)
+        )
+        
+        rtts = [rtt for state, rtt in answers if state is not None]
+        open_ports = [(port, rtt) for port, (state, rtt) in zip(ports, answers) if state]
+        
+        if self.config.scan.enable_banner_grab:
+            port_results = await self._scan_ports(ip, [port for port, _ in open_ports])
+        else:
+            port_results = [
+                PortScanResult(port=port, is_open=True,
+                               service_name=self.PORT_SERVICES.get(port, "unknown"),
+                               response_time_ms=rtt)
+                for port, rtt in open_ports
+            ]
+        
+        return port_results, min(rtts) if rtts else None
     
     async def _scan_ports(self, ip: str, ports: List[int]) -> List[PortScanResult]:
-        """Scan multiple ports on a host."""
-        tasks = [self._check_port(ip, port) for port in ports]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        """
+        Scan multiple ports on a host.
+        
+        The whole host is bounded by host_budget, so a host that stalls many
+        connections cannot hold up the sweep; ports still unchecked when the
+        budget runs out are left out of the results.
+        """
+        budget = self.host_budget
+        stop = self._is_miner_banner if self.config.scan.stop_on_miner_banner else None
+        
+        # Reported open ports keep the caller's order
+        order = {port: i for i, port in enumerate(ports)}
+        priority = self._port_priority
+        unranked = len(priority)
+        ports = sorted(ports, key=lambda port: priority.get(port, unranked))
+        
+        if self._port_pool is not None:
+            results = await self._port_pool.check_ports(ip, ports, budget, stop)
+        else:
+            # Standalone scan_host call: a short-lived pool for this host
+            pool = PortCheckPool(self._check_port, max(1, len(ports)))
+            try:
+                results = await pool.check_ports(ip, ports, budget, stop)
+            finally:
+                await pool.close()
         
         port_results = []
         for port, result in zip(ports, results):
             if isinstance(result, Exception):
-                logger.debug(f"Port scan error for {ip}:{port}: {result}")
+                logger.debug("Port scan error for %s:%d: %s", ip, port, result)
                 continue
             if result.is_open:
                 port_results.append(result)
         
+        port_results.sort(key=lambda result: order[result.port])
         return port_results
     
+    def _is_miner_banner(self, result: PortScanResult) -> bool:
+        """Whether an open mining port answered with a mining banner."""
+        return (result.is_open and result.port in self._miner_ports
+                and self._MINING_BANNER_PATTERN.search(result.banner) is not None)
+    
     async def _check_port(self, ip: str, port: int) -> PortScanResult:
         """Check if a single port is open and grab banner."""
         result = PortScanResult(port=port, is_open=False)
@@ -263,11 +880,15 @@ class NetworkScanner:
                 # Use port mapping
                 result.service_name = self.PORT_SERVICES.get(port, "unknown")
             
-            writer.close()
-            try:
-                await writer.wait_closed()
-            except Exception:
-                pass
+            # Don't wait for the FIN handshake; a connection that produced no
+            # banner was only a reachability check and is reset outright
+            if result.banner:
+                writer.close()
+            else:
+                try:
+                    writer.transport.abort()
+                except AttributeError:
+                    writer.close()
             
             result.response_time_ms = (time.time() - start_time) * 1000
             
@@ -278,7 +899,7 @@ class NetworkScanner:
         except OSError:
             pass
         except Exception as e:
-            logger.debug(f"Error checking {ip}:{port}: {e}")
+            logger.debug("Error checking %s:%d: %s", ip, port, e)
         
         return result
     
@@ -309,21 +930,13 @@ class NetworkScanner:
         except asyncio.TimeoutError:
             pass
         except Exception as e:
-            logger.debug(f"Banner grab error: {e}")
+            logger.debug("Banner grab error: %s", e)
         
         return banner[:500]  # Limit length
     
-    def _get_probe_for_port(self, port: int) -> bytes:
-        """Get appropriate probe bytes for a port."""
-        probes = {
-            80: b"HEAD / HTTP/1.0\r\n\r\n",
-            443: b"",  # SSL handshake needed
-            22: b"",  # SSH sends banner first
-            3333: b'{"id": 1, "method": "mining.subscribe", "params": []}\n',
-            8332: b'{"jsonrpc":"1.0","id":"1","method":"getinfo","params":[]}\n',
-            8545: b'{"jsonrpc":"2.0","method":"eth_protocolVersion","params":[],"id":1}\n',
-        }
-        return probes.get(port, b"")
+    def _get_probe_for_port(self, port: int) -> Optional[bytes]:
+        """Get appropriate probe bytes for a port, or None to just listen."""
+        return self._PROBES.get(port)
     
     def _detect_service(self, port: int, banner: str) -> str:
         """Detect service type from port and banner."""
@@ -331,12 +944,10 @@ class NetworkScanner:
         if port in self.PORT_SERVICES:
             return self.PORT_SERVICES[port]
         
-        # Check banner signatures
-        banner_lower = banner.lower().encode()
-        for service, signatures in self.SERVICE_SIGNATURES.items():
-            for sig in signatures:
-                if sig.lower() in banner_lower:
-                    return service
+        # Check banner signatures; the earliest-listed service wins
+        matches = self._SIGNATURE_PATTERN.findall(banner)
+        if matches:
+            return min(self._SIGNATURE_SERVICES[sig.lower()] for sig in matches)[1]
         
         return "unknown"
     
@@ -345,40 +956,72 @@ class NetworkScanner:
         if not result.open_ports:
             return
         
-        miner_ports = set(self.config.miner_ports.all_ports)
-        open_port_numbers = {p.port for p in result.open_ports}
+        miner_ports = self._miner_ports
         
         # Check for known mining ports
-        mining_ports_found = open_port_numbers & miner_ports
+        mining_ports_found = miner_ports.intersection(p.port for p in result.open_ports)
         
         if mining_ports_found:
             result.is_miner_detected = True
             
             # Determine miner type
             miner_types = []
-            if mining_ports_found & set(self.config.miner_ports.stratum_ports):
+            if not self._stratum_ports.isdisjoint(mining_ports_found):
                 miner_types.append("Stratum")
-            if mining_ports_found & set(self.config.miner_ports.bitcoin_ports):
+            if not self._bitcoin_ports.isdisjoint(mining_ports_found):
                 miner_types.append("Bitcoin")
-            if mining_ports_found & set(self.config.miner_ports.ethereum_ports):
+            if not self._ethereum_ports.isdisjoint(mining_ports_found):
                 miner_types.append("Ethereum")
             
             result.miner_type = "/".join(miner_types) if miner_types else "Unknown"
             
-            # Calculate confidence score (0-100)
-            confidence = min(100, len(mining_ports_found) * 25 + 25)
-            
-            # Check banners for stronger evidence
-            for port_result in result.open_ports:
-                if port_result.port in miner_ports and port_result.banner:
-                    confidence = min(100, confidence + 20)
-                    if any(sig in port_result.banner.lower() for sig in 
-                          ['stratum', 'mining', 'bitcoin', 'ethereum']):
-                        confidence = min(100, confidence + 15)
+            # Banners on mining ports are stronger evidence (+20 each), and
+            # more so when they mention mining keywords (+15 each)
+            banners = [p.banner for p in result.open_ports
+                       if p.banner and p.port in miner_ports]
+            search = self._MINING_BANNER_PATTERN.search
+            keyword_banners = sum(1 for banner in banners if search(banner))
             
-            result.confidence_score = confidence
+            # Calculate confidence score (0-100)
+            result.confidence_score = min(
+                100,
+                len(mining_ports_found) * 25 + 25
+                + 20 * len(banners) + 15 * keyword_banners
+            )
+
+
+_event_loop_policy_set = False
+
+
+def _set_event_loop_policy() -> None:
+    """
+    Prefer a faster event loop for scanning, once per process.
+    
+    Uses uvloop when installed (set ILAM_UVLOOP=0 to opt out). On Windows
+    the selector loop is used instead of the proactor loop, which copes
+    poorly with many concurrent connections.
+    """
+    global _event_loop_policy_set
+    if _event_loop_policy_set:
+        return
+    _event_loop_policy_set = True
+    
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return
+    
+    if os.environ.get('ILAM_UVLOOP', '1') != '1':
+        return
+    
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.debug("Using uvloop event loop")
+    except ImportError:
+        pass
 
 
 def get_network_scanner() -> NetworkScanner:
     """Get network scanner instance."""
+    _set_event_loop_policy()
     return NetworkScanner()
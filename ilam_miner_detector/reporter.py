@@ -5,18 +5,299 @@ Creates JSON, HTML, and CSV reports from scan results.
 
 import json
 import csv
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import asdict
 
-from .database import ScanRecord, HostRecord, get_db_manager
-from .map_generator import get_map_generator
+from .database import ScanRecord, HostRecord, decode_ports, get_db_manager
 from .config_manager import get_config_manager
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Write buffer for report files streamed in many small pieces
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _orjson_matches_json(value: Any) -> bool:
+    """Whether orjson renders a value exactly as json.dumps does."""
+    kind = type(value)
+    if kind is str or kind is bool or value is None or kind is datetime:
+        return True
+    if kind is float:
+        # orjson writes 1e-05 as 0.00001, 1e+16 as 1e16 and NaN as null
+        text = repr(value)
+        return 'e' not in text and text[-1].isdigit()
+    if kind is int:
+        return -2 ** 63 <= value < 2 ** 64
+    if kind is list or kind is tuple:
+        return all(map(_orjson_matches_json, value))
+    if kind is dict:
+        return (all(type(key) is str for key in value)
+                and all(map(_orjson_matches_json, value.values())))
+    # Enums, dataclasses and the like differ from json's default=str
+    return False
+
+
+def _json_at_depth(value: Any, depth: int) -> str:
+    """Serialize a value with indent=2 as if nested depth levels deep."""
+    text = None
+    if ORJSON_AVAILABLE and _orjson_matches_json(value):
+        # Same layout as json.dumps; kept only when ASCII without DEL,
+        # since json escapes those characters
+        text = orjson.dumps(
+            value, default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME
+        ).decode('utf-8')
+        if not text.isascii() or '\x7f' in text:
+            text = None
+    if text is None:
+        text = json.dumps(value, indent=2, default=str)
+    # JSON strings escape newlines, so every newline here is layout
+    return text.replace('\n', '\n' + '  ' * depth)
+
+
+# Characters escaped in text from the database before it goes into HTML
+_HTML_ESCAPES = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'
+})
+
+
+def _escape_html(value: Any) -> str:
+    """Escape a value for HTML text or attributes, like html.escape()."""
+    return str(value).translate(_HTML_ESCAPES)
+
+
+@functools.lru_cache(maxsize=4096)
+def _html_ports(open_ports: str, limit: int) -> str:
+    """Escaped, comma-separated first ports of an open_ports JSON column."""
+    try:
+        ports = decode_ports(open_ports)
+    except json.JSONDecodeError:
+        return ''
+    return _escape_html(', '.join(map(str, ports[:limit])))
+
+
+# Stylesheet shared by every HTML report, written once next to the reports
+# and linked from each of them
+REPORT_CSS_PATH = Path('assets') / 'report.css'
+
+_REPORT_CSS = """body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    margin: 0;
+    padding: 20px;
+    background-color: #f5f5f5;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background: white;
+    padding: 30px;
+    border-radius: 8px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+h1 {
+    color: #d32f2f;
+    border-bottom: 3px solid #d32f2f;
+    padding-bottom: 10px;
+}
+h2 {
+    color: #333;
+    margin-top: 30px;
+}
+.summary {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+    gap: 20px;
+    margin: 20px 0;
+}
+.summary-card {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    padding: 20px;
+    border-radius: 8px;
+    text-align: center;
+}
+.summary-card.alert {
+    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+}
+.summary-card h3 {
+    margin: 0 0 10px 0;
+    font-size: 14px;
+    opacity: 0.9;
+}
+.summary-card .value {
+    font-size: 32px;
+    font-weight: bold;
+}
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin: 20px 0;
+}
+th, td {
+    padding: 12px;
+    text-align: left;
+    border-bottom: 1px solid #ddd;
+}
+th {
+    background-color: #f8f9fa;
+    font-weight: 600;
+    color: #333;
+}
+tr:hover {
+    background-color: #f8f9fa;
+}
+.miner-row {
+    background-color: #ffebee !important;
+}
+.miner-row:hover {
+    background-color: #ffcdd2 !important;
+}
+.confidence {
+    padding: 4px 8px;
+    border-radius: 4px;
+    font-weight: bold;
+}
+.confidence.high {
+    background-color: #ffebee;
+    color: #c62828;
+}
+.confidence.medium {
+    background-color: #fff3e0;
+    color: #ef6c00;
+}
+.confidence.low {
+    background-color: #e3f2fd;
+    color: #1565c0;
+}
+.metadata {
+    background: #f8f9fa;
+    padding: 15px;
+    border-radius: 4px;
+    font-size: 14px;
+    color: #666;
+}
+.alert-box {
+    background-color: #ffebee;
+    border-left: 4px solid #d32f2f;
+    padding: 15px;
+    margin: 20px 0;
+}
+.alert-box h3 {
+    margin: 0 0 10px 0;
+    color: #d32f2f;
+}
+"""
+
+_HTML_STYLESHEET_LINK = f'    <link rel="stylesheet" href="{REPORT_CSS_PATH.as_posix()}">'
+
+# HTML report skeleton; _build_html_report fills in the placeholders
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Ilam Miner Detection Report - {scan_name}</title>
+{stylesheet}
+</head>
+<body>
+    <div class="container">
+        <h1>🚨 Ilam Miner Detection Report</h1>
+        
+        <div class="metadata">
+            <strong>Scan Name:</strong> {scan_name}<br>
+            <strong>CIDR Range:</strong> {cidr_range}<br>
+            <strong>Start Time:</strong> {start_time}<br>
+            <strong>Status:</strong> {status}<br>
+            <strong>Generated:</strong> {generated}
+        </div>
+        
+        <div class="summary">
+            <div class="summary-card">
+                <h3>Total Hosts</h3>
+                <div class="value">{total_hosts}</div>
+            </div>
+            <div class="summary-card">
+                <h3>Responsive</h3>
+                <div class="value">{responsive_hosts}</div>
+            </div>
+            <div class="summary-card alert">
+                <h3>Miners Detected</h3>
+                <div class="value">{miners_detected}</div>
+            </div>
+            <div class="summary-card">
+                <h3>Detection Rate</h3>
+                <div class="value">{detection_rate:.1f}%</div>
+            </div>
+        </div>
+        
+        {alert}
+        
+        <h2>Detected Miners</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>IP Address</th>
+                    <th>Type</th>
+                    <th>Confidence</th>
+                    <th>Open Ports</th>
+                </tr>
+            </thead>
+            <tbody>
+                {miner_rows}
+            </tbody>
+        </table>
+        
+        <h2>All Hosts</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>IP Address</th>
+                    <th>Responsive</th>
+                    <th>Ping</th>
+                    <th>Open Ports</th>
+                    <th>Miner</th>
+                    <th>Type</th>
+                    <th>Confidence</th>
+                </tr>
+            </thead>
+            <tbody>
+                {host_rows}
+            </tbody>
+        </table>
+        
+        {map_section}
+        
+        <div style="margin-top: 40px; padding-top: 20px; border-top: 1px solid #ddd; color: #999; font-size: 12px;">
+            <p>Generated by Ilam Miner Detector v1.0.0</p>
+            <p>This report is for authorized security auditing purposes only.</p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+# Optional pieces of the skeleton
+_HTML_ALERT = """
+        <div class="alert-box">
+            <h3>⚠️ High Priority Alerts</h3>
+            <p>{count} potential cryptocurrency mining operations detected in the scanned range.</p>
+        </div>
+        """
+
+_HTML_NO_MINERS = '<tr><td colspan="4" style="text-align:center;color:#999;">No miners detected</td></tr>'
+_HTML_NO_HOSTS = '<tr><td colspan="7" style="text-align:center;color:#999;">No hosts scanned</td></tr>'
+_HTML_MAP_SECTION = '<h2>Geographic Map</h2><p>An interactive map has been generated showing detection locations.</p>'
+
 
 class ReportGenerator:
     """
@@ -33,39 +314,49 @@ class ReportGenerator:
         """Generate timestamp string for filenames."""
         return datetime.now().strftime(self.config.reporting.timestamp_format)
     
-    def export_json(self, scan_id: int, output_path: Optional[str] = None) -> str:
+    def load_scan(self, scan_id: int) -> Tuple[ScanRecord, List[HostRecord]]:
+        """
+        Load a scan and its hosts for exporting.
+        
+        Args:
+            scan_id: Scan ID to load
+            
+        Returns:
+            Tuple of (scan, hosts)
+        """
+        scan = self.db.get_scan(scan_id)
+        if not scan:
+            raise ValueError(f"Scan {scan_id} not found")
+        
+        return scan, self.db.get_hosts_by_scan(scan_id)
+    
+    def export_json(self, scan_id: int, output_path: Optional[str] = None,
+                    data: Optional[Tuple[ScanRecord, List[HostRecord]]] = None) -> str:
         """
         Export scan results to JSON.
         
         Args:
             scan_id: Scan ID to export
             output_path: Custom output path (optional)
+            data: Scan and hosts already returned by load_scan() (optional)
             
         Returns:
             Path to exported file
         """
-        scan = self.db.get_scan(scan_id)
-        if not scan:
-            raise ValueError(f"Scan {scan_id} not found")
+        scan, hosts = data or self.load_scan(scan_id)
         
-        hosts = self.db.get_hosts_by_scan(scan_id)
-        
-        # Build report structure
-        report = {
-            "metadata": {
-                "report_type": "Ilam Miner Detection Report",
-                "generated_at": datetime.now().isoformat(),
-                "version": "1.0.0"
-            },
-            "scan": scan.to_dict(),
-            "hosts": [host.to_dict() for host in hosts],
-            "summary": {
-                "total_hosts": scan.total_hosts,
-                "responsive_hosts": scan.responsive_hosts,
-                "miners_detected": scan.miners_detected,
-                "detection_rate": (scan.miners_detected / scan.total_hosts * 100) 
-                                  if scan.total_hosts > 0 else 0
-            }
+        # Report sections other than the host list
+        metadata = {
+            "report_type": "Ilam Miner Detection Report",
+            "generated_at": datetime.now().isoformat(),
+            "version": "1.0.0"
+        }
+        summary = {
+            "total_hosts": scan.total_hosts,
+            "responsive_hosts": scan.responsive_hosts,
+            "miners_detected": scan.miners_detected,
+            "detection_rate": (scan.miners_detected / scan.total_hosts * 100) 
+                              if scan.total_hosts > 0 else 0
         }
         
         # Determine output path
@@ -73,29 +364,42 @@ class ReportGenerator:
             timestamp = self.generate_timestamp()
             output_path = self.reports_dir / f"scan_{scan_id}_{timestamp}.json"
         
-        # Write JSON
-        with open(output_path, 'w') as f:
-            json.dump(report, f, indent=2, default=str)
+        # Write JSON one host at a time, laid out exactly as
+        # json.dump(report, f, indent=2) would, without holding the whole
+        # report in memory
+        with open(output_path, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write('{\n  "metadata": ')
+            f.write(_json_at_depth(metadata, 1))
+            f.write(',\n  "scan": ')
+            f.write(_json_at_depth(scan.to_dict(), 1))
+            f.write(',\n  "hosts": [')
+            separator = '\n    '
+            for host in hosts:
+                f.write(separator)
+                f.write(_json_at_depth(host.to_dict(), 2))
+                separator = ',\n    '
+            f.write('\n  ]' if hosts else ']')
+            f.write(',\n  "summary": ')
+            f.write(_json_at_depth(summary, 1))
+            f.write('\n}')
         
         logger.info(f"JSON report saved to {output_path}")
         return str(output_path)
     
-    def export_csv(self, scan_id: int, output_path: Optional[str] = None) -> str:
+    def export_csv(self, scan_id: int, output_path: Optional[str] = None,
+                   data: Optional[Tuple[ScanRecord, List[HostRecord]]] = None) -> str:
         """
         Export scan results to CSV.
         
         Args:
             scan_id: Scan ID to export
             output_path: Custom output path (optional)
+            data: Scan and hosts already returned by load_scan() (optional)
             
         Returns:
             Path to exported file
         """
-        scan = self.db.get_scan(scan_id)
-        if not scan:
-            raise ValueError(f"Scan {scan_id} not found")
-        
-        hosts = self.db.get_hosts_by_scan(scan_id)
+        scan, hosts = data or self.load_scan(scan_id)
         
         # Determine output path
         if output_path is None:
@@ -108,28 +412,32 @@ class ReportGenerator:
             'is_miner_detected', 'miner_type', 'confidence_score', 'timestamp'
         ]
         
-        with open(output_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
+        with open(output_path, 'w', newline='', encoding='utf-8',
+                  buffering=WRITE_BUFFER_SIZE) as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
             
-            for host in hosts:
-                row = {
-                    'ip_address': host.ip_address,
-                    'is_responsive': host.is_responsive,
-                    'ping_time_ms': host.ping_time_ms or '',
-                    'open_ports': host.open_ports,
-                    'is_miner_detected': host.is_miner_detected,
-                    'miner_type': host.miner_type,
-                    'confidence_score': host.confidence_score,
-                    'timestamp': host.timestamp.isoformat() if host.timestamp else ''
-                }
-                writer.writerow(row)
+            # Rows in fieldnames order, written in one call
+            writer.writerows(
+                (
+                    host.ip_address,
+                    host.is_responsive,
+                    host.ping_time_ms or '',
+                    host.open_ports,
+                    host.is_miner_detected,
+                    host.miner_type,
+                    host.confidence_score,
+                    host.timestamp.isoformat() if host.timestamp else ''
+                )
+                for host in hosts
+            )
         
         logger.info(f"CSV report saved to {output_path}")
         return str(output_path)
     
     def export_html(self, scan_id: int, output_path: Optional[str] = None,
-                   include_map: bool = True) -> str:
+                   include_map: bool = True,
+                   data: Optional[Tuple[ScanRecord, List[HostRecord]]] = None) -> str:
         """
         Export scan results to HTML report.
         
@@ -137,15 +445,12 @@ class ReportGenerator:
             scan_id: Scan ID to export
             output_path: Custom output path (optional)
             include_map: Whether to include interactive map
+            data: Scan and hosts already returned by load_scan() (optional)
             
         Returns:
             Path to exported file
         """
-        scan = self.db.get_scan(scan_id)
-        if not scan:
-            raise ValueError(f"Scan {scan_id} not found")
-        
-        hosts = self.db.get_hosts_by_scan(scan_id)
+        scan, hosts = data or self.load_scan(scan_id)
         miners = [h for h in hosts if h.is_miner_detected]
         
         # Determine output path
@@ -154,32 +459,25 @@ class ReportGenerator:
             output_path = self.reports_dir / f"scan_{scan_id}_{timestamp}.html"
         
         # Parse host data for display
-        host_data = []
-        for host in hosts:
-            try:
-                open_ports = json.loads(host.open_ports) if host.open_ports else []
-            except json.JSONDecodeError:
-                open_ports = []
-            
-            try:
-                banner_info = json.loads(host.banner_info) if host.banner_info else {}
-            except json.JSONDecodeError:
-                banner_info = {}
-            
-            host_data.append({
-                'ip': host.ip_address,
+        host_data = [
+            {
+                'ip': _escape_html(host.ip_address),
                 'responsive': 'Yes' if host.is_responsive else 'No',
                 'ping': f"{host.ping_time_ms:.2f}ms" if host.ping_time_ms else 'N/A',
-                'ports': ', '.join(str(p) for p in open_ports[:5]),
+                'ports': _html_ports(host.open_ports, 5),
                 'miner': 'Yes' if host.is_miner_detected else 'No',
-                'type': host.miner_type,
-                'confidence': f"{host.confidence_score:.1f}%"
-            })
+                'type': _escape_html(host.miner_type),
+                'confidence': f"{host.confidence_score:.1f}%",
+                'level': 'high' if round(host.confidence_score, 1) >= 50 else 'low'
+            }
+            for host in hosts
+        ]
         
         # Build HTML
         html_content = self._build_html_report(scan, host_data, miners, include_map)
         
         # Write HTML
+        self._write_stylesheet(Path(output_path).parent)
         with open(output_path, 'w') as f:
             f.write(html_content)
         
@@ -206,52 +504,69 @@ class ReportGenerator:
         timestamp = self.generate_timestamp()
         reports = {}
         
-        for fmt in self.config.reporting.export_formats:
+        # Every format reports the same rows, so query them once
+        data = self.load_scan(scan_id)
+        
+        exporters = {
+            'json': functools.partial(self.export_json, data=data),
+            'csv': functools.partial(self.export_csv, data=data),
+            'html': functools.partial(self.export_html, data=data,
+                                      include_map=self.config.reporting.include_map),
+        }
+        formats = [fmt for fmt in self.config.reporting.export_formats if fmt in exporters]
+        
+        # Each format writes its own file, so generate them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, len(formats))) as executor:
+            futures = {
+                fmt: executor.submit(
+                    exporters[fmt], scan_id,
+                    str(self.reports_dir / f"scan_{scan_id}_{timestamp}.{fmt}")
+                )
+                for fmt in formats
+            }
+        
+        for fmt, future in futures.items():
             try:
-                if fmt == 'json':
-                    path = self.reports_dir / f"scan_{scan_id}_{timestamp}.json"
-                    reports['json'] = self.export_json(scan_id, str(path))
-                elif fmt == 'csv':
-                    path = self.reports_dir / f"scan_{scan_id}_{timestamp}.csv"
-                    reports['csv'] = self.export_csv(scan_id, str(path))
-                elif fmt == 'html':
-                    path = self.reports_dir / f"scan_{scan_id}_{timestamp}.html"
-                    reports['html'] = self.export_html(
-                        scan_id, str(path),
-                        include_map=self.config.reporting.include_map
-                    )
+                reports[fmt] = future.result()
             except Exception as e:
                 logger.error(f"Failed to generate {fmt} report: {e}")
                 reports[fmt] = f"Error: {str(e)}"
         
         return reports
     
+    @staticmethod
+    def _write_stylesheet(directory: Path) -> None:
+        """Write the shared report stylesheet into directory unless it is current."""
+        css_path = directory / REPORT_CSS_PATH
+        try:
+            if css_path.read_text(encoding='utf-8') == _REPORT_CSS:
+                return
+        except OSError:
+            css_path.parent.mkdir(parents=True, exist_ok=True)
+        css_path.write_text(_REPORT_CSS, encoding='utf-8')
+    
     def _build_html_report(self, scan: ScanRecord, host_data: List[Dict],
                           miners: List[HostRecord], include_map: bool) -> str:
         """Build HTML report content."""
         
         # Miner rows
-        miner_rows = ""
+        rows = []
         for host in miners:
-            try:
-                ports = json.loads(host.open_ports) if host.open_ports else []
-            except json.JSONDecodeError:
-                ports = []
-            
-            miner_rows += f"""
+            rows.append(f"""
                 <tr class="miner-row">
-                    <td>{host.ip_address}</td>
-                    <td>{host.miner_type}</td>
+                    <td>{_escape_html(host.ip_address)}</td>
+                    <td>{_escape_html(host.miner_type)}</td>
                     <td><span class="confidence high">{host.confidence_score:.1f}%</span></td>
-                    <td>{', '.join(str(p) for p in ports[:3])}</td>
+                    <td>{_html_ports(host.open_ports, 3)}</td>
                 </tr>
-            """
+            """)
+        miner_rows = "".join(rows)
         
         # All hosts rows
-        host_rows = ""
+        rows = []
         for data in host_data:
             row_class = "miner-row" if data['miner'] == 'Yes' else ""
-            host_rows += f"""
+            rows.append(f"""
                 <tr class="{row_class}">
                     <td>{data['ip']}</td>
                     <td>{data['responsive']}</td>
@@ -259,232 +574,65 @@ class ReportGenerator:
                     <td>{data['ports']}</td>
                     <td>{data['miner']}</td>
                     <td>{data['type']}</td>
-                    <td><span class="confidence {'high' if float(data['confidence'].rstrip('%')) >= 50 else 'low'}">{data['confidence']}</span></td>
+                    <td><span class="confidence {data['level']}">{data['confidence']}</span></td>
                 </tr>
-            """
-        
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Ilam Miner Detection Report - {scan.scan_name}</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            padding: 30px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #d32f2f;
-            border-bottom: 3px solid #d32f2f;
-            padding-bottom: 10px;
-        }}
-        h2 {{
-            color: #333;
-            margin-top: 30px;
-        }}
-        .summary {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin: 20px 0;
-        }}
-        .summary-card {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 8px;
-            text-align: center;
-        }}
-        .summary-card.alert {{
-            background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-        }}
-        .summary-card h3 {{
-            margin: 0 0 10px 0;
-            font-size: 14px;
-            opacity: 0.9;
-        }}
-        .summary-card .value {{
-            font-size: 32px;
-            font-weight: bold;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-        }}
-        th, td {{
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }}
-        th {{
-            background-color: #f8f9fa;
-            font-weight: 600;
-            color: #333;
-        }}
-        tr:hover {{
-            background-color: #f8f9fa;
-        }}
-        .miner-row {{
-            background-color: #ffebee !important;
-        }}
-        .miner-row:hover {{
-            background-color: #ffcdd2 !important;
-        }}
-        .confidence {{
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-weight: bold;
-        }}
-        .confidence.high {{
-            background-color: #ffebee;
-            color: #c62828;
-        }}
-        .confidence.medium {{
-            background-color: #fff3e0;
-            color: #ef6c00;
-        }}
-        .confidence.low {{
-            background-color: #e3f2fd;
-            color: #1565c0;
-        }}
-        .metadata {{
-            background: #f8f9fa;
-            padding: 15px;
-            border-radius: 4px;
-            font-size: 14px;
-            color: #666;
-        }}
-        .alert-box {{
-            background-color: #ffebee;
-            border-left: 4px solid #d32f2f;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-        .alert-box h3 {{
-            margin: 0 0 10px 0;
-            color: #d32f2f;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🚨 Ilam Miner Detection Report</h1>
-        
-        <div class="metadata">
-            <strong>Scan Name:</strong> {scan.scan_name}<br>
-            <strong>CIDR Range:</strong> {scan.cidr_range}<br>
-            <strong>Start Time:</strong> {scan.start_time.strftime('%Y-%m-%d %H:%M:%S') if scan.start_time else 'N/A'}<br>
-            <strong>Status:</strong> {scan.status.title()}<br>
-            <strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        </div>
-        
-        <div class="summary">
-            <div class="summary-card">
-                <h3>Total Hosts</h3>
-                <div class="value">{scan.total_hosts}</div>
-            </div>
-            <div class="summary-card">
-                <h3>Responsive</h3>
-                <div class="value">{scan.responsive_hosts}</div>
-            </div>
-            <div class="summary-card alert">
-                <h3>Miners Detected</h3>
-                <div class="value">{scan.miners_detected}</div>
-            </div>
-            <div class="summary-card">
-                <h3>Detection Rate</h3>
-                <div class="value">{(scan.miners_detected / scan.total_hosts * 100):.1f}%</div>
-            </div>
-        </div>
-        
-        {f'''
-        <div class="alert-box">
-            <h3>⚠️ High Priority Alerts</h3>
-            <p>{len(miners)} potential cryptocurrency mining operations detected in the scanned range.</p>
-        </div>
-        ''' if miners else ''}
-        
-        <h2>Detected Miners</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>IP Address</th>
-                    <th>Type</th>
-                    <th>Confidence</th>
-                    <th>Open Ports</th>
-                </tr>
-            </thead>
-            <tbody>
-                {miner_rows if miner_rows else '<tr><td colspan="4" style="text-align:center;color:#999;">No miners detected</td></tr>'}
-            </tbody>
-        </table>
-        
-        <h2>All Hosts</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>IP Address</th>
-                    <th>Responsive</th>
-                    <th>Ping</th>
-                    <th>Open Ports</th>
-                    <th>Miner</th>
-                    <th>Type</th>
-                    <th>Confidence</th>
-                </tr>
-            </thead>
-            <tbody>
-                {host_rows if host_rows else '<tr><td colspan="7" style="text-align:center;color:#999;">No hosts scanned</td></tr>'}
-            </tbody>
-        </table>
-        
-        {f'<h2>Geographic Map</h2><p>An interactive map has been generated showing detection locations.</p>' if include_map and miners else ''}
-        
-        <div style="margin-top: 40px; padding-top: 20px; border-top: 1px solid #ddd; color: #999; font-size: 12px;">
-            <p>Generated by Ilam Miner Detector v1.0.0</p>
-            <p>This report is for authorized security auditing purposes only.</p>
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        return html
+            """)
+        host_rows = "".join(rows)
+        
+        return _HTML_TEMPLATE.format_map({
+            'stylesheet': _HTML_STYLESHEET_LINK,
+            'scan_name': _escape_html(scan.scan_name),
+            'cidr_range': _escape_html(scan.cidr_range),
+            'start_time': scan.start_time.strftime('%Y-%m-%d %H:%M:%S') if scan.start_time else 'N/A',
+            'status': _escape_html(scan.status.title()),
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_hosts': scan.total_hosts,
+            'responsive_hosts': scan.responsive_hosts,
+            'miners_detected': scan.miners_detected,
+            'detection_rate': scan.miners_detected / scan.total_hosts * 100,
+            'alert': _HTML_ALERT.format(count=len(miners)) if miners else '',
+            'miner_rows': miner_rows or _HTML_NO_MINERS,
+            'host_rows': host_rows or _HTML_NO_HOSTS,
+            'map_section': _HTML_MAP_SECTION if include_map and miners else '',
+        })
     
     def _generate_map_for_report(self, miners: List[HostRecord], report_path: str) -> str:
         """Generate map for HTML report."""
+        # Imported here so the reporter loads without folium/requests
+        from .geolocation import get_geolocation_service
+        from .map_generator import get_map_generator
+        
         # Get geolocation data for miners
-        geo_service = __import__('ilam_miner_detector.geolocation', fromlist=['get_geolocation_service']).get_geolocation_service()
+        geo_service = get_geolocation_service()
+        
+        # Uncached miners are resolved 100 per request through the batch
+        # endpoint, paced by the service's rate limiter
+        try:
+            geos = geo_service.lookup_batch([miner.ip_address for miner in miners])
+        except Exception as e:
+            logger.warning(f"Failed to geolocate miners: {e}")
+            geos = {}
         
         map_data = []
         for miner in miners:
+            geo = geos.get(miner.ip_address)
+            if geo is None or not geo.success:
+                continue
             try:
-                geo = geo_service.lookup(miner.ip_address)
-                if geo.success:
-                    map_data.append({
-                        'ip_address': miner.ip_address,
-                        'latitude': geo.latitude,
-                        'longitude': geo.longitude,
-                        'confidence_score': miner.confidence_score,
-                        'miner_type': miner.miner_type,
-                        'city': geo.city,
-                        'region': geo.region,
-                        'country': geo.country,
-                        'isp': geo.isp,
-                        'open_ports': json.loads(miner.open_ports) if miner.open_ports else []
-                    })
-            except Exception as e:
-                logger.warning(f"Failed to geolocate {miner.ip_address}: {e}")
+                map_data.append({
+                    'ip_address': miner.ip_address,
+                    'latitude': geo.latitude,
+                    'longitude': geo.longitude,
+                    'confidence_score': miner.confidence_score,
+                    'miner_type': miner.miner_type,
+                    'city': geo.city,
+                    'region': geo.region,
+                    'country': geo.country,
+                    'isp': geo.isp,
+                    'open_ports': miner.ports
+                })
+            except json.JSONDecodeError as e:
+                logger.warning(f"Invalid open ports for {miner.ip_address}: {e}")
         
         if map_data:
             map_gen = get_map_generator()
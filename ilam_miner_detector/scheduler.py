@@ -3,20 +3,26 @@ Scan Scheduler Module - APScheduler integration for automated scanning.
 Handles recurring and scheduled scan jobs.
 """
 
+import os
 import logging
-from typing import Dict, List, Optional, Callable, Any
-from dataclasses import dataclass, field
+import functools
+from collections import Counter, defaultdict, deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Callable, Any, Iterable, Tuple
+from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from enum import Enum
 
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.schedulers.base import STATE_RUNNING
     from apscheduler.triggers.cron import CronTrigger
     from apscheduler.triggers.interval import IntervalTrigger
     from apscheduler.triggers.date import DateTrigger
     from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
     from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-    from apscheduler.executors.pool import ThreadPoolExecutor
+    from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
+    from sqlalchemy import create_engine, event
     APSCHEDULER_AVAILABLE = True
 except ImportError:
     APSCHEDULER_AVAILABLE = False
@@ -28,6 +34,38 @@ from .config_manager import get_config_manager
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _cron_trigger(cron_expression: str):
+    """Parse a standard 5-field cron expression into a (shared) CronTrigger."""
+    # Standard cron: minute hour day month day_of_week
+    return CronTrigger.from_crontab(cron_expression)
+
+
+def _create_jobstore_engine(db_path: str):
+    """
+    Create the SQLAlchemy engine for the job store database.
+    
+    Each connection uses the same WAL/NORMAL settings as the main
+    database, so job updates do not fsync or block readers.
+    """
+    engine = create_engine(
+        f'sqlite:///{db_path}',
+        connect_args={'check_same_thread': False}
+    )
+    
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+    
+    return engine
+
+
 class ScheduleFrequency(Enum):
     """Schedule frequency options."""
     ONCE = "once"
@@ -82,6 +120,9 @@ class ScanScheduler:
     Supports cron expressions, intervals, and one-time schedules.
     """
     
+    # Executions kept in memory; the full history lives in the database
+    RECENT_EXECUTIONS = 1000
+    
     def __init__(self, db_path: Optional[str] = None):
         """
         Initialize scan scheduler.
@@ -94,17 +135,31 @@ class ScanScheduler:
         
         self.db = get_db_manager()
         self.scheduled_scans: Dict[str, ScheduledScan] = {}
-        self.execution_history: List[ScanExecution] = []
+        self.execution_history: Deque[ScanExecution] = deque(maxlen=self.RECENT_EXECUTIONS)
+        # schedule id -> its recent executions, most recent first
+        self._history_by_schedule: Dict[str, Deque[ScanExecution]] = defaultdict(
+            lambda: deque(maxlen=self.RECENT_EXECUTIONS)
+        )
+        # Executions per status over the whole history, kept current by
+        # record_execution() so statistics need no query
+        try:
+            self._status_counts = Counter(self.db.get_scan_execution_counts())
+        except Exception as e:
+            logger.error(f"Failed to count executions: {e}")
+            self._status_counts = Counter()
         self._scan_callbacks: Dict[str, Callable] = {}
         
         # Configure APScheduler
         db_path = db_path or "data/scheduler.db"
         jobstores = {
-            'default': SQLAlchemyJobStore(url=f'sqlite:///{db_path}')
+            'default': SQLAlchemyJobStore(engine=_create_jobstore_engine(db_path))
         }
         
+        # Scans run in worker processes so parallel schedules are not
+        # serialized on the GIL; 'io' is for lightweight callback-only jobs
         executors = {
-            'default': ThreadPoolExecutor(10)
+            'default': ProcessPoolExecutor(os.cpu_count() or 1),
+            'io': ThreadPoolExecutor(10)
         }
         
         job_defaults = {
@@ -137,13 +192,16 @@ class ScanScheduler:
         logger.info("Scan scheduler shutdown")
     
     def add_schedule(self, schedule: ScheduledScan, 
-                    scan_callback: Callable) -> bool:
+                    scan_callback: Callable, executor: str = 'default') -> bool:
         """
         Add a new scheduled scan.
         
         Args:
             schedule: ScheduledScan configuration
-            scan_callback: Callback function to execute when scan runs
+            scan_callback: Callback function to execute when scan runs; with
+                the default process executor it must be a module-level
+                function, since it and the schedule are pickled
+            executor: 'default' (worker processes) or 'io' (threads)
             
         Returns:
             True if schedule was added successfully
@@ -151,7 +209,13 @@ class ScanScheduler:
         try:
             # Generate schedule ID if not provided
             if not schedule.id:
-                schedule.id = f"scan_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                base_id = f"scan_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                schedule.id = base_id
+                # Schedules added within the same second need distinct IDs
+                suffix = 1
+                while schedule.id in self.scheduled_scans:
+                    suffix += 1
+                    schedule.id = f"{base_id}_{suffix}"
             
             # Determine trigger based on frequency
             trigger = self._create_trigger(schedule)
@@ -167,6 +231,7 @@ class ScanScheduler:
                 id=schedule.id,
                 name=schedule.name,
                 args=[schedule],
+                executor=executor,
                 replace_existing=True
             )
             
@@ -188,6 +253,34 @@ class ScanScheduler:
             logger.error(f"Failed to add schedule: {e}")
             return False
     
+    def add_schedules_bulk(self, schedules: Iterable[Tuple[ScheduledScan, Callable]],
+                           executor: str = 'default') -> int:
+        """
+        Add several scheduled scans at once, e.g. when loading them at startup.
+        
+        Job processing is paused while the jobs are added, so the scheduler
+        thread re-reads the job store once afterwards instead of waking
+        up after every job.
+        
+        Args:
+            schedules: (schedule, scan_callback) pairs, as for add_schedule
+            executor: Executor name passed to each add_schedule call
+            
+        Returns:
+            Number of schedules added successfully
+        """
+        running = self.scheduler.state == STATE_RUNNING
+        if running:
+            self.scheduler.pause()
+        try:
+            return sum(
+                self.add_schedule(schedule, callback, executor)
+                for schedule, callback in schedules
+            )
+        finally:
+            if running:
+                self.scheduler.resume()
+    
     def _create_trigger(self, schedule: ScheduledScan):
         """
         Create APScheduler trigger from schedule configuration.
@@ -217,16 +310,7 @@ class ScanScheduler:
             if schedule.cron_expression:
                 try:
                     # Parse cron expression (e.g., "0 2 * * *" for daily at 2 AM)
-                    parts = schedule.cron_expression.split()
-                    if len(parts) == 5:
-                        # Standard cron: minute hour day month day_of_week
-                        return CronTrigger(
-                            minute=parts[0],
-                            hour=parts[1],
-                            day=parts[2],
-                            month=parts[3],
-                            day_of_week=parts[4]
-                        )
+                    return _cron_trigger(schedule.cron_expression)
                 except Exception as e:
                     logger.error(f"Invalid cron expression: {e}")
             return None
@@ -341,13 +425,27 @@ class ScanScheduler:
         Returns:
             List of ScanExecution objects
         """
-        history = self.execution_history
-        
+        # Executions recorded by this process are the most recent ones, so
+        # serve the query from memory when they are enough to fill it
         if schedule_id:
-            history = [e for e in history if e.schedule_id == schedule_id]
+            recent = self._history_by_schedule.get(schedule_id, ())
+            if len(recent) >= limit:
+                return list(islice(recent, limit))
+        elif len(self.execution_history) >= limit:
+            return list(islice(reversed(self.execution_history), limit))
         
-        # Return most recent first
-        return sorted(history, key=lambda x: x.execution_time, reverse=True)[:limit]
+        try:
+            rows = self.db.get_scan_executions(schedule_id, limit)
+        except Exception as e:
+            logger.error(f"Failed to load execution history: {e}")
+            return []
+        
+        executions = []
+        for row in rows:
+            del row['id']
+            row['execution_time'] = datetime.fromisoformat(row['execution_time'])
+            executions.append(ScanExecution(**row))
+        return executions
     
     def _job_executed(self, event) -> None:
         """Handle successful job execution event."""
@@ -385,10 +483,16 @@ class ScanScheduler:
     def record_execution(self, execution: ScanExecution) -> None:
         """Record a scan execution."""
         self.execution_history.append(execution)
+        self._history_by_schedule[execution.schedule_id].appendleft(execution)
+        self._status_counts[execution.status] += 1
         
         # Save to database
-        # Implementation depends on database schema
-        pass
+        row = asdict(execution)
+        row['execution_time'] = execution.execution_time.isoformat()
+        try:
+            self.db.add_scan_execution(row)
+        except Exception as e:
+            logger.error(f"Failed to save execution: {e}")
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get scheduler statistics."""
@@ -398,8 +502,8 @@ class ScanScheduler:
             "total_schedules": len(self.scheduled_scans),
             "enabled_schedules": len(self.get_enabled_schedules()),
             "total_executions": sum(s.run_count for s in self.scheduled_scans.values()),
-            "failed_executions": sum(1 for e in self.execution_history if e.status == "failed"),
-            "successful_executions": sum(1 for e in self.execution_history if e.status == "completed"),
+            "failed_executions": self._status_counts["failed"],
+            "successful_executions": self._status_counts["completed"],
             "scheduler_running": self.scheduler.running,
             "active_jobs": len(jobs),
         }
@@ -4,15 +4,52 @@ Identifies VPN, proxy, and anonymization services for security auditing.
 """
 
 import re
+import time
+import asyncio
+import bisect
 import logging
-from typing import List, Dict, Optional, Set
-from dataclasses import dataclass
-from ipaddress import ip_address, ip_network
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Set, Tuple, Any
+from dataclasses import dataclass, asdict
+from ipaddress import ip_address, ip_network, collapse_addresses, IPv4Network
 import requests
 
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+from .iran_isps import identify_isp_by_int
+from .database import get_db_manager
+from .geolocation import RateLimiter
+
 logger = logging.getLogger(__name__)
 
 
+def _merge_ranges(networks: List[IPv4Network]) -> Tuple[List[int], List[int]]:
+    """Merge IPv4 networks into sorted, disjoint integer (starts, ends) ranges."""
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in sorted((int(n.network_address), int(n.broadcast_address))
+                             for n in networks if n.version == 4):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def _in_ranges(ranges: Tuple[List[int], List[int]], value: int) -> bool:
+    """Whether an integer IPv4 address falls in ranges from _merge_ranges()."""
+    starts, ends = ranges
+    idx = bisect.bisect_right(starts, value) - 1
+    return idx >= 0 and value <= ends[idx]
+
+
 @dataclass
 class VPN检测结果:
     """Result of VPN/proxy detection."""
@@ -38,31 +75,29 @@ class VPNDetector:
     Uses multiple heuristics and external services for detection.
     """
     
-    # Known VPN/proxy provider ASNs
-    KNOWN_VPN_ASNS = {
+    # Known VPN/proxy provider AS numbers
+    KNOWN_VPN_ASNS = frozenset({
         # NordVPN
-        "AS44950",
+        44950,
         # ExpressVPN
-        "AS13876",
+        13876,
         # Surfshark
-        "AS13335",
+        13335,
         # CyberGhost
-        "AS56589",
+        56589,
         # Private Internet Access
-        "AS11776",
-        # Mullvad
-        "AS52019",
-        # ProtonVPN
-        "AS52019",
+        11776,
+        # Mullvad, ProtonVPN
+        52019,
         # PureVPN
-        "AS15169",
+        15169,
         # HideMyAss
-        "AS41692",
+        41692,
         # IPVanish
-        "AS46475",
+        46475,
         # VyprVPN
-        "AS13536",
-    }
+        13536,
+    })
     
     # Known VPN/proxy provider IP ranges (sample)
     KNOWN_VPN_RANGES = [
@@ -90,20 +125,57 @@ class VPNDetector:
         r"tor-exit",
     ]
     
-    # Hosting/Cloud provider ASN patterns
-    HOSTING_ASNS = {
-        "AS16509",  # AWS
-        "AS15169",  # Google Cloud
-        "AS8075",   # Microsoft Azure
-        "AS14061",  # DigitalOcean
-        "AS20473",  # Choopa
-        "AS16276",  # OVH
-    }
+    # Organization/ISP name keywords, in priority order
+    VPN_KEYWORDS = ["vpn", "proxy", "tor", "anonymous", "datacenter",
+                    "hosting", "cloud", "vps"]
+    # Finds every (possibly overlapping) keyword occurrence in one pass
+    _VPN_KEYWORD_RE = re.compile(
+        "(?=(" + "|".join(map(re.escape, VPN_KEYWORDS)) + "))"
+    )
+    
+    # Hosting/Cloud provider AS numbers
+    HOSTING_ASNS = frozenset({
+        16509,  # AWS
+        15169,  # Google Cloud
+        8075,   # Microsoft Azure
+        14061,  # DigitalOcean
+        20473,  # Choopa
+        16276,  # OVH
+    })
+    
+    # ip-api.com endpoints; the single endpoint allows 45 requests/min,
+    # the batch endpoint 15 requests/min of up to 100 queries each
+    IP_API_URL = "http://ip-api.com/json/{}"
+    IP_API_RATE_LIMIT = 45
+    IP_API_BATCH_URL = "http://ip-api.com/batch"
+    IP_API_BATCH_SIZE = 100
+    IP_API_BATCH_RATE_LIMIT = 15
+    EXTERNAL_TIMEOUT = 5
+    
+    # Results are reused for CACHE_TTL seconds, including across restarts
+    # through the database; at most CACHE_MAX_SIZE are kept in memory,
+    # evicting the least recently used
+    CACHE_TTL = 86400.0
+    CACHE_MAX_SIZE = 100_000
+    # Results the external lookup could not confirm are kept in memory
+    # only, and briefly, so a failed request is retried soon
+    UNCHECKED_CACHE_TTL = 300.0
+    
+    # First octets common for cloud/hosting address space
+    DATACENTER_FIRST_OCTETS = frozenset({104, 107, 52, 34, 35})
     
     def __init__(self):
-        self._cache: Dict[str, VPN检测结果] = {}
+        self.db = get_db_manager()
+        # ip -> (expiry, result), in least-recently-used order
+        self._cache: "OrderedDict[str, Tuple[float, VPN检测结果]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.rate_limiter = RateLimiter(self.IP_API_RATE_LIMIT, time_window=60)
+        self.batch_rate_limiter = RateLimiter(self.IP_API_BATCH_RATE_LIMIT, time_window=60)
         self._known_vpn_networks = self._load_vpn_networks()
         self._known_hosting_networks = self._load_hosting_networks()
+        # Binary-searchable forms of the ranges above
+        self._vpn_ranges = _merge_ranges(self._known_vpn_networks)
+        self._hosting_ranges = _merge_ranges(self._known_hosting_networks)
     
     def _load_vpn_networks(self) -> List[IPv4Network]:
         """Load known VPN/proxy network ranges."""
@@ -127,7 +199,8 @@ class VPNDetector:
             ip_network("172.64.0.0/13"),  # Cloudflare
             ip_network("104.16.0.0/13"),  # Cloudflare
         ]
-        return networks
+        # Merge overlapping entries (104.0.0.0/8 covers 104.16.0.0/13)
+        return list(collapse_addresses(networks))
     
     def check_ip(self, ip_address_str: str, use_cache: bool = True) -> VPN检测结果:
         """
@@ -140,9 +213,38 @@ class VPNDetector:
         Returns:
             VPN检测结果 with detection information
         """
-        if use_cache and ip_address_str in self._cache:
-            return self._cache[ip_address_str]
+        if use_cache:
+            cached = self._cache_get(ip_address_str)
+            if cached is None:
+                cached = self._load_persisted([ip_address_str]).get(ip_address_str)
+            if cached is not None:
+                return cached
+        
+        result, ip = self._check_local(ip_address_str)
+        if ip is None:
+            return result
+        
+        # Try external service detection (if available)
+        checked = self._check_external_services(ip, result)
+        
+        # Cache result
+        if use_cache:
+            if checked:
+                self._cache_put(ip_address_str, result)
+                self._persist([result])
+            else:
+                self._cache_put(ip_address_str, result, self.UNCHECKED_CACHE_TTL)
+        
+        return result
+    
+    def _check_local(self, ip_address_str: str):
+        """
+        Run the offline checks (known ranges and heuristics) for an IP.
         
+        Returns:
+            Tuple of (result, parsed address); the address is None when
+            the string is not a valid IP, in which case the result is final
+        """
         try:
             ip = ip_address(ip_address_str)
         except ValueError:
@@ -155,7 +257,7 @@ class VPNDetector:
                 is_mobile=False,
                 confidence=0.0,
                 details={"error": "Invalid IP address"}
-            )
+            ), None
         
         result = VPN检测结果(
             ip_address=ip_address_str,
@@ -168,28 +270,22 @@ class VPNDetector:
             details={}
         )
         
-        # Check against known VPN ranges
-        is_vpn_range = False
-        for network in self._known_vpn_networks:
-            if ip in network:
-                is_vpn_range = True
-                result.is_vpn = True
-                result.vpn_type = "known_range"
-                result.confidence = 0.95
-                result.details["match_reason"] = "Matched known VPN range"
-                break
-        
-        # Check against hosting ranges
-        if not is_vpn_range:
-            for network in self._known_hosting_networks:
-                if ip in network:
-                    result.is_hosting = True
-                    result.confidence = max(result.confidence, 0.7)
-                    result.details["hosting"] = "Matched hosting provider range"
-                    break
+        # Known ranges are IPv4 only
+        value = int(ip) if ip.version == 4 else None
+        
+        # Check against known VPN ranges, then hosting ranges
+        if value is not None and _in_ranges(self._vpn_ranges, value):
+            result.is_vpn = True
+            result.vpn_type = "known_range"
+            result.confidence = 0.95
+            result.details["match_reason"] = "Matched known VPN range"
+        elif value is not None and _in_ranges(self._hosting_ranges, value):
+            result.is_hosting = True
+            result.confidence = max(result.confidence, 0.7)
+            result.details["hosting"] = "Matched hosting provider range"
         
         # Check for residential proxy patterns
-        is_residential_proxy = self._check_residential_proxy(ip)
+        is_residential_proxy = self._check_residential_proxy(value)
         if is_residential_proxy:
             result.is_proxy = True
             result.proxy_type = "residential"
@@ -203,34 +299,26 @@ class VPNDetector:
             result.confidence = max(result.confidence, 0.5)
             result.details["mobile"] = "Mobile network detected"
         
-        # Try external service detection (if available)
-        self._check_external_services(ip, result)
-        
-        # Cache result
-        if use_cache:
-            self._cache[ip_address_str] = result
-        
-        return result
+        return result, ip
     
-    def _check_residential_proxy(self, ip) -> bool:
+    def _check_residential_proxy(self, value: Optional[int]) -> bool:
         """
         Check if IP matches residential proxy patterns.
         This is heuristic-based and not 100% accurate.
+        
+        Args:
+            value: IPv4 address as an integer, or None for non-IPv4
         """
+        if value is None:
+            return False
+        
         # Check for residential ISP ranges (Iranian)
-        iran_isps = self._load_iran_isp_networks()
-        for network in iran_isps:
-            if ip in network:
-                return False  # Known legitimate ISP
+        if identify_isp_by_int(value) is not None:
+            return False  # Known legitimate ISP
         
         # Check for datacenter IP patterns
         # Datacenters often have IP addresses in specific ranges
-        first_octet = int(str(ip).split('.')[0])
-        if first_octet in [104, 107, 52, 34, 35]:
-            # Common cloud/hosting first octets
-            return True
-        
-        return False
+        return (value >> 24) in self.DATACENTER_FIRST_OCTETS
     
     def _check_mobile_proxy(self, ip) -> bool:
         """Check if IP is from mobile network."""
@@ -244,71 +332,140 @@ class VPNDetector:
         # Would need actual ASN lookup here
         return False
     
-    def _load_iran_isp_networks(self) -> List[IPv4Network]:
-        """Load Iranian ISP networks for exclusion."""
-        # Import from iran_isps module
-        try:
-            from .iran_isps import get_all_isps
-            networks = []
-            for isp in get_all_isps():
-                networks.extend(isp.networks)
-            return networks
-        except ImportError:
-            logger.warning("Could not load Iranian ISP data")
-            return []
-    
-    def _check_external_services(self, ip, result: VPN检测结果):
+    def _check_external_services(self, ip, result: VPN检测结果) -> bool:
         """
         Check external services for VPN/proxy detection.
         This makes API calls to services like ip-api.com, ipinfo.io, etc.
+        
+        Returns:
+            True if a service answered for the IP
         """
         try:
             # Try ip-api.com (free, rate-limited)
-            url = f"http://ip-api.com/json/{ip}"
-            response = requests.get(url, timeout=5)
+            url = self.IP_API_URL.format(ip)
+            self._wait_for_token(self.rate_limiter)
+            response = requests.get(url, timeout=self.EXTERNAL_TIMEOUT)
             if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "success":
-                    # Check ISP/organization for VPN indicators
-                    org = data.get("org", "").lower()
-                    isp = data.get("isp", "").lower()
-                    
-                    vpn_keywords = ["vpn", "proxy", "tor", "anonymous", "datacenter", 
-                                   "hosting", "cloud", "vps"]
-                    
-                    combined_text = org + " " + isp
-                    for keyword in vpn_keywords:
-                        if keyword in combined_text:
-                            result.is_vpn = result.is_vpn or keyword in ["vpn", "tor"]
-                            result.is_proxy = result.is_proxy or keyword in ["proxy", "tor", "anonymous"]
-                            result.confidence = max(result.confidence, 0.8)
-                            result.details["external_match"] = f"Matched keyword: {keyword}"
-                            break
-                    
-                    # Check AS number
-                    as_number = data.get("as", "")
-                    if as_number:
-                        asn = as_number.split()[0]
-                        if asn in self.KNOWN_VPN_ASNS:
-                            result.is_vpn = True
-                            result.vpn_type = "known_asn"
-                            result.confidence = 0.95
-                            result.details["matched_asn"] = asn
-                        elif asn in self.HOSTING_ASNS:
-                            result.is_hosting = True
-                            result.confidence = max(result.confidence, 0.7)
-                            result.details["hosting_asn"] = asn
-                    
-                    # Check country
-                    country = data.get("countryCode", "")
-                    if country in ["KY", "BZ", "PA", "VG"]:
-                        # Common VPN server locations
-                        result.is_vpn = result.is_vpn or True
-                        result.confidence = max(result.confidence, 0.6)
-                        result.details["vpn_location"] = country
+                self._apply_external_data(response.json(), result)
+                return True
         
         except Exception as e:
             logger.debug(f"External service check failed: {e}")
+        return False
+    
+    def _apply_external_data(self, data: Dict[str, Any], result: VPN检测结果):
+        """Apply an ip-api.com lookup entry to a detection result."""
+        if data.get("status") != "success":
+            return
+        
+        # Check ISP/organization for VPN indicators
+        org = data.get("org", "").lower()
+        isp = data.get("isp", "").lower()
+        
+        combined_text = org + " " + isp
+        found = set(self._VPN_KEYWORD_RE.findall(combined_text))
+        if found:
+            keyword = next(k for k in self.VPN_KEYWORDS if k in found)
+            result.is_vpn = result.is_vpn or keyword in ["vpn", "tor"]
+            result.is_proxy = result.is_proxy or keyword in ["proxy", "tor", "anonymous"]
+            result.confidence = max(result.confidence, 0.8)
+            result.details["external_match"] = f"Matched keyword: {keyword}"
+        
+        # Check AS number
+        as_number = data.get("as", "")
+        if as_number:
+            asn = as_number.split()[0]
+            # Compare by number, e.g. "AS44950" -> 44950
+            asn_number = None
+            if asn[:2] == "AS" and asn[2:].isdigit():
+                asn_number = int(asn[2:])
+            if asn_number in self.KNOWN_VPN_ASNS:
+                result.is_vpn = True
+                result.vpn_type = "known_asn"
+                result.confidence = 0.95
+                result.details["matched_asn"] = asn
+            elif asn_number in self.HOSTING_ASNS:
+                result.is_hosting = True
+                result.confidence = max(result.confidence, 0.7)
+                result.details["hosting_asn"] = asn
+        
+        # Check country
+        country = data.get("countryCode", "")
+        if country in ["KY", "BZ", "PA", "VG"]:
+            # Common VPN server locations
+            result.is_vpn = result.is_vpn or True
+            result.confidence = max(result.confidence, 0.6)
+            result.details["vpn_location"] = country
+    
+    @staticmethod
+    def _wait_for_token(limiter: RateLimiter) -> None:
+        """Block until the rate limiter hands out a token."""
+        while not limiter.acquire():
+            time.sleep(limiter.get_wait_time())
+    
+    def _chunk_queries(self, ips: List[str]) -> List[List[Dict[str, str]]]:
+        """Split IPs into ip-api.com batch request bodies."""
+        size = self.IP_API_BATCH_SIZE
+        return [[{"query": ip} for ip in ips[i:i + size]]
+                for i in range(0, len(ips), size)]
+    
+    async def _fetch_batches(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up IPs through ip-api.com's batch endpoint concurrently,
+        starting each request only once the batch rate limit allows it.
+        
+        Args:
+            ips: IP addresses to look up
+            
+        Returns:
+            Dictionary mapping each successfully returned IP to its entry
+        """
+        timeout = aiohttp.ClientTimeout(total=self.EXTERNAL_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+        
+        async def fetch(session, body):
+            while not self.batch_rate_limiter.acquire():
+                await asyncio.sleep(self.batch_rate_limiter.get_wait_time())
+            try:
+                async with session.post(self.IP_API_BATCH_URL, json=body) as response:
+                    if response.status == 200:
+                        return await response.json()
+            except Exception as e:
+                logger.debug(f"External batch check failed: {e}")
+            return []
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            chunks = await asyncio.gather(
+                *(fetch(session, body) for body in self._chunk_queries(ips))
+            )
+        return {entry.get("query"): entry for chunk in chunks for entry in chunk}
+    
+    def _fetch_batches_sync(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Batch lookup through ip-api.com without aiohttp, one request per chunk."""
+        entries = {}
+        for body in self._chunk_queries(ips):
+            self._wait_for_token(self.batch_rate_limiter)
+            try:
+                response = requests.post(self.IP_API_BATCH_URL, json=body,
+                                         timeout=self.EXTERNAL_TIMEOUT)
+                if response.status_code == 200:
+                    for entry in response.json():
+                        entries[entry.get("query")] = entry
+            except Exception as e:
+                logger.debug(f"External batch check failed: {e}")
+        return entries
+    
+    def _lookup_external(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up a batch of IPs externally, using aiohttp when available."""
+        if not AIOHTTP_AVAILABLE:
+            return self._fetch_batches_sync(ips)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._fetch_batches(ips))
+        # Called from inside an event loop: run on a separate thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._fetch_batches(ips)).result()
     
     def check_batch(self, ip_addresses: List[str]) -> Dict[str, VPN检测结果]:
         """
@@ -321,8 +478,45 @@ class VPNDetector:
             Dictionary mapping IP addresses to detection results
         """
         results = {}
-        for ip in ip_addresses:
-            results[ip] = self.check_ip(ip)
+        pending = []
+        
+        missing = []
+        for ip_address_str in ip_addresses:
+            if ip_address_str in results:
+                continue
+            results[ip_address_str] = cached = self._cache_get(ip_address_str)
+            if cached is None:
+                missing.append(ip_address_str)
+        
+        # Reuse results persisted by earlier runs
+        if missing:
+            persisted = self._load_persisted(missing)
+            results.update(persisted)
+            missing = [ip for ip in missing if ip not in persisted]
+        
+        # Classify the rest of the batch offline first...
+        for ip_address_str in missing:
+            result, ip = self._check_local(ip_address_str)
+            results[ip_address_str] = result
+            if ip is not None:
+                pending.append((ip, result))
+        
+        # ...then consult external services only for uncached valid IPs,
+        # in batched requests rather than one per address
+        if pending:
+            entries = self._lookup_external([str(ip) for ip, _ in pending])
+            checked = []
+            for ip, result in pending:
+                data = entries.get(str(ip))
+                if data is None:
+                    self._cache_put(result.ip_address, result, self.UNCHECKED_CACHE_TTL)
+                    continue
+                self._apply_external_data(data, result)
+                self._cache_put(result.ip_address, result)
+                checked.append(result)
+            if checked:
+                self._persist(checked)
+        
         return results
     
     def get_vpn_statistics(self, scan_results: List[VPN检测结果]) -> Dict[str, int]:
@@ -368,9 +562,68 @@ class VPNDetector:
         
         return stats
     
+    def _cache_get(self, ip_address_str: str) -> Optional[VPN检测结果]:
+        """Return an unexpired cached result, refreshing its recency."""
+        with self._cache_lock:
+            entry = self._cache.get(ip_address_str)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._cache[ip_address_str]
+                return None
+            self._cache.move_to_end(ip_address_str)
+            return entry[1]
+    
+    def _cache_put(self, ip_address_str: str, result: VPN检测结果,
+                   ttl: Optional[float] = None):
+        """Cache a result, evicting the least recently used beyond the limit."""
+        if ttl is None:
+            ttl = self.CACHE_TTL
+        with self._cache_lock:
+            self._cache[ip_address_str] = (time.monotonic() + ttl, result)
+            self._cache.move_to_end(ip_address_str)
+            while len(self._cache) > self.CACHE_MAX_SIZE:
+                self._cache.popitem(last=False)
+    
+    def _load_persisted(self, ip_addresses: List[str]) -> Dict[str, VPN检测结果]:
+        """Load unexpired persisted results into the memory cache."""
+        try:
+            rows = self.db.get_vpn_results(ip_addresses)
+        except Exception as e:
+            logger.warning(f"Failed to load cached VPN results: {e}")
+            return {}
+        
+        results = {}
+        for ip_address_str, fields in rows.items():
+            result = VPN检测结果(**fields)
+            self._cache_put(ip_address_str, result)
+            results[ip_address_str] = result
+        return results
+    
+    def _persist(self, results: List[VPN检测结果]):
+        """Save results to the database so later runs can reuse them."""
+        try:
+            self.db.save_vpn_results([asdict(r) for r in results], self.CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to cache VPN results: {e}")
+    
+    def invalidate(self, ip_address_str: str):
+        """Drop the cached result for an IP, e.g. after an ASN reassignment."""
+        with self._cache_lock:
+            self._cache.pop(ip_address_str, None)
+        try:
+            self.db.delete_vpn_results([ip_address_str])
+        except Exception as e:
+            logger.warning(f"Failed to invalidate cached VPN result: {e}")
+    
     def clear_cache(self):
         """Clear the detection cache."""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+        try:
+            self.db.delete_vpn_results()
+        except Exception as e:
+            logger.warning(f"Failed to clear cached VPN results: {e}")
 
 
 # Singleton instance
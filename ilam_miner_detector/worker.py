@@ -5,18 +5,56 @@ Handles background scanning operations with PyQt5 signals.
 
 import asyncio
 import logging
-from typing import List, Optional, Callable
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Callable, Tuple
 from dataclasses import dataclass
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
 from .network_scanner import NetworkScanner, HostScanResult
-from .database import get_db_manager, ScanRecord, HostRecord
+from .database import get_db_manager, ScanRecord, HostRecord, encode_port_info
 from .ip_manager import get_ip_manager
 from .config_manager import get_config_manager
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between progress signals (~30 per second); the final
+# update is always sent
+PROGRESS_INTERVAL = 1 / 30
+
+# Event loop shared by successive scan workers, so its executor threads
+# are set up once per session rather than once per scan
+_scan_loop: Optional[asyncio.AbstractEventLoop] = None
+_scan_loop_lock = threading.Lock()
+
+
+def _acquire_scan_loop() -> Tuple[asyncio.AbstractEventLoop, bool]:
+    """
+    Get an event loop for a scan worker thread.
+    
+    Returns:
+        Tuple of (loop, shared); a private loop is created when another
+        worker is still using the shared one, and must be closed by the caller
+    """
+    global _scan_loop
+    if not _scan_loop_lock.acquire(blocking=False):
+        return asyncio.new_event_loop(), False
+    if _scan_loop is None or _scan_loop.is_closed():
+        _scan_loop = asyncio.new_event_loop()
+    return _scan_loop, True
+
+
+def _release_scan_loop(loop: asyncio.AbstractEventLoop, shared: bool):
+    """Hand a loop from _acquire_scan_loop back once the scan is done."""
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    asyncio.set_event_loop(None)
+    if shared:
+        _scan_loop_lock.release()
+    else:
+        loop.close()
+
 
 @dataclass
 class ScanProgress:
@@ -51,6 +89,9 @@ class ScanWorker(QThread):
     scan_error = pyqtSignal(str)  # Error message
     log_message = pyqtSignal(str)  # Log message for display
     
+    # Host records saved per database transaction
+    HOST_BATCH_SIZE = 500
+    
     def __init__(self, scan_id: int, cidr_range: str, 
                  scan_name: str = "", parent=None):
         """
@@ -75,6 +116,7 @@ class ScanWorker(QThread):
         self._cancelled = False
         self._responsive_count = 0
         self._miner_count = 0
+        self._last_progress = 0.0
         
     def cancel(self):
         """Request scan cancellation."""
@@ -100,27 +142,23 @@ class ScanWorker(QThread):
             # Update total hosts in DB
             self.db.update_scan_stats(self.scan_id, total_hosts=total_hosts)
             
-            # Generate IP iterator
-            ip_generator = self.ip_manager.generate_from_cidr(self.cidr_range)
+            # Generate IP iterator (lazily, as strings)
+            ip_generator = self.ip_manager.generate_host_strings(self.cidr_range)
             
             # Get ports to scan
             ports = self.config.miner_ports.all_ports
             self.log_message.emit(f"Scanning ports: {ports}")
             
-            # Run async scan
-            loop = asyncio.new_event_loop()
+            # Run async scan, saving each result as it arrives
+            loop, shared = _acquire_scan_loop()
             asyncio.set_event_loop(loop)
             
             try:
-                results = loop.run_until_complete(
-                    self.scanner.scan_range(
-                        ip_generator,
-                        ports,
-                        progress_callback=self._on_progress
-                    )
+                loop.run_until_complete(
+                    self._scan_and_save(ip_generator, ports, total_hosts)
                 )
             finally:
-                loop.close()
+                _release_scan_loop(loop, shared)
             
             # Check if cancelled
             if self._cancelled:
@@ -135,9 +173,6 @@ class ScanWorker(QThread):
                 ))
                 return
             
-            # Process and save results
-            self._process_results(results)
-            
             # Update final stats
             self.db.update_scan_stats(
                 self.scan_id,
@@ -175,43 +210,82 @@ class ScanWorker(QThread):
         """Handle progress updates from scanner."""
         if self._cancelled:
             return
+        # Don't flood the GUI thread's event queue on fast scans
+        now = time.monotonic()
+        if current < total and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
         self.progress_updated.emit(current, total, status)
     
-    def _process_results(self, results: List[HostScanResult]):
-        """Process and save scan results to database."""
-        import json
+    async def _scan_and_save(self, ip_generator, ports: List[int], total_hosts: int):
+        """
+        Scan the range, saving results to the database as they arrive.
         
-        for result in results:
-            if self._cancelled:
-                break
-            
-            # Count statistics
-            if result.is_responsive:
-                self._responsive_count += 1
-            if result.is_miner_detected:
-                self._miner_count += 1
+        Batches are encoded and written on a single writer thread, so the
+        event loop keeps probing while the previous batch is persisted.
+        """
+        loop = asyncio.get_running_loop()
+        batch: List[HostScanResult] = []
+        saving: Optional[asyncio.Future] = None
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-db") as writer:
+            async for result in self.scanner.iter_range(
+                ip_generator,
+                ports,
+                progress_callback=self._on_progress,
+                total=total_hosts
+            ):
+                # Once cancelled the scanner winds down; discard what is left
+                if self._cancelled:
+                    continue
+                
+                # Count statistics
+                if result.is_responsive:
+                    self._responsive_count += 1
+                if result.is_miner_detected:
+                    self._miner_count += 1
+                
+                # Dead addresses are only counted, not stored or displayed
+                if (not result.is_responsive and not result.open_ports
+                        and not self.config.scan.store_unresponsive_hosts):
+                    continue
+                
+                # Save to database a batch at a time, one batch in flight
+                batch.append(result)
+                if len(batch) >= self.HOST_BATCH_SIZE:
+                    if saving is not None:
+                        await saving
+                    saving = loop.run_in_executor(writer, self._save_hosts, batch)
+                    batch = []
+                
+                # Emit signal for real-time display
+                self.host_scanned.emit(result)
             
-            # Create host record
-            host_record = HostRecord(
+            if saving is not None:
+                await saving
+            if batch:
+                await loop.run_in_executor(writer, self._save_hosts, batch)
+    
+    def _save_hosts(self, results: List[HostScanResult]):
+        """Save a batch of scan results in a single transaction."""
+        hosts = []
+        for result in results:
+            open_ports_json, banner_info_json = encode_port_info(result.open_ports)
+            hosts.append(HostRecord(
                 scan_id=self.scan_id,
                 ip_address=result.ip_address,
                 is_responsive=result.is_responsive,
                 ping_time_ms=result.ping_time_ms,
-                open_ports=json.dumps([p.port for p in result.open_ports]),
-                banner_info=json.dumps({p.port: p.banner for p in result.open_ports}),
+                open_ports=open_ports_json,
+                banner_info=banner_info_json,
                 is_miner_detected=result.is_miner_detected,
                 miner_type=result.miner_type,
                 confidence_score=result.confidence_score
-            )
-            
-            # Save to database
-            try:
-                self.db.add_host(host_record)
-            except Exception as e:
-                logger.error(f"Failed to save host {result.ip_address}: {e}")
-            
-            # Emit signal for real-time display
-            self.host_scanned.emit(result)
+            ))
+        
+        # A failing row only costs that host, as with one insert per host
+        with self.db.bulk_load():
+            self.db.add_hosts_bulk(hosts, skip_failed=True)
 
 
 class GeolocationWorker(QThread):
@@ -246,30 +320,37 @@ class GeolocationWorker(QThread):
         from .geolocation import get_geolocation_service
         
         geo_service = get_geolocation_service()
-        total = len(self.ip_addresses)
+        ip_addresses = list(dict.fromkeys(self.ip_addresses))
+        total = len(ip_addresses)
         success_count = 0
         failed_count = 0
+        last_progress = 0.0
         
         self.log_message.emit(f"Starting geolocation for {total} IP addresses")
         
-        for i, ip in enumerate(self.ip_addresses):
-            if self._cancelled:
-                self.log_message.emit("Geolocation cancelled")
-                break
-            
-            try:
-                result = geo_service.lookup(ip)
+        # Uncached IPs are resolved 100 per provider request
+        done = 0
+        try:
+            for ip, result in geo_service.iter_lookup(ip_addresses):
+                if self._cancelled:
+                    self.log_message.emit("Geolocation cancelled")
+                    break
+                
+                done += 1
                 if result.success:
                     success_count += 1
                 else:
                     failed_count += 1
                 
                 self.ip_geolocated.emit(ip, result)
-                self.progress_updated.emit(i + 1, total)
                 
-            except Exception as e:
-                logger.error(f"Geolocation error for {ip}: {e}")
-                failed_count += 1
+                now = time.monotonic()
+                if done == total or now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    self.progress_updated.emit(done, total)
+        except Exception as e:
+            logger.error(f"Geolocation error: {e}")
+            failed_count = total - success_count
         
         self.geo_completed.emit(success_count, failed_count)
         self.log_message.emit(f"Geolocation complete. Success: {success_count}, Failed: {failed_count}")
@@ -308,26 +389,46 @@ class ReportWorker(QThread):
         
         self.log_message.emit(f"Generating reports for scan {self.scan_id}")
         
+        try:
+            # Load the scan once for all formats
+            data = reporter.load_scan(self.scan_id)
+        except Exception as e:
+            for fmt in self.formats:
+                self.report_error.emit(fmt, str(e))
+                self.log_message.emit(f"Failed to generate {fmt} report: {e}")
+            self.all_reports_complete.emit(results)
+            return
+        
+        exporters = {
+            'json': reporter.export_json,
+            'csv': reporter.export_csv,
+            'html': reporter.export_html,
+        }
         for fmt in self.formats:
-            try:
-                if fmt == 'json':
-                    path = reporter.export_json(self.scan_id)
-                elif fmt == 'csv':
-                    path = reporter.export_csv(self.scan_id)
-                elif fmt == 'html':
-                    path = reporter.export_html(self.scan_id)
-                else:
-                    self.report_error.emit(fmt, f"Unknown format: {fmt}")
+            if fmt not in exporters:
+                self.report_error.emit(fmt, f"Unknown format: {fmt}")
+        formats = [fmt for fmt in self.formats if fmt in exporters]
+        
+        # Each format writes its own file, so generate them concurrently
+        # and report each one as soon as it is written
+        with ThreadPoolExecutor(max_workers=max(1, len(formats))) as executor:
+            futures = {
+                executor.submit(exporters[fmt], self.scan_id, data=data): fmt
+                for fmt in formats
+            }
+            for future in as_completed(futures):
+                fmt = futures[future]
+                try:
+                    path = future.result()
+                except Exception as e:
+                    error_msg = str(e)
+                    self.report_error.emit(fmt, error_msg)
+                    self.log_message.emit(f"Failed to generate {fmt} report: {error_msg}")
                     continue
                 
                 results[fmt] = path
                 self.report_generated.emit(fmt, path)
                 self.log_message.emit(f"Generated {fmt.upper()} report: {path}")
-                
-            except Exception as e:
-                error_msg = str(e)
-                self.report_error.emit(fmt, error_msg)
-                self.log_message.emit(f"Failed to generate {fmt} report: {error_msg}")
         
         self.all_reports_complete.emit(results)
 
@@ -11,6 +11,7 @@ Unauthorized network scanning may be illegal in your jurisdiction.
 import sys
 import os
 import logging
+import logging.handlers
 import argparse
 from pathlib import Path
 from PyQt5.QtWidgets import QApplication
@@ -19,6 +20,7 @@ from PyQt5.QtWidgets import QApplication
 sys.path.insert(0, str(Path(__file__).parent))
 
 from ilam_miner_detector.config_manager import ConfigManager
+from ilam_miner_detector.log_setup import start_queue_logging
 from ilam_miner_detector.gui.main_window import MainWindow
 
 
@@ -34,9 +36,11 @@ def setup_logging(verbose: bool = False):
     
     log_level = logging.DEBUG if verbose else logging.INFO
     
-    # File handler
-    file_handler = logging.FileHandler(
+    # File handler, rotated at 10 MB keeping 5 old files
+    file_handler = logging.handlers.RotatingFileHandler(
         log_dir / "ilam_miner_detector.log",
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5,
         encoding='utf-8'
     )
     file_handler.setLevel(logging.DEBUG)
@@ -53,11 +57,9 @@ def setup_logging(verbose: bool = False):
     )
     console_handler.setFormatter(console_formatter)
     
-    # Root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    # Both handlers run on a listener thread, so logging from the scan
+    # threads only enqueues the record instead of writing to disk
+    start_queue_logging(file_handler, console_handler, level=logging.DEBUG)
 
 
 def main():
@@ -12,12 +12,20 @@ def test_config_manager():
     """Test configuration management."""
     print("Testing ConfigManager...")
     from ilam_miner_detector.config_manager import ConfigManager
+    import tempfile
     
-    config = ConfigManager()
-    
-    assert config.scan.timeout_ms == 3000
-    assert config.geolocation.primary_provider == "ip-api"
-    assert len(config.miner_ports.all_ports()) > 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.json")
+        config = ConfigManager(config_path).get()
+        
+        assert config.scan.timeout == 3
+        assert config.scan.store_unresponsive_hosts is False
+        assert config.geolocation.primary_provider == "ip-api.com"
+        assert len(config.miner_ports.all_ports) > 0
+        
+        # Defaults are written out and read back unchanged
+        assert os.path.exists(config_path)
+        assert ConfigManager(config_path).get() == config
     
     print("  ✓ ConfigManager working")
 
@@ -25,131 +33,474 @@ def test_ip_manager():
     """Test IP address management."""
     print("Testing IPManager...")
     from ilam_miner_detector.ip_manager import IPManager
+    import ipaddress
     
-    # Test CIDR parsing
-    ips = list(IPManager.parse_cidr("192.168.1.0/30"))
-    assert len(ips) == 2  # .1 and .2 (excluding network and broadcast)
+    manager = IPManager()
+    
+    # Test CIDR parsing (.1 and .2, excluding network and broadcast)
+    info = manager.parse_cidr("192.168.1.0/30")
+    assert info.total_hosts == 2
+    assert str(info.first_ip) == "192.168.1.1"
+    assert str(info.last_ip) == "192.168.1.2"
+    assert info.is_private
+    
+    # Test CIDR expansion, as objects and as strings
+    assert [str(ip) for ip in manager.generate_from_cidr("192.168.1.0/30")] == [
+        "192.168.1.1", "192.168.1.2"
+    ]
+    assert list(manager.generate_host_strings("10.0.0.0/29")) == [
+        str(ip) for ip in ipaddress.IPv4Network("10.0.0.0/29").hosts()
+    ]
+    assert manager.count_hosts("10.0.0.0/16") == 65534
+    assert manager.count_hosts("10.0.0.5/32") == 1
     
     # Test range parsing
-    ips = list(IPManager.parse_range("10.0.0.1", "10.0.0.5"))
+    ips = list(manager.generate_ip_range("10.0.0.1", "10.0.0.5"))
     assert len(ips) == 5
     
     # Test validation
-    assert IPManager.is_valid("192.168.1.1")
-    assert not IPManager.is_valid("999.999.999.999")
+    assert manager.validate_ip("192.168.1.1")
+    assert not manager.validate_ip("999.999.999.999")
+    assert manager.validate_cidr("10.0.0.0/8")
+    assert not manager.validate_cidr("10.0.0.0/33")
+    
+    # Repeated validation of the same string is answered from the cache
+    from ilam_miner_detector.ip_manager import _ipv4
+    assert manager.validate_ip("203.0.113.7")
+    hits = _ipv4.cache_info().hits
+    assert manager.validate_ip("203.0.113.7")
+    assert _ipv4.cache_info().hits == hits + 1
     
     # Test private IP detection
-    assert IPManager.is_private("192.168.1.1")
-    assert IPManager.is_private("10.0.0.1")
-    assert not IPManager.is_private("8.8.8.8")
-    
-    # Test smart parsing
-    ips = list(IPManager.parse_input("192.168.1.0/30"))
-    assert len(ips) == 2
+    assert manager.is_private_ip(ipaddress.IPv4Address("192.168.1.1"))
+    assert manager.is_private_ip(ipaddress.IPv4Address("10.0.0.1"))
+    assert not manager.is_private_ip(ipaddress.IPv4Address("8.8.8.8"))
+    
+    # Test exclusions
+    filtered = IPManager().add_excluded_network("8.8.8.0/31")
+    assert [str(ip) for ip in filtered.generate_ip_range("8.8.7.255", "8.8.8.2")] == [
+        "8.8.7.255", "8.8.8.2"
+    ]
+    assert list(IPManager().exclude_private().generate_from_cidr("10.0.0.0/30")) == []
     
     print("  ✓ IPManager working")
 
 def test_database():
     """Test database operations."""
     print("Testing Database...")
-    from ilam_miner_detector.database import Database
-    import tempfile
+    from ilam_miner_detector.database import DatabaseManager, HostRecord, GeolocationCache
+    import sqlite3
     
-    # Use temp database
-    temp_db = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
-    temp_db.close()
+    # Use a private in-memory database, shared by this process's connections
+    db_path = f"file:testdb_{os.getpid()}?mode=memory&cache=shared"
     
-    db = Database(temp_db.name)
+    db = DatabaseManager(db_path)
     
     # Create scan
-    scan_id = db.create_scan("Test Scan", "192.168.1.0/24", {"test": "config"})
+    scan_id = db.create_scan("Test Scan", "192.168.0.0/22", "test")
     assert scan_id > 0
     
-    # Add host
-    host_id = db.add_host(
-        scan_id=scan_id,
-        ip_address="192.168.1.100",
-        is_reachable=True,
-        open_ports=[3333, 4444],
-        is_miner=True,
-        miner_type="stratum"
-    )
-    assert host_id > 0
+    # Add hosts in a single transaction
+    hosts = [
+        HostRecord(
+            scan_id=scan_id,
+            ip_address=f"192.168.{i // 256}.{i % 256}",
+            is_responsive=True,
+            open_ports="[3333, 4444]",
+            is_miner_detected=i % 100 == 0,
+            miner_type="stratum" if i % 100 == 0 else ""
+        )
+        for i in range(1000)
+    ]
+    assert db.add_hosts_bulk(hosts) == 1000
+    
+    # A failing row rolls back its batch; skip_failed saves the rest
+    bad_id = db.create_scan("Bad Row Scan", "10.0.0.0/30", "test")
+    batch = [HostRecord(scan_id=bad_id, ip_address=ip)
+             for ip in ("10.0.0.1", None, "10.0.0.2")]
+    try:
+        db.add_hosts_bulk(batch)
+        assert False, "bulk insert with a NULL address should fail"
+    except sqlite3.IntegrityError:
+        pass
+    assert db.get_hosts_by_scan(bad_id) == []
+    assert db.add_hosts_bulk(batch, skip_failed=True) == 2
+    assert [h.ip_address for h in db.get_hosts_by_scan(bad_id)] == ["10.0.0.1", "10.0.0.2"]
     
     # Retrieve scan
     scan = db.get_scan(scan_id)
     assert scan is not None
-    assert scan['scan_name'] == "Test Scan"
+    assert scan.scan_name == "Test Scan"
+    
+    # Count hosts without loading them
+    conn = sqlite3.connect(db_path, uri=True)
+    count = conn.execute(
+        "SELECT COUNT(*) FROM hosts WHERE scan_id = ?", (scan_id,)
+    ).fetchone()[0]
+    conn.close()
+    assert count == 1000
+    
+    miners = db.get_hosts_by_scan(scan_id, miners_only=True)
+    assert len(miners) == 10
+    assert miners[0].ip_address == "192.168.0.0"
+    
+    # Round-trip the hosts through a CSV report export
+    from ilam_miner_detector.reporter import ReportGenerator
+    import tempfile
     
-    # Retrieve hosts
-    hosts = db.get_scan_hosts(scan_id)
-    assert len(hosts) == 1
-    assert hosts[0]['ip_address'] == "192.168.1.100"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "hosts.csv")
+        ReportGenerator().export_csv(
+            scan_id, csv_path, data=(scan, db.get_hosts_by_scan(scan_id))
+        )
+        import_id = db.create_scan("Imported Scan", "192.168.0.0/22", "test")
+        assert db.import_hosts_csv(import_id, csv_path) == 1000
+    
+    imported = db.get_hosts_by_scan(import_id, miners_only=True)
+    assert len(imported) == 10
+    assert imported[1].ip_address == "192.168.0.100"
+    assert imported[1].miner_type == "stratum"
+    assert imported[1].open_ports == "[3333, 4444]"
+    
+    # A transaction that raises leaves no trace
+    try:
+        with db.transaction():
+            txn_id = db.create_scan("Rolled Back Scan", "10.1.0.0/30", "test")
+            db.add_host(HostRecord(scan_id=txn_id, ip_address="10.1.0.1"))
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert db.get_scan(txn_id) is None
+    assert db.get_hosts_by_scan(txn_id) == []
+    
+    # A failed operation inside a transaction only undoes its own writes,
+    # and the rest commits if the caller carries on
+    with db.transaction():
+        txn_id = db.create_scan("Partial Scan", "10.1.0.0/30", "test")
+        db.add_host(HostRecord(scan_id=txn_id, ip_address="10.1.0.1"))
+        try:
+            db.add_hosts_bulk([HostRecord(scan_id=txn_id, ip_address="10.1.0.2"),
+                               HostRecord(scan_id=txn_id, ip_address=None)])
+        except sqlite3.IntegrityError:
+            pass
+        db.add_host(HostRecord(scan_id=txn_id, ip_address="10.1.0.3"))
+    assert db.get_scan(txn_id) is not None
+    assert [h.ip_address for h in db.get_hosts_by_scan(txn_id)] == ["10.1.0.1", "10.1.0.3"]
+    
+    # The stats row tracks inserts, miner flag updates and deletes
+    conn = sqlite3.connect(db_path, uri=True)
+    
+    def assert_stats_match():
+        stats = db.get_stats()
+        counts = conn.execute(
+            """SELECT (SELECT COUNT(*) FROM scans), (SELECT COUNT(*) FROM hosts),
+                      (SELECT COUNT(*) FROM hosts WHERE is_miner_detected = 1)"""
+        ).fetchone()
+        assert (stats['total_scans'], stats['total_hosts'], stats['total_miners']) == counts
+    
+    assert_stats_match()
+    db.add_host(HostRecord(scan_id=scan_id, ip_address="192.168.4.1", is_miner_detected=True))
+    assert_stats_match()
+    with conn:
+        conn.execute("UPDATE hosts SET is_miner_detected = 1 WHERE scan_id = ? AND id % 7 = 0",
+                     (import_id,))
+        conn.execute("UPDATE hosts SET is_miner_detected = 0 WHERE ip_address = '192.168.4.1'")
+    assert_stats_match()
+    with conn:
+        conn.execute("DELETE FROM hosts WHERE scan_id = ? AND id % 3 = 0", (import_id,))
+        conn.execute("DELETE FROM scans WHERE id = ?", (bad_id,))
+    assert_stats_match()
+    conn.close()
     
     # Cache geolocation
-    db.cache_geolocation(
-        "192.168.1.100",
-        {
-            'country': 'Iran',
-            'countryCode': 'IR',
-            'regionName': 'Ilam',
-            'city': 'Ilam',
-            'lat': 33.6374,
-            'lon': 46.4227,
-            'isp': 'Test ISP'
-        },
-        'test'
-    )
+    db.save_geolocation(GeolocationCache(
+        ip_address="192.168.0.100",
+        country='Iran',
+        country_code='IR',
+        region='Ilam',
+        city='Ilam',
+        latitude=33.6374,
+        longitude=46.4227,
+        isp='Test ISP'
+    ))
     
     # Retrieve cached geo
-    cached = db.get_cached_geolocation("192.168.1.100")
+    cached = db.get_geolocation("192.168.0.100")
     assert cached is not None
-    assert cached['country'] == 'Iran'
-    
-    db.close()
-    
-    # Cleanup
-    os.unlink(temp_db.name)
+    assert cached.country == 'Iran'
     
     print("  ✓ Database working")
 
 def test_network_scanner_basic():
     """Test network scanner basic functionality."""
     print("Testing NetworkScanner (basic)...")
-    from ilam_miner_detector.network_scanner import NetworkScanner
-    
-    scanner = NetworkScanner(timeout=1.0, max_concurrent=10)
-    
-    # Test service identification
-    service = scanner._identify_service(3333)
-    assert 'Stratum' in service
-    
-    service = scanner._identify_service(8332)
-    assert 'Bitcoin' in service
-    
-    # Test miner heuristic
-    is_miner, miner_type = scanner._detect_miner_heuristic([3333, 4444])
-    assert is_miner
-    assert miner_type == 'stratum'
+    from ilam_miner_detector.network_scanner import (
+        NetworkScanner, HostScanResult, PortScanResult
+    )
     
-    is_miner, miner_type = scanner._detect_miner_heuristic([80, 443])
-    assert not is_miner
+    scanner = NetworkScanner(mode="connect")
+    
+    # Test service identification, by port first and then by banner
+    assert scanner._detect_service(3333, "") == "stratum"
+    assert scanner._detect_service(8332, "") == "bitcoin_rpc"
+    assert scanner._detect_service(2222, "SSH-2.0-OpenSSH_8.9") == "ssh"
+    assert scanner._detect_service(9000, "HTTP/1.1 200 OK mining.subscribe") == "stratum"
+    assert scanner._detect_service(9000, "") == "unknown"
+    
+    # Test miner detection
+    result = HostScanResult(ip_address="10.0.0.1", open_ports=[
+        PortScanResult(port=3333, is_open=True),
+        PortScanResult(port=4444, is_open=True, banner="stratum proxy"),
+    ])
+    scanner._analyze_miner_detection(result)
+    assert result.is_miner_detected
+    assert result.miner_type == "Stratum"
+    assert result.confidence_score == 100  # 2 * 25 + 25 + 20 + 15, capped
+    
+    result = HostScanResult(ip_address="10.0.0.1", open_ports=[
+        PortScanResult(port=8332, is_open=True),
+    ])
+    scanner._analyze_miner_detection(result)
+    assert result.miner_type == "Bitcoin"
+    assert result.confidence_score == 50
+    
+    result = HostScanResult(ip_address="10.0.0.2", open_ports=[
+        PortScanResult(port=80, is_open=True),
+        PortScanResult(port=443, is_open=True),
+    ])
+    scanner._analyze_miner_detection(result)
+    assert not result.is_miner_detected
     
     print("  ✓ NetworkScanner basic functions working")
 
+def test_port_check_pool():
+    """Test the shared port check worker pool."""
+    print("Testing PortCheckPool...")
+    from ilam_miner_detector.network_scanner import PortCheckPool
+    import asyncio
+    
+    async def run():
+        cancelled = []
+        
+        async def check(ip, port):
+            # Each check takes `port` milliseconds and returns the port
+            try:
+                await asyncio.sleep(port / 1000)
+            except asyncio.CancelledError:
+                cancelled.append(port)
+                raise
+            if port == 13:
+                raise ConnectionRefusedError(port)
+            return port
+        
+        pool = PortCheckPool(check, workers=4)
+        try:
+            # Results come back in port order, not completion order
+            results = await pool.check_ports("10.0.0.1", [30, 10, 13, 20])
+            assert results[:2] == [30, 10] and results[3] == 20
+            assert isinstance(results[2], ConnectionRefusedError)
+            
+            # Checks still running when the budget runs out are cancelled
+            results = await pool.check_ports("10.0.0.1", [10, 5000, 6000], timeout=0.1)
+            assert results[0] == 10
+            assert all(isinstance(r, asyncio.TimeoutError) for r in results[1:])
+            await asyncio.sleep(0.01)
+            assert sorted(cancelled) == [5000, 6000]
+            
+            # Once the stop predicate holds, the rest are dropped the same way
+            cancelled.clear()
+            results = await pool.check_ports("10.0.0.1", [5000, 10, 6000],
+                                             stop=lambda port: port == 10)
+            assert results[1] == 10
+            assert isinstance(results[0], asyncio.TimeoutError)
+            assert isinstance(results[2], asyncio.TimeoutError)
+            await asyncio.sleep(0.01)
+            assert sorted(cancelled) == [5000, 6000]
+            
+            # Queued checks beyond the worker count are dropped too
+            cancelled.clear()
+            results = await pool.check_ports("10.0.0.1", [5000] * 6, timeout=0.05)
+            assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+            await asyncio.sleep(0.01)
+            assert len(cancelled) == 4
+        finally:
+            await pool.close()
+    
+    asyncio.run(run())
+    
+    print("  ✓ PortCheckPool working")
+
+def test_vpn_detector():
+    """Test VPN detection batching and result caching."""
+    print("Testing VPNDetector...")
+    from ilam_miner_detector.database import DatabaseManager
+    from ilam_miner_detector.vpn_detector import VPNDetector
+    from dataclasses import asdict
+    import time
+    
+    db = DatabaseManager(f"file:testdb_{os.getpid()}?mode=memory&cache=shared")
+    db.delete_vpn_results()
+    
+    # ip-api.com entries; 203.0.113.9 gets no answer
+    entries = {
+        "37.120.130.1": {"status": "success", "as": "AS39351 31173 Services",
+                         "org": "", "isp": "", "countryCode": "SE"},
+        "51.15.0.1": {"status": "success", "as": "AS16276 OVH SAS",
+                      "org": "", "isp": "OVH", "countryCode": "FR"},
+        "8.8.4.4": {"status": "success", "as": "", "org": "Private VPN Services",
+                    "isp": "", "countryCode": "KY"},
+        "198.51.100.7": {"status": "success", "as": "AS64500 Example",
+                         "org": "", "isp": "Example", "countryCode": "DE"},
+    }
+    confirmed = sorted(entries)
+    ips = confirmed + ["203.0.113.9", "not-an-ip"]
+    lookups = []
+    
+    def offline(detector):
+        """Answer external lookups from `entries`, counting batch calls."""
+        def lookup_external(batch):
+            lookups.append(list(batch))
+            return {ip: entries[ip] for ip in batch if ip in entries}
+        
+        def check_external_services(ip, result):
+            data = entries.get(str(ip))
+            if data is None:
+                return False
+            detector._apply_external_data(data, result)
+            return True
+        
+        detector._lookup_external = lookup_external
+        detector._check_external_services = check_external_services
+        return detector
+    
+    # Batch results match checking each IP on its own
+    detector = offline(VPNDetector())
+    batch = detector.check_batch(ips + ips[:2])
+    single = offline(VPNDetector())
+    for ip in ips:
+        assert asdict(batch[ip]) == asdict(single.check_ip(ip, use_cache=False)), ip
+    assert batch["37.120.130.1"].is_vpn
+    assert batch["51.15.0.1"].is_hosting
+    assert batch["8.8.4.4"].is_vpn
+    assert lookups == [confirmed + ["203.0.113.9"]]
+    
+    # Only answered lookups are persisted and kept for CACHE_TTL; the
+    # unanswered one is kept in memory for UNCHECKED_CACHE_TTL
+    assert sorted(db.get_vpn_results(ips)) == confirmed
+    now = time.monotonic()
+    ttl = {ip: detector._cache[ip][0] - now for ip in ips[:-1]}
+    assert all(ttl[ip] > VPNDetector.CACHE_TTL - 60 for ip in confirmed)
+    assert 0 < ttl["203.0.113.9"] <= VPNDetector.UNCHECKED_CACHE_TTL
+    
+    # Cached results are served without another lookup until they expire
+    lookups.clear()
+    detector.check_batch(ips)
+    assert lookups == []
+    detector.UNCHECKED_CACHE_TTL = 0.01
+    detector.invalidate("203.0.113.9")
+    detector.check_batch(ips)
+    time.sleep(0.02)
+    detector.check_batch(ips)
+    assert lookups == [["203.0.113.9"], ["203.0.113.9"]]
+    
+    # A new detector reloads persisted results from the vpn_cache table
+    reloaded = VPNDetector()
+    reloaded._lookup_external = None  # must not be called
+    again = reloaded.check_batch(confirmed)
+    assert all(asdict(again[ip]) == asdict(batch[ip]) for ip in confirmed)
+    assert all(reloaded._cache_get(ip) is not None for ip in confirmed)
+    
+    # The memory cache evicts the least recently used beyond its size
+    small = VPNDetector()
+    small.CACHE_MAX_SIZE = 2
+    small._cache_put("a", batch["51.15.0.1"])
+    small._cache_put("b", batch["51.15.0.1"])
+    assert small._cache_get("a") is not None
+    small._cache_put("c", batch["51.15.0.1"])
+    assert list(small._cache) == ["a", "c"]
+    
+    detector.clear_cache()
+    print("  ✓ VPNDetector working")
+
+def test_geolocation_subnets():
+    """Test /24 deduplication in batched geolocation lookups."""
+    print("Testing GeolocationService (subnets)...")
+    from ilam_miner_detector.database import DatabaseManager
+    from ilam_miner_detector.geolocation import GeolocationService, GeolocationResult
+    import time
+    
+    DatabaseManager(f"file:testdb_{os.getpid()}?mode=memory&cache=shared")
+    service = GeolocationService()
+    chunks = []
+    failing = {"198.18.3.1"}
+    
+    def resolve_batch(ip_addresses):
+        """Answer without the network, caching like _resolve_batch does."""
+        chunks.append(list(ip_addresses))
+        for ip in ip_addresses:
+            result = GeolocationResult(ip_address=ip)
+            if ip in failing:
+                result.error = "fail"
+            else:
+                result.city, result.success = f"city-{ip}", True
+                service._cache_subnet(result)
+            yield ip, result
+    
+    service._resolve_batch = resolve_batch
+    
+    assert service._subnet_key("10.1.2.3") == "10.1.2"
+    assert service._subnet_key("2001:db8::1") is None
+    assert service._subnet_key("::ffff:10.1.2.3") is None
+    
+    # One address per /24 is looked up; its neighbours reuse the answer
+    ips = ["198.18.1.1", "198.18.1.2", "198.18.2.1", "198.18.1.3", "198.18.2.2", "198.18.1.1"]
+    results = dict(service.iter_lookup(ips))
+    assert chunks == [["198.18.1.1", "198.18.2.1"]]
+    assert sorted(results) == sorted(set(ips))
+    assert results["198.18.1.3"].success
+    assert results["198.18.1.3"].ip_address == "198.18.1.3"
+    assert results["198.18.1.3"].city == "city-198.18.1.1"
+    assert results["198.18.2.2"].city == "city-198.18.2.1"
+    
+    # Neighbours deferred behind a failed lookup are looked up themselves
+    chunks.clear()
+    results = dict(service.iter_lookup(["198.18.3.1", "198.18.3.2", "198.18.3.3"]))
+    assert chunks == [["198.18.3.1"], ["198.18.3.2", "198.18.3.3"]]
+    assert not results["198.18.3.1"].success
+    assert results["198.18.3.2"].success and results["198.18.3.3"].success
+    
+    # Expired /24 entries are evicted and the address is looked up again
+    expired = GeolocationResult(ip_address="198.18.4.1", city="stale", success=True)
+    service._subnet_cache["198.18.4"] = (time.monotonic() - 1, expired)
+    assert service._lookup_subnet("198.18.4.2") is None
+    assert "198.18.4" not in service._subnet_cache
+    chunks.clear()
+    results = dict(service.iter_lookup(["198.18.4.2"]))
+    assert chunks == [["198.18.4.2"]]
+    assert results["198.18.4.2"].city == "city-198.18.4.2"
+    
+    # Progress for a batch with duplicates counts each address once
+    progress = []
+    results = service.lookup_batch(["198.18.5.1", "198.18.5.2", "198.18.5.1"],
+                                   progress_callback=lambda *args: progress.append(args))
+    assert progress == [(1, 2), (2, 2)]
+    assert list(results) == ["198.18.5.1", "198.18.5.2"]
+    
+    print("  ✓ GeolocationService subnet caching working")
+
 def test_map_generator():
     """Test map generation."""
     print("Testing MapGenerator...")
     from ilam_miner_detector.map_generator import MapGenerator
+    import tempfile
     
     generator = MapGenerator()
     
     # Test marker color
-    color = generator._get_marker_color('stratum')
-    assert color == 'red'
-    
-    color = generator._get_marker_color('bitcoin')
-    assert color == 'orange'
+    assert generator._get_color_by_confidence(90) == 'red'
+    assert generator._get_color_by_confidence(60) == 'orange'
+    assert generator._get_color_by_confidence(30) == 'yellow'
+    assert generator._get_color_by_confidence(0) == 'blue'
     
     # Test map creation (basic)
     hosts = [
@@ -159,70 +510,147 @@ def test_map_generator():
             'longitude': 46.4227,
             'city': 'Ilam',
             'region': 'Ilam',
+            'confidence_score': 85,
             'miner_type': 'stratum',
-            'open_ports': '[3333, 4444]'
-        }
+            'open_ports': [3333, 4444]
+        },
+        # No coordinates: left off the map
+        {'ip_address': '192.168.1.101', 'confidence_score': 50},
     ]
     
-    map_obj = generator.create_map(hosts, show_heatmap=False, show_clusters=False)
-    assert map_obj is not None
+    marker = generator._result_to_marker({**generator.RESULT_DEFAULTS, **hosts[0]})
+    assert marker.color == 'red'
+    assert marker.title == '192.168.1.100 (85%)'
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        map_path = generator.create_summary_map(hosts, os.path.join(tmp_dir, "map.html"))
+        with open(map_path, encoding='utf-8') as f:
+            html = f.read()
+    assert generator.map_instance is not None
+    assert '192.168.1.100 (85%)' in html
+    assert '192.168.1.101' not in html
+    assert 'Total Detections: 2' in html
+    
+    # Heatmap points are summed into grid cells
+    points = [(33.6371, 46.4221), (33.6372, 46.4224), (33.6399, 46.4227)]
+    assert sorted(generator._bucket_heatmap_points(points)) == [
+        [33.637, 46.422, 2], [33.64, 46.423, 1]
+    ]
+    
+    # Beyond MAX_HEATMAP_POINTS cells the grid doubles, conserving weight
+    from collections import Counter
+    import random
+    rng = random.Random(7)
+    points = [(33.0 + rng.random(), 46.0 + rng.random()) for _ in range(5000)]
+    fine = generator._bucket_heatmap_points(points)
+    assert sum(weight for _, _, weight in fine) == 5000
+    coarse_generator = MapGenerator()
+    coarse_generator.MAX_HEATMAP_POINTS = 500
+    coarse = coarse_generator._bucket_heatmap_points(points)
+    assert len(coarse) <= 500 < len(fine)
+    assert sum(weight for _, _, weight in coarse) == 5000
+    # Each point is counted in the cell its fine cell was merged into
+    grid = coarse_generator.HEATMAP_GRID_DEGREES
+    fine_cells = [(round(lat / grid), round(lon / grid)) for lat, lon in points]
+    shift = 0
+    while len({(row >> shift, col >> shift) for row, col in fine_cells}) > 500:
+        shift += 1
+    expected = Counter((row >> shift, col >> shift) for row, col in fine_cells)
+    scale = grid * 2 ** shift
+    assert sorted(coarse) == sorted(
+        [round(row * scale, 6), round(col * scale, 6), count]
+        for (row, col), count in expected.items()
+    )
+    
+    # The same results again are served from the rendered-map cache
+    MapGenerator.clear_summary_cache()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first = MapGenerator()
+        first.create_summary_map(hosts, os.path.join(tmp_dir, "first.html"))
+        second = MapGenerator()
+        second.create_summary_map(hosts, os.path.join(tmp_dir, "second.html"))
+        assert second.map_instance is first.map_instance
+        with open(os.path.join(tmp_dir, "first.html"), 'rb') as f:
+            page = f.read()
+        with open(os.path.join(tmp_dir, "second.html"), 'rb') as f:
+            assert f.read() == page
+        assert MapGenerator._summary_cache_bytes == len(page)
+        
+        # A different title is a different page; with room for one page
+        # the older one is evicted
+        limit = MapGenerator.SUMMARY_CACHE_MAX_BYTES
+        MapGenerator.SUMMARY_CACHE_MAX_BYTES = len(page) + 100
+        try:
+            second.create_summary_map(hosts, os.path.join(tmp_dir, "third.html"),
+                                      title="Other Title")
+            assert second.map_instance is not first.map_instance
+            assert len(MapGenerator._summary_cache) == 1
+        finally:
+            MapGenerator.SUMMARY_CACHE_MAX_BYTES = limit
+            MapGenerator.clear_summary_cache()
     
     print("  ✓ MapGenerator working")
 
 def test_reporter():
     """Test report generation."""
     print("Testing Reporter...")
-    from ilam_miner_detector.reporter import Reporter
+    from ilam_miner_detector.reporter import ReportGenerator
+    from ilam_miner_detector.database import ScanRecord, HostRecord
+    from datetime import datetime
     import tempfile
     import json
     
-    temp_dir = tempfile.mkdtemp()
-    reporter = Reporter(temp_dir)
-    
-    scan_data = {
-        'scan_name': 'Test Scan',
-        'target_range': '192.168.1.0/24',
-        'started_at': '2024-02-16T10:00:00',
-        'completed_at': '2024-02-16T10:05:00',
-        'scanned_ips': 10,
-        'detected_miners': 2
-    }
-    
+    reporter = ReportGenerator()
+    
+    scan = ScanRecord(
+        id=1,
+        scan_name='Test Scan',
+        cidr_range='192.168.1.0/24',
+        start_time=datetime(2024, 2, 16, 10, 0, 0),
+        end_time=datetime(2024, 2, 16, 10, 5, 0),
+        total_hosts=10,
+        responsive_hosts=2,
+        miners_detected=1,
+        status='completed'
+    )
     hosts = [
-        {
-            'ip_address': '192.168.1.100',
-            'hostname': 'miner-01',
-            'open_ports': '[3333, 4444]',
-            'is_miner': 1,
-            'miner_type': 'stratum',
-            'city': 'Ilam',
-            'region': 'Ilam',
-            'country': 'Iran',
-            'latitude': 33.6374,
-            'longitude': 46.4227
-        }
+        HostRecord(
+            id=1, scan_id=1, ip_address='192.168.1.100', is_responsive=True,
+            ping_time_ms=12.5, open_ports='[3333, 4444]',
+            is_miner_detected=True, miner_type='Stratum', confidence_score=75.0
+        ),
+        # Floats orjson would format differently from json
+        HostRecord(
+            id=2, scan_id=1, ip_address='192.168.1.101', is_responsive=True,
+            ping_time_ms=1e-05, open_ports='[]', confidence_score=1e16
+        ),
     ]
-    
-    # Test JSON report
-    json_path = reporter.generate_json_report(scan_data, hosts, 'test.json')
-    assert os.path.exists(json_path)
-    
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-        assert data['scan_metadata']['scan_name'] == 'Test Scan'
-        assert len(data['hosts']) == 1
-    
-    # Test CSV report
-    csv_path = reporter.generate_csv_report(hosts, 'test.csv')
-    assert os.path.exists(csv_path)
-    
-    # Test HTML report
-    html_path = reporter.generate_html_report(scan_data, hosts, filename='test.html')
-    assert os.path.exists(html_path)
-    
-    # Cleanup
-    import shutil
-    shutil.rmtree(temp_dir)
+    data = (scan, hosts)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Test JSON report, streamed with json.dump(indent=2)'s layout
+        json_path = reporter.export_json(1, os.path.join(temp_dir, 'test.json'), data=data)
+        with open(json_path, 'r') as f:
+            text = f.read()
+        report = json.loads(text)
+        assert report['scan']['scan_name'] == 'Test Scan'
+        assert len(report['hosts']) == 2
+        assert report['summary']['detection_rate'] == 10.0
+        assert text == json.dumps(report, indent=2)
+        
+        # Test CSV report
+        csv_path = reporter.export_csv(1, os.path.join(temp_dir, 'test.csv'), data=data)
+        with open(csv_path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 3
+        assert lines[1].startswith('192.168.1.100,True,12.5,')
+        
+        # Test HTML report
+        html_path = reporter.export_html(
+            1, os.path.join(temp_dir, 'test.html'), include_map=False, data=data
+        )
+        with open(html_path, encoding='utf-8') as f:
+            assert '192.168.1.100' in f.read()
     
     print("  ✓ Reporter working")
 
@@ -238,6 +666,9 @@ def main():
         test_ip_manager,
         test_database,
         test_network_scanner_basic,
+        test_port_check_pool,
+        test_vpn_detector,
+        test_geolocation_subnets,
         test_map_generator,
         test_reporter,
     ]